@@ -0,0 +1,159 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Hashable, List
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))  # 0 disables the cache
+# Cosine distance between queries. Higher values get more hits but can answer a
+# differently worded question that means something else; keep it tight.
+ANSWER_CACHE_MAX_DISTANCE = float(os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0.03"))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class SemanticAnswerCache:
+    """
+    Generated answers keyed by query embedding and retrieved context.
+
+    A lookup hits when a cached query lies within max_distance (cosine
+    distance) of the new one and was answered from the same context key,
+    typically the set of retrieved chunk IDs, in the same collection
+    version. Query vectors are kept in one normalized matrix, so the
+    nearest-neighbour search is a single matrix-vector product. The least
+    recently used entry is replaced when the cache is full, and all entries
+    of a collection are dropped once its version changes.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, max_distance: float = ANSWER_CACHE_MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_ms = 0.0
+
+        self._lock = threading.Lock()
+        self._vectors = None  # (max_entries, dim), rows [0, len(self._entries)) in use
+        self._entries: List[Dict[str, Any]] = []
+        self._versions: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(query_vector) -> np.ndarray:
+        vector = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, row: int):
+        """Drop an entry by moving the last row into its place. Caller holds _lock."""
+        last = len(self._entries) - 1
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._entries[row] = self._entries[last]
+        self._entries.pop()
+
+    def _sync_version(self, collection_name: str, version: int):
+        """Drop a collection's entries once it has been updated. Caller holds _lock."""
+        if self._versions.get(collection_name, version) != version:
+            for row in reversed(range(len(self._entries))):
+                if self._entries[row]["collection"] == collection_name:
+                    self._remove(row)
+                    self.evictions += 1
+            logger.info(f"Answer cache: collection '{collection_name}' changed, dropped its cached answers")
+        self._versions[collection_name] = version
+
+    def get(self, query_vector, collection_name: str, version: int, context_key: Hashable) -> str:
+        """
+        Cached answer for a similar query over the same context, or None.
+
+        Args:
+            query_vector: Embedding of the query
+            collection_name: Collection the context was retrieved from
+            version: Current version of that collection
+            context_key: Hashable description of the context, e.g. a frozenset of chunk IDs
+
+        Returns:
+            The cached answer, or None on a miss
+        """
+        query = self._normalize(query_vector)
+        with self._lock:
+            self._sync_version(collection_name, version)
+            if self._entries:
+                distances = 1.0 - self._vectors[:len(self._entries)] @ query
+                for row in np.argsort(distances):
+                    if distances[row] > self.max_distance:
+                        break
+                    entry = self._entries[row]
+                    if entry["collection"] == collection_name and entry["context_key"] == context_key:
+                        entry["last_used"] = time.monotonic()
+                        self.hits += 1
+                        self.saved_ms += entry["latency_ms"]
+                        return entry["answer"]
+            self.misses += 1
+            return None
+
+    def put(self, query_vector, collection_name: str, version: int, context_key: Hashable, answer: str, latency_ms: float):
+        """Store an answer and the time it took to generate (reported as saved latency on hits)."""
+        if self.max_entries <= 0:
+            return
+        query = self._normalize(query_vector)
+        with self._lock:
+            self._sync_version(collection_name, version)
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                self._vectors = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+                self._entries = []
+            if len(self._entries) >= self.max_entries:
+                self._remove(min(range(len(self._entries)), key=lambda row: self._entries[row]["last_used"]))
+                self.evictions += 1
+            self._vectors[len(self._entries)] = query
+            self._entries.append({
+                "collection": collection_name,
+                "context_key": context_key,
+                "answer": answer,
+                "latency_ms": latency_ms,
+                "last_used": time.monotonic(),
+            })
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and the generation time saved by hits."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "saved_ms": round(self.saved_ms, 1),
+            }
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """The process-wide answer cache, or None when ANSWER_CACHE_MAX_ENTRIES is 0."""
+    global _cache
+    if ANSWER_CACHE_MAX_ENTRIES <= 0:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticAnswerCache()
+    return _cache
+
+
+def get_answer_cache_stats() -> Dict[str, Any]:
+    """Counters of the answer cache ({} when it is disabled)."""
+    cache = get_answer_cache()
+    return cache.stats() if cache is not None else {}
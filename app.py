@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+import shutil
 import asyncio
 from memory_manager import store_message#, retrieve_messages
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
@@ -21,6 +22,12 @@ from conversation_aware_rag import (
 from qdrant_helper import index_document_with_strategies, query_qdrant_multi_strategy,hybrid_search
 from rag import generate_answer
 from web_crawl import get_scrape_content
+from ingestion_jobs import submit_ingestion_job
+from ingestion_ui import show_ingestion_jobs
+from upload_registry import file_content_hash, needs_ingestion, register_upload, forget_upload
+from index_manifest import delete_manifest
+
+UPLOAD_COPY_BUFFER = 1024 * 1024
 
 
 
@@ -42,6 +49,9 @@ def app():
     if "use_conversation_memory" not in st.session_state:
         st.session_state.use_conversation_memory = True
 
+    if "upload_hashes" not in st.session_state:
+        st.session_state.upload_hashes = {}
+
     # App layout with columns
     st.title("📚 Conversation-Aware RAG System")
 
@@ -51,21 +61,37 @@ def app():
     # Settings sidebar
     with st.sidebar:
         st.header("📄 Upload Documents")
-        uploaded_files = st.file_uploader("Choose documents", type=["pdf", "docx", "txt"], accept_multiple_files=True)
+        uploaded_files = st.file_uploader("Choose documents", type=["pdf", "docx", "txt", "md"], accept_multiple_files=True)
 
         if uploaded_files:
             os.makedirs("data/uploads", exist_ok=True)
+            # The uploader keeps its files across reruns: hash each upload once (a re-upload,
+            # even of an edited file with the same name and size, gets a new file_id)
+            # and skip files the registry already has for this collection
+            new_files = []
             for uploaded_file in uploaded_files:
+                if uploaded_file.file_id not in st.session_state.upload_hashes:
+                    st.session_state.upload_hashes[uploaded_file.file_id] = file_content_hash(uploaded_file.getbuffer())
+                content_hash = st.session_state.upload_hashes[uploaded_file.file_id]
+                if not needs_ingestion(DOCUMENT_COLLECTION, content_hash):
+                    continue
                 file_path = f"data/uploads/{uploaded_file.name}"
                 with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                with st.spinner(f"Processing {uploaded_file.name}..."):
-                    chunks = load_and_chunk_documents_with_multiple_strategies(file_path)
-                    response = index_document_with_strategies(DOCUMENT_COLLECTION, uploaded_file.name, chunks)
-                    if response["status"] == "success":
-                        st.success(f"✅ Indexed {sum(len(v) for v in chunks.values())} chunks")
-                    else:
-                        st.error(f"❌ Failed: {response['message']}")
+                    uploaded_file.seek(0)
+                    shutil.copyfileobj(uploaded_file, f, UPLOAD_COPY_BUFFER)
+                register_upload(DOCUMENT_COLLECTION, content_hash, uploaded_file.name, file_path)
+                new_files.append((file_path, uploaded_file.name, content_hash))
+            if new_files:
+                submit_ingestion_job(DOCUMENT_COLLECTION, new_files, owner=SESSION_ID)
+                st.info(f"Queued {len(new_files)} file(s) for indexing")
+
+            if st.button("🔄 Re-index uploaded files", help="Rebuild the index of the selected files from scratch"):
+                for uploaded_file in uploaded_files:
+                    forget_upload(DOCUMENT_COLLECTION, st.session_state.upload_hashes[uploaded_file.file_id])
+                    delete_manifest(DOCUMENT_COLLECTION, uploaded_file.name)
+                st.rerun()
+
+        show_ingestion_jobs(SESSION_ID)
 
         # Add memory toggle in sidebar
         st.header("⚙️ Settings")
@@ -86,13 +112,8 @@ def app():
             try:
                 scraped_file = asyncio.run(get_scrape_content(url))  # Assuming this function returns the scraped text
                 st.sidebar.write(f"✅ Scraped content from {url}")
-                chunks = load_and_chunk_documents_with_multiple_strategies(scraped_file)
-
-                response = index_document_with_strategies(DOCUMENT_COLLECTION, url, chunks)
-                if response["status"] == "success":
-                    st.sidebar.success(f"Indexed {len(chunks)} chunks for {url}")
-                else:
-                    st.sidebar.error(f"Failed to index {url}: {response['message']}")
+                submit_ingestion_job(DOCUMENT_COLLECTION, [(scraped_file, url)], owner=SESSION_ID)
+                st.sidebar.info(f"Queued {url} for indexing")
             except Exception as e:
                 st.sidebar.error(f"Failed to scrape {url}: {str(e)}")
     # Left sidebar for showing sources
@@ -139,8 +160,8 @@ def app():
             with st.chat_message("user"):
                 st.write(query)
 
+            # answer_query_with_conversation_context stores the query and the answer itself
             st.session_state.messages.append(HumanMessage(content=query))
-            store_message(SESSION_ID, query, "user")
 
             with st.chat_message("assistant"):
                 with st.spinner("Thinking..."):
@@ -158,7 +179,6 @@ def app():
 
                     st.write(response["answer"])
                     st.session_state.messages.append(AIMessage(content=response["answer"]))
-                    store_message(SESSION_ID, response["answer"], "assistant")
 
         # Clear chat history button (in main column)
         if st.button("Clear Chat History"):
@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+import shutil
 import asyncio
 import bcrypt
 import uuid
@@ -23,10 +24,15 @@ from conversation_aware_rag import (
 from qdrant_helper import index_document_with_strategies, query_qdrant_multi_strategy, hybrid_search
 from rag import generate_answer
 from web_crawl import get_scrape_content
+from ingestion_jobs import submit_ingestion_job
+from ingestion_ui import show_ingestion_jobs
+from upload_registry import file_content_hash, needs_ingestion, register_upload, forget_upload
+from index_manifest import delete_manifest
 
 # User authentication constants
 USER_DB_FILE = "user_database.json"
 SESSION_DURATION = timedelta(hours=24)
+UPLOAD_COPY_BUFFER = 1024 * 1024
 
 # Initialize user database if it doesn't exist
 def init_user_db():
@@ -222,6 +228,9 @@ def show_main_app():
     if "use_conversation_memory" not in st.session_state:
         st.session_state.use_conversation_memory = True
 
+    if "upload_hashes" not in st.session_state:
+        st.session_state.upload_hashes = {}
+
     # App layout with columns
     st.title(f"📚 RAG Assistant - Welcome, {st.session_state.username}!")
 
@@ -239,31 +248,47 @@ def show_main_app():
             st.rerun()
             
         st.header("📄 Upload Documents")
-        uploaded_files = st.file_uploader("Choose documents", type=["pdf", "docx", "txt"], accept_multiple_files=True)
+        uploaded_files = st.file_uploader("Choose documents", type=["pdf", "docx", "txt", "md"], accept_multiple_files=True)
         
         if uploaded_files:
             # Create user-specific upload directory
             user_upload_dir = f"uploads/{st.session_state.username}"
             os.makedirs(user_upload_dir, exist_ok=True)
             
+            # The uploader keeps its files across reruns: hash each upload once (a re-upload,
+            # even of an edited file with the same name and size, gets a new file_id)
+            # and skip files the registry already has for this collection
+            new_files = []
             for uploaded_file in uploaded_files:
+                if uploaded_file.file_id not in st.session_state.upload_hashes:
+                    st.session_state.upload_hashes[uploaded_file.file_id] = file_content_hash(uploaded_file.getbuffer())
+                content_hash = st.session_state.upload_hashes[uploaded_file.file_id]
+                if not needs_ingestion(user_document_collection, content_hash):
+                    continue
                 file_path = f"{user_upload_dir}/{uploaded_file.name}"
                 with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                with st.spinner(f"Processing {uploaded_file.name}..."):
-                    chunks = load_and_chunk_documents_with_multiple_strategies(file_path)
-                    response = index_document_with_strategies(user_document_collection, uploaded_file.name, chunks)
-                    
-                    # Track document in user profile
-                    db = init_user_db()
-                    if uploaded_file.name not in db["users"][st.session_state.username]["documents"]:
-                        db["users"][st.session_state.username]["documents"].append(uploaded_file.name)
-                        save_user_db(db)
-                    
-                    if response["status"] == "success":
-                        st.success(f"✅ Indexed {sum(len(v) for v in chunks.values())} chunks")
-                    else:
-                        st.error(f"❌ Failed: {response['message']}")
+                    uploaded_file.seek(0)
+                    shutil.copyfileobj(uploaded_file, f, UPLOAD_COPY_BUFFER)
+                register_upload(user_document_collection, content_hash, uploaded_file.name, file_path)
+                new_files.append((file_path, uploaded_file.name, content_hash))
+                
+                # Track document in user profile
+                db = init_user_db()
+                if uploaded_file.name not in db["users"][st.session_state.username]["documents"]:
+                    db["users"][st.session_state.username]["documents"].append(uploaded_file.name)
+                    save_user_db(db)
+            
+            if new_files:
+                submit_ingestion_job(user_document_collection, new_files, owner=st.session_state.username)
+                st.info(f"Queued {len(new_files)} file(s) for indexing")
+            
+            if st.button("🔄 Re-index uploaded files", help="Rebuild the index of the selected files from scratch"):
+                for uploaded_file in uploaded_files:
+                    forget_upload(user_document_collection, st.session_state.upload_hashes[uploaded_file.file_id])
+                    delete_manifest(user_document_collection, uploaded_file.name)
+                st.rerun()
+        
+        show_ingestion_jobs(st.session_state.username)
         
         # Add memory toggle in sidebar
         st.header("⚙ Settings")
@@ -288,9 +313,7 @@ def show_main_app():
                 
                 scraped_file = asyncio.run(get_scrape_content(url, output_dir=user_scrape_dir))
                 st.sidebar.write(f"✅ Scraped content from {url}")
-                chunks = load_and_chunk_documents_with_multiple_strategies(scraped_file)
-                        
-                response = index_document_with_strategies(user_document_collection, url, chunks)
+                submit_ingestion_job(user_document_collection, [(scraped_file, url)], owner=st.session_state.username)
                 
                 # Track scraped URL in user profile
                 db = init_user_db()
@@ -298,10 +321,7 @@ def show_main_app():
                     db["users"][st.session_state.username]["documents"].append(url)
                     save_user_db(db)
                 
-                if response["status"] == "success":
-                    st.sidebar.success(f"Indexed {sum(len(v) for v in chunks.values())} chunks for {url}")
-                else:
-                    st.sidebar.error(f"Failed to index {url}: {response['message']}")
+                st.sidebar.info(f"Queued {url} for indexing")
             except Exception as e:
                 st.sidebar.error(f"Failed to scrape {url}: {str(e)}")
 
@@ -349,8 +369,8 @@ def show_main_app():
             with st.chat_message("user"):
                 st.write(query)
             
+            # answer_query_with_conversation_context stores the query and the answer itself
             st.session_state.messages.append(HumanMessage(content=query))
-            store_message(get_user_session_id(), query, "user")
             
             with st.chat_message("assistant"):
                 with st.spinner("Thinking..."):
@@ -369,7 +389,6 @@ def show_main_app():
                    
                     st.write(response["answer"])
                     st.session_state.messages.append(AIMessage(content=response["answer"]))
-                    store_message(get_user_session_id(), response["answer"], "assistant")
 
         # Clear chat history button (in main column)
         if st.button("Clear Chat History"):
@@ -0,0 +1,108 @@
+"""
+Memory report for chunk representations.
+
+Chunks one large text file with the default strategies plus the rolling
+window, once keeping the compact ChunkRecords returned by build_chunk_views and
+once materializing every chunk as a LangChain Document with its own text and
+metadata copy (the previous representation). Each mode runs in its own
+subprocess; the report shows the memory retained by the chunks, peak RSS and
+chunking time.
+
+Usage:
+    python bench_chunk_memory.py --size_mb 50
+    python bench_chunk_memory.py --file big_manual.txt
+"""
+import os
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import subprocess
+
+ROLLING_WINDOW = {"window_size": 1000, "step_size": 200}
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def write_synthetic_text(path: str, size_mb: int):
+    """Paragraphs of random words, roughly size_mb megabytes."""
+    rng = random.Random(0)
+    vocabulary = [
+        "pump", "valve", "pressure", "sensor", "maintenance", "inspection", "the", "of", "and", "is",
+        "replace", "filter", "every", "hours", "operator", "manual", "safety", "check", "system", "flow"
+    ]
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, "w") as f:
+        while written < target:
+            sentences = [" ".join(rng.choices(vocabulary, k=rng.randint(6, 20))).capitalize() + "." for _ in range(rng.randint(3, 8))]
+            paragraph = " ".join(sentences) + "\n\n"
+            f.write(paragraph)
+            written += len(paragraph)
+
+
+def run_mode(path: str, mode: str) -> dict:
+    """Subprocess entry point: chunk the file and measure what the chunks retain."""
+    from langchain_core.documents import Document
+    from document_loader import build_chunk_views
+
+    with open(path, "r", encoding="utf-8") as f:
+        documents = [Document(page_content=f.read(), metadata={"source": path})]
+    gc.collect()
+    baseline = rss_mb()
+
+    start = time.perf_counter()
+    views = build_chunk_views(documents, rolling_window=ROLLING_WINDOW)
+    if mode == "documents":
+        for strategy_id in views:
+            views[strategy_id] = [chunk.to_document() for chunk in views[strategy_id]]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+
+    return {
+        "chunks": sum(len(chunks) for chunks in views.values()),
+        "text_mb": len(documents[0].page_content) / (1024 * 1024),
+        "retained_mb": rss_mb() - baseline,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "elapsed_s": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory of ChunkRecords and materialized Documents.")
+    parser.add_argument("--file", help="Text file to chunk (default: generate a synthetic one)")
+    parser.add_argument("--size_mb", type=int, default=50, help="Size of the synthetic text file")
+    parser.add_argument("--_run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._run:
+        print(json.dumps(run_mode(args.file, args._run)))
+        return
+
+    path = args.file
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(), f"synthetic_{args.size_mb}mb.txt")
+        write_synthetic_text(path, args.size_mb)
+
+    print(f"{'mode':<10} {'chunks':>8} {'text MB':>8} {'chunks MB':>10} {'x text':>7} {'peak MB':>8} {'time s':>7}")
+    for mode in ("records", "documents"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--file", path, "--_run", mode],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{mode:<10} {result['chunks']:>8} {result['text_mb']:>8.1f} {result['retained_mb']:>10.1f} "
+            f"{result['retained_mb'] / result['text_mb']:>7.2f} {result['peak_rss_mb']:>8.1f} {result['elapsed_s']:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark embedding backends against the PyTorch SentenceTransformer.
+
+For every backend (torch, onnx, onnx-int8) a fresh subprocess loads the model
+and encodes the same chunks, so load time and RSS are measured in isolation.
+The report compares sentences/sec, RSS, cosine similarity to the torch
+vectors and top-k retrieval agreement on a set of queries.
+
+Usage:
+    python bench_embedding_backends.py docs/manual.pdf docs/notes.txt --queries queries.txt
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+BACKENDS = {
+    "torch": {"backend": "torch", "onnx_quantize": False},
+    "onnx": {"backend": "onnx", "onnx_quantize": False},
+    "onnx-int8": {"backend": "onnx", "onnx_quantize": True},
+}
+
+
+def run_worker(backend_name: str, texts_path: str, vectors_path: str, threads: int, batch_size: int):
+    """Load one backend, encode the texts and print timing/memory stats as JSON."""
+    import resource
+    import embedding_provider
+
+    embedding_provider.configure_embedding_provider(threads=threads, batch_size=batch_size, **BACKENDS[backend_name])
+    with open(texts_path) as f:
+        texts = json.load(f)
+
+    embedding_provider.get_embedding_model()
+    # Warm-up so one-off graph optimizations are not counted as throughput
+    embedding_provider.encode_documents(texts[:8], use_cache=False)
+
+    start = time.perf_counter()
+    vectors = embedding_provider.encode_documents(texts, use_cache=False)
+    elapsed = time.perf_counter() - start
+    np.save(vectors_path, np.asarray(vectors, dtype=np.float32))
+
+    stats = embedding_provider.get_provider_stats()
+    print(json.dumps({
+        "load_time_s": stats["load_time_s"],
+        "rss_after_load_mb": stats["rss_after_load_mb"],
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "encode_time_s": elapsed,
+        "sentences_per_s": len(texts) / elapsed if elapsed else 0.0,
+    }))
+
+
+def load_texts(paths, max_chunks: int):
+    from document_loader import load_and_chunk_documents_with_multiple_strategies
+
+    texts = []
+    for path in paths:
+        chunks = load_and_chunk_documents_with_multiple_strategies(
+            path, chunk_strategies=[{"id": "small", "chunk_size": 500, "chunk_overlap": 50}]
+        )["small"]
+        texts.extend(chunk.page_content for chunk in chunks)
+    return texts[:max_chunks]
+
+
+def top_k_indices(query_vectors: np.ndarray, doc_vectors: np.ndarray, k: int) -> np.ndarray:
+    scores = query_vectors @ doc_vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare torch, ONNX and int8 ONNX embedding backends.")
+    parser.add_argument("corpus", nargs="+", help="Documents to chunk and encode")
+    parser.add_argument("--queries", help="File with one query per line (default: first sentence of sampled chunks)")
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8", help="Comma separated backends to compare")
+    parser.add_argument("--max_chunks", type=int, default=2000, help="Maximum number of chunks to encode")
+    parser.add_argument("--top_k", type=int, default=5, help="k for retrieval agreement")
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = default)")
+    parser.add_argument("--batch_size", type=int, default=64, help="Encode batch size")
+    parser.add_argument("--min_cosine", type=float, default=0.99, help="Fail if any vector is less similar to torch than this")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--texts_path", help=argparse.SUPPRESS)
+    parser.add_argument("--vectors_path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.texts_path, args.vectors_path, args.threads, args.batch_size)
+        return
+
+    backends = [name.strip() for name in args.backends.split(",")]
+    if "torch" not in backends:
+        backends.insert(0, "torch")  # reference for agreement metrics
+
+    chunks = load_texts(args.corpus, args.max_chunks)
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        step = max(1, len(chunks) // 50)
+        queries = [chunk.split(".")[0][:200] for chunk in chunks[::step]]
+    texts = chunks + queries
+    print(f"Encoding {len(chunks)} chunks and {len(queries)} queries per backend")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        texts_path = os.path.join(tmp, "texts.json")
+        with open(texts_path, "w") as f:
+            json.dump(texts, f)
+
+        for name in backends:
+            vectors_path = os.path.join(tmp, f"{name}.npy")
+            completed = subprocess.run(
+                [sys.executable, __file__, "corpus", "--worker", name,
+                 "--texts_path", texts_path, "--vectors_path", vectors_path,
+                 "--threads", str(args.threads), "--batch_size", str(args.batch_size)],
+                env={**os.environ, "EMBEDDING_CACHE_DIR": ""},
+                capture_output=True,
+                text=True
+            )
+            if completed.returncode != 0:
+                print(f"[{name}] failed:\n{completed.stderr}")
+                continue
+            results[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+            results[name]["vectors"] = np.load(vectors_path)
+
+    if "torch" not in results:
+        print("Reference torch backend failed; cannot compute agreement")
+        sys.exit(1)
+
+    reference = results["torch"]["vectors"]
+    reference_top = top_k_indices(reference[len(chunks):], reference[:len(chunks)], args.top_k)
+
+    failed = False
+    print(f"\n{'backend':<10} {'sent/s':>9} {'load s':>7} {'RSS MB':>8} {'peak MB':>8} "
+          f"{'cos mean':>9} {'cos min':>8} {'top-' + str(args.top_k) + ' agree':>11}")
+    for name, result in results.items():
+        vectors = result["vectors"]
+        cosines = np.sum(vectors * reference, axis=1) / (
+            np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1)
+        )
+        top = top_k_indices(vectors[len(chunks):], vectors[:len(chunks)], args.top_k)
+        agreement = np.mean([len(set(a) & set(b)) / args.top_k for a, b in zip(top, reference_top)])
+        print(f"{name:<10} {result['sentences_per_s']:>9.1f} {result['load_time_s']:>7.2f} "
+              f"{result['rss_after_load_mb']:>8.0f} {result['peak_rss_mb']:>8.0f} "
+              f"{cosines.mean():>9.5f} {cosines.min():>8.5f} {agreement:>11.3f}")
+        if cosines.min() < args.min_cosine:
+            print(f"  -> {name} is outside the cosine tolerance of {args.min_cosine}")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
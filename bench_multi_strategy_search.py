@@ -0,0 +1,93 @@
+"""
+Latency of strategy-scoped vector search: sequential loop vs. one batch.
+
+For every query the embedding is computed once, then the strategies are
+searched two ways against the running Qdrant server: one search call per
+strategy (the previous implementation, with the filter passed correctly as
+query_filter) and a single search_batch request. The report shows mean, p50
+and p95 latency per query and checks that both return the same points.
+
+Usage:
+    python bench_multi_strategy_search.py --collection document_chunks --queries queries.txt
+    python bench_multi_strategy_search.py --strategies small medium large rolling_window --repeat 5
+"""
+import time
+import argparse
+
+import numpy as np
+from qdrant_client.models import Filter, FieldCondition, MatchValue
+
+import qdrant_helper
+from embedding_provider import encode_query
+
+DEFAULT_QUERIES = [
+    "How often should the filter be replaced?",
+    "What is the maximum operating pressure?",
+    "Safety checks before maintenance",
+    "Which parts need regular inspection?",
+]
+
+
+def search_sequential(collection_name, query_vector, strategies, top_k):
+    hits = []
+    for strategy in strategies:
+        hits.extend(qdrant_helper.qdrant_client.search(
+            collection_name=collection_name,
+            query_vector=query_vector,
+            query_filter=Filter(must=[FieldCondition(key="strategy", match=MatchValue(value=strategy))]),
+            limit=top_k,
+            score_threshold=0.3,
+            with_payload=True
+        ))
+    return hits
+
+
+def search_batched(collection_name, query_vector, strategies, top_k):
+    responses = qdrant_helper.qdrant_client.search_batch(
+        collection_name=collection_name,
+        requests=qdrant_helper._dense_search_requests(query_vector, strategies, top_k)
+    )
+    return [hit for response in responses for hit in response]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential and batched multi-strategy search latency.")
+    parser.add_argument("--collection", default=qdrant_helper.COLLECTION_NAME, help="Qdrant collection to search")
+    parser.add_argument("--queries", help="File with one query per line (default: built-in examples)")
+    parser.add_argument("--strategies", nargs="+", default=["small", "medium", "large", "rolling_window"])
+    parser.add_argument("--top_k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3, help="Times each query is searched per mode")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    vectors = [encode_query(query) for query in queries]
+
+    modes = {"sequential": search_sequential, "batched": search_batched}
+    latencies = {mode: [] for mode in modes}
+    mismatches = 0
+    # Warm up connections before timing
+    for search in modes.values():
+        search(args.collection, vectors[0], args.strategies, args.top_k)
+    for vector in vectors:
+        ids = {}
+        for _ in range(args.repeat):
+            for mode, search in modes.items():
+                start = time.perf_counter()
+                hits = search(args.collection, vector, args.strategies, args.top_k)
+                latencies[mode].append((time.perf_counter() - start) * 1000)
+                ids[mode] = sorted(str(hit.id) for hit in hits)
+        mismatches += ids["sequential"] != ids["batched"]
+
+    print(f"{len(queries)} queries x {args.repeat} repeats, {len(args.strategies)} strategies, top_k={args.top_k}")
+    print(f"{'mode':<12} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode, values in latencies.items():
+        print(f"{mode:<12} {np.mean(values):>8.2f} {np.percentile(values, 50):>8.2f} {np.percentile(values, 95):>8.2f}")
+    print(f"Speed-up (mean): {np.mean(latencies['sequential']) / np.mean(latencies['batched']):.2f}x")
+    print(f"Queries with different results: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Throughput and memory report for PDF extraction.
+
+Each configuration (parser backend x worker count, plus the previous
+PyPDFLoader path when langchain_community is installed) runs in its own
+subprocess so that peak RSS is measured in isolation. Peak RSS is reported
+for the parent process and, separately, for the largest worker process.
+
+Usage:
+    python bench_pdf_loader.py manual.pdf --workers 1 2 4 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+from pdf_loader import available_pdf_backends
+
+
+def run_configuration(path: str, backend: str, workers: int) -> dict:
+    """Subprocess entry point: extract every page and report timings."""
+    start = time.perf_counter()
+    if backend == "pypdfloader":
+        from langchain_community.document_loaders import PyPDFLoader
+        pages = PyPDFLoader(path).load()
+    else:
+        from pdf_loader import iter_pdf_pages
+        pages = list(iter_pdf_pages(path, backend=backend, workers=workers))
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux
+    return {
+        "pages": len(pages),
+        "characters": sum(len(page.page_content) for page in pages),
+        "elapsed_s": elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_worker_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def measure(path: str, backend: str, workers: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, path, "--_run", backend, str(workers)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PDF extraction backends and worker counts.")
+    parser.add_argument("pdf", help="PDF to extract")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1], help="Worker counts to try")
+    parser.add_argument("--_run", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._run:
+        print(json.dumps(run_configuration(args.pdf, args._run[0], int(args._run[1]))))
+        return
+
+    configurations = []
+    try:
+        import langchain_community.document_loaders  # noqa: F401
+        configurations.append(("pypdfloader", 1))
+    except ImportError:
+        pass
+    for backend in available_pdf_backends():
+        configurations.extend((backend, workers) for workers in sorted(set(args.workers)))
+
+    print(f"{'backend':<12} {'workers':>7} {'pages':>6} {'time s':>8} {'pages/s':>9} {'rss MB':>8} {'worker MB':>10}")
+    baseline = None
+    for backend, workers in configurations:
+        result = measure(args.pdf, backend, workers)
+        pages_per_s = result["pages"] / result["elapsed_s"] if result["elapsed_s"] else 0.0
+        baseline = baseline or pages_per_s
+        print(
+            f"{backend:<12} {workers:>7} {result['pages']:>6} {result['elapsed_s']:>8.2f} {pages_per_s:>9.1f} "
+            f"{result['peak_rss_mb']:>8.1f} {result['peak_worker_rss_mb']:>10.1f}"
+            + (f"  ({pages_per_s / baseline:.1f}x)" if baseline else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
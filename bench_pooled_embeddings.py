@@ -0,0 +1,106 @@
+"""
+Accuracy-vs-speed report for pooled chunk embeddings.
+
+Chunks every document with the default strategies plus the rolling window,
+then builds chunk vectors three ways: exact (every chunk through the model),
+pooled with mean pooling and pooled with length-weighted pooling. For each
+strategy it reports encode time, texts sent to the model, the cosine between
+pooled and exact vectors, and how many of the exact top-k results the pooled
+vectors retrieve for a set of queries.
+
+Usage:
+    python bench_pooled_embeddings.py docs/*.pdf --queries queries.txt --top_k 5
+"""
+import os
+import time
+import argparse
+
+# Measure real model cost: never answer from the embedding cache
+os.environ["EMBEDDING_CACHE_DIR"] = ""
+
+import numpy as np
+
+import embedding_provider
+from document_loader import load_documents, build_chunk_views
+from pooled_embeddings import PooledChunkEncoder
+
+
+def encode_exact(views):
+    start = time.perf_counter()
+    texts_before = embedding_provider.get_provider_stats()["texts_encoded"]
+    vectors = {
+        strategy_id: np.asarray(embedding_provider.encode_documents([chunk.page_content for chunk in chunks]), dtype=np.float32)
+        for strategy_id, chunks in views.items()
+    }
+    texts = embedding_provider.get_provider_stats()["texts_encoded"] - texts_before
+    return vectors, time.perf_counter() - start, texts
+
+
+def encode_pooled(documents, views, pooling):
+    start = time.perf_counter()
+    encoder = PooledChunkEncoder(documents, pooling=pooling)
+    vectors = {
+        strategy_id: np.asarray(encoder.encode_chunks(chunks), dtype=np.float32)
+        for strategy_id, chunks in views.items()
+    }
+    return vectors, time.perf_counter() - start, encoder.segments_encoded
+
+
+def recall_at_k(query_vectors, exact, candidate, k):
+    k = min(k, len(exact))
+    exact_top = np.argsort(-(query_vectors @ exact.T), axis=1)[:, :k]
+    candidate_top = np.argsort(-(query_vectors @ candidate.T), axis=1)[:, :k]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(exact_top, candidate_top)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pooled and exact chunk embeddings.")
+    parser.add_argument("corpus", nargs="+", help="Documents to chunk and encode")
+    parser.add_argument("--queries", help="File with one query per line (default: sampled sentences)")
+    parser.add_argument("--top_k", type=int, default=5, help="k for retrieval recall")
+    args = parser.parse_args()
+
+    documents, views = [], {}
+    for path in args.corpus:
+        file_documents = load_documents(path)
+        file_views = build_chunk_views(file_documents, rolling_window={"window_size": 1000, "step_size": 200})
+        offset = len(documents)
+        for strategy_id, chunks in file_views.items():
+            for chunk in chunks:
+                chunk.doc_index += offset
+            views.setdefault(strategy_id, []).extend(chunks)
+        documents.extend(file_documents)
+
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        small = views.get("small") or next(iter(views.values()))
+        step = max(1, len(small) // 50)
+        queries = [chunk.page_content.split(".")[0][:200] for chunk in small[::step]]
+    query_vectors = np.asarray(embedding_provider.encode_documents(queries), dtype=np.float32)
+
+    embedding_provider.get_embedding_model()  # keep model load out of the timings
+    exact, exact_time, exact_texts = encode_exact(views)
+    print(f"{len(documents)} documents, {sum(len(c) for c in views.values())} chunks, {len(queries)} queries\n")
+    print(f"{'mode':<9} {'time s':>8} {'texts':>7} {'speedup':>8}")
+    print(f"{'exact':<9} {exact_time:>8.2f} {exact_texts:>7} {1.0:>8.2f}")
+
+    pooled_results = {}
+    for pooling in ("mean", "weighted"):
+        vectors, elapsed, texts = encode_pooled(documents, views, pooling)
+        pooled_results[pooling] = vectors
+        print(f"{pooling:<9} {elapsed:>8.2f} {texts:>7} {exact_time / elapsed if elapsed else 0:>8.2f}")
+
+    print(f"\n{'strategy':<16} {'mode':<9} {'cos mean':>9} {'cos min':>8} {'recall@' + str(args.top_k):>9}")
+    for strategy_id, exact_vectors in exact.items():
+        if not len(exact_vectors):
+            continue
+        for pooling, vectors in pooled_results.items():
+            cosines = np.sum(vectors[strategy_id] * exact_vectors, axis=1)
+            recall = recall_at_k(query_vectors, exact_vectors, vectors[strategy_id], args.top_k)
+            print(f"{strategy_id:<16} {pooling:<9} {cosines.mean():>9.4f} {cosines.min():>8.4f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
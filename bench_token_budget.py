@@ -0,0 +1,49 @@
+"""
+Token budget report for the chunking strategies.
+
+Chunks every document with the default strategies plus the rolling window and
+tokenizes the chunks with the embedding model's tokenizer. For each strategy
+it reports how many chunks exceed the model's max sequence length, how many
+tokens are silently truncated (never seen by the model), how many padding
+tokens length-sorted batches spend, and how many vectors token-aware
+splitting (CHUNK_MAX_TOKENS) would produce instead.
+
+Usage:
+    python bench_token_budget.py docs/*.pdf
+    python bench_token_budget.py docs/*.pdf --max_tokens 256 --batch_size 64
+"""
+import argparse
+
+from document_loader import load_documents, build_chunk_views
+from embedding_provider import EMBEDDING_BATCH_SIZE
+from token_chunking import model_token_limit, token_budget_report
+
+ROLLING_WINDOW = {"window_size": 1000, "step_size": 200}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report truncated and padding tokens per chunking strategy.")
+    parser.add_argument("files", nargs="+", help="Documents to chunk")
+    parser.add_argument("--max_tokens", type=int, default=None, help="Token limit (default: the embedding model's limit)")
+    parser.add_argument("--batch_size", type=int, default=EMBEDDING_BATCH_SIZE, help="Encode batch size used to estimate padding")
+    args = parser.parse_args()
+
+    documents = []
+    for path in args.files:
+        documents.extend(load_documents(path))
+    views = build_chunk_views(documents, rolling_window=ROLLING_WINDOW, max_tokens=0)
+    max_tokens = args.max_tokens or model_token_limit()
+    report = token_budget_report(views, max_tokens=max_tokens, batch_size=args.batch_size)
+
+    print(f"{len(documents)} document(s), limit {max_tokens} tokens, batch size {args.batch_size}")
+    print(f"{'strategy':<16} {'chunks':>7} {'over':>6} {'tokens':>10} {'truncated':>10} {'trunc %':>8} {'padding':>10} {'max tok':>8} {'split vec':>10}")
+    for strategy_id, row in report.items():
+        print(
+            f"{strategy_id:<16} {row['chunks']:>7} {row['chunks_over_limit']:>6} {row['tokens']:>10} "
+            f"{row['truncated_tokens']:>10} {row['truncated_pct']:>8.1f} {row['padding_tokens']:>10} "
+            f"{row['max_chunk_tokens']:>8} {row['vectors_if_split']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import re
+import zlib
+import logging
+from collections import Counter
+from typing import Dict
+
+from qdrant_client.models import SparseVector
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+SPARSE_VECTOR_NAME = "bm25"
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Typical chunk length in terms; stands in for the corpus average so that
+# document weights never have to be recomputed as the collection grows
+BM25_AVG_LENGTH = float(os.getenv("BM25_AVG_LENGTH", "120"))
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no nor not now of off on once only or other
+our ours ourselves out over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which while who whom why will
+with would you your yours yourself yourselves
+""".split())
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str):
+    """Lower-cased word tokens without stopwords."""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def term_id(term: str) -> int:
+    """Stable 32-bit sparse index of a term (hashing trick: no vocabulary to store or sync)."""
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _sparse_vector(weights: Dict[int, float]) -> SparseVector:
+    indices = sorted(weights)
+    return SparseVector(indices=indices, values=[weights[index] for index in indices])
+
+
+def bm25_document_vector(text: str) -> SparseVector:
+    """
+    Sparse BM25 term-frequency weights of a chunk.
+
+    Only the term-frequency part of BM25 is stored; Qdrant applies the
+    inverse document frequency at query time (IDF modifier on the sparse
+    vector), so weights stay valid as documents are added or removed.
+    """
+    terms = Counter(term_id(token) for token in tokenize(text))
+    length = sum(terms.values())
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / BM25_AVG_LENGTH)
+    return _sparse_vector({index: tf * (BM25_K1 + 1) / (tf + norm) for index, tf in terms.items()})
+
+
+def bm25_query_vector(text: str) -> SparseVector:
+    """Sparse query vector: weight 1 per distinct query term (IDF is applied server-side)."""
+    return _sparse_vector({term_id(token): 1.0 for token in tokenize(text)})
@@ -0,0 +1,282 @@
+"""
+Bulk-ingest a directory of documents into Qdrant.
+
+Files are parsed and chunked in a process pool while the main process embeds
+(with the shared embedding model) and uploads them with parallel batched
+upserts, several files at a time. Progress is saved after every file, so an
+interrupted run resumes where it stopped; files that fail are copied to a
+quarantine directory and skipped on later runs unless --retry_failed is given.
+A parser crash that takes down the process pool only fails the file that
+caused it: the pool is recreated and the other files are parsed again.
+
+Usage:
+    python bulk_ingest.py /archive/manuals --collection document_chunks --workers 8 --index_workers 2
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from document_loader import load_documents, build_chunk_views
+from streaming_chunker import should_stream, stream_chunk_views
+import pdf_loader
+import qdrant_helper
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt", ".md")
+STATE_DIR = "data/bulk_ingest"
+ROLLING_WINDOW = {"window_size": 1000, "step_size": 200}
+
+
+def file_fingerprint(path: str) -> str:
+    """Cheap change detector: size and modification time."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def load_state(state_path: str) -> dict:
+    if os.path.exists(state_path):
+        with open(state_path, "r") as f:
+            return json.load(f)
+    return {"completed": {}, "failed": {}}
+
+
+def save_state(state_path: str, state: dict):
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def find_files(root: str, extensions) -> list:
+    paths = []
+    for directory, _, names in os.walk(root):
+        for name in sorted(names):
+            if name.lower().endswith(extensions):
+                paths.append(os.path.join(directory, name))
+    return sorted(paths)
+
+
+def init_parser_worker():
+    """Files are already parsed in parallel: don't fan out again inside each worker."""
+    pdf_loader.PDF_WORKERS = 1
+    pdf_loader.OCR_WORKERS = 1
+
+
+def parse_and_chunk(path: str):
+    """Process-pool worker: load and chunk one file."""
+    documents = load_documents(path)
+    views = build_chunk_views(documents, rolling_window=ROLLING_WINDOW)
+    return documents, views
+
+
+def quarantine(path: str, root: str, quarantine_dir: str):
+    target = os.path.join(quarantine_dir, os.path.relpath(path, root))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copy2(path, target)
+
+
+def ingest_directory(
+    root: str,
+    collection_name: str,
+    workers: int = None,
+    state_path: str = None,
+    quarantine_dir: str = None,
+    retry_failed: bool = False,
+    batch_size: int = 50,
+    upsert_workers: int = 4,
+    embedding_mode: str = "exact",
+    extensions=SUPPORTED_EXTENSIONS,
+    index_workers: int = 2
+) -> dict:
+    """
+    Ingest every supported file under root and return a throughput summary.
+
+    Args:
+        root: Directory to ingest
+        collection_name: Target Qdrant collection
+        workers: Parser processes (default: CPU count)
+        state_path: Progress file (default: data/bulk_ingest/<collection>.json)
+        quarantine_dir: Where failed files are copied (default: next to the state file)
+        retry_failed: Retry files that failed in an earlier run
+        batch_size: Chunks per embedding/upsert batch
+        upsert_workers: Concurrent upload threads
+        embedding_mode: "exact" or "pooled" (see index_document_with_strategies)
+        extensions: File extensions to ingest
+        index_workers: Files embedded and uploaded concurrently, so one file's
+            uploads overlap the next file's embedding
+
+    Returns:
+        Dictionary with counts, elapsed time and throughput
+    """
+    state_path = state_path or os.path.join(STATE_DIR, f"{collection_name}.json")
+    quarantine_dir = quarantine_dir or os.path.join(os.path.dirname(state_path), f"{collection_name}_quarantine")
+    state = load_state(state_path)
+
+    pending, skipped = [], 0
+    for path in find_files(root, extensions):
+        relative_path = os.path.relpath(path, root)
+        fingerprint = file_fingerprint(path)
+        done = state["completed"].get(relative_path)
+        failed = state["failed"].get(relative_path)
+        if done and done["fingerprint"] == fingerprint:
+            skipped += 1
+        elif failed and failed["fingerprint"] == fingerprint and not retry_failed:
+            skipped += 1
+        else:
+            pending.append((path, relative_path, fingerprint))
+
+    logger.info(f"{len(pending)} files to ingest, {skipped} already done or quarantined")
+    summary = {"files": 0, "failed": 0, "skipped": skipped, "chunks": 0, "new_chunks": 0, "duplicate_chunks": 0, "stage_busy_s": {}}
+    qdrant_helper.create_collection_if_not_exists(collection_name)
+    state_lock = threading.Lock()
+
+    def ingest(path, relative_path, fingerprint, load_views):
+        try:
+            documents, views = load_views()
+            result = qdrant_helper.index_document_with_strategies(
+                collection_name=collection_name,
+                document_id=relative_path,
+                chunking_strategies=views,
+                batch_size=batch_size,
+                upsert_workers=upsert_workers,
+                embedding_mode=embedding_mode,
+                source_documents=documents
+            )
+            if result["status"] != "success":
+                raise RuntimeError(result.get("message", "indexing failed"))
+        except Exception as e:
+            logger.error(f"Failed to ingest '{relative_path}': {e}")
+            quarantine(path, root, quarantine_dir)
+            with state_lock:
+                state["failed"][relative_path] = {"fingerprint": fingerprint, "error": str(e) or type(e).__name__}
+                state["completed"].pop(relative_path, None)
+                summary["failed"] += 1
+                save_state(state_path, state)
+            return
+        with state_lock:
+            state["completed"][relative_path] = {"fingerprint": fingerprint, "chunks": result["total_chunks"]}
+            state["failed"].pop(relative_path, None)
+            summary["files"] += 1
+            summary["chunks"] += result["total_chunks"]
+            summary["new_chunks"] += result["new_chunks"]
+            summary["duplicate_chunks"] += result["duplicate_chunks"]
+            for stage, stats in result["pipeline"]["stages"].items():
+                summary["stage_busy_s"][stage] = summary["stage_busy_s"].get(stage, 0.0) + stats["busy_s"]
+            save_state(state_path, state)
+        logger.info(f"Ingested '{relative_path}' ({result['total_chunks']} chunks, {result['new_chunks']} new)")
+
+    # Very large text files are streamed in this process instead of being parsed whole in a worker
+    streamed = [item for item in pending if should_stream(item[0])]
+    pooled = [item for item in pending if not should_stream(item[0])]
+
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    # Files being parsed plus parsed files waiting for or in indexing; caps memory
+    max_in_flight = workers * 2 + index_workers
+    with ThreadPoolExecutor(max_workers=index_workers, thread_name_prefix="index") as indexers:
+        indexing = set()
+        remaining = deque(pooled)
+        while remaining:
+            crashed, broken = [], False
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_parser_worker) as pool:
+                parsing = {}
+                while (remaining or parsing) and not broken:
+                    while remaining and len(parsing) + len(indexing) < max_in_flight:
+                        item = remaining.popleft()
+                        try:
+                            parsing[pool.submit(parse_and_chunk, item[0])] = item
+                        except BrokenProcessPool:
+                            remaining.appendleft(item)
+                            broken = True
+                            break
+                    done, _ = wait(set(parsing) | indexing, return_when=FIRST_COMPLETED)
+                    indexing -= done
+                    if any(isinstance(future.exception(), BrokenProcessPool) for future in done if future in parsing):
+                        # A worker died: every file still in the pool failed with it
+                        for future, item in parsing.items():
+                            if isinstance(future.exception(), BrokenProcessPool):
+                                crashed.append(item)
+                            else:
+                                indexing.add(indexers.submit(ingest, *item, future.result))
+                        parsing.clear()
+                        broken = True
+                        break
+                    for future in done:
+                        item = parsing.pop(future, None)
+                        if item is not None:
+                            indexing.add(indexers.submit(ingest, *item, future.result))
+            if crashed:
+                logger.warning(f"Parser pool crashed with {len(crashed)} files in flight; re-parsing them one at a time")
+            # Parse each suspect in its own process so only the file that crashes is quarantined
+            for item in crashed:
+                with ProcessPoolExecutor(max_workers=1, initializer=init_parser_worker) as solo:
+                    future = solo.submit(parse_and_chunk, item[0])
+                    wait([future])
+                indexing.add(indexers.submit(ingest, *item, future.result))
+
+        for path, relative_path, fingerprint in streamed:
+            load_views = lambda path=path: (None, stream_chunk_views(path, rolling_window=ROLLING_WINDOW))
+            indexing.add(indexers.submit(ingest, path, relative_path, fingerprint, load_views))
+        for future in indexing:
+            future.result()
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_s"] = round(elapsed, 2)
+    summary["files_per_s"] = round(summary["files"] / elapsed, 3) if elapsed else 0.0
+    summary["chunks_per_s"] = round(summary["chunks"] / elapsed, 1) if elapsed else 0.0
+    summary["stage_busy_s"] = {stage: round(busy, 2) for stage, busy in summary["stage_busy_s"].items()}
+    summary["quarantine_dir"] = quarantine_dir if summary["failed"] else None
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory of documents into Qdrant.")
+    parser.add_argument("directory", type=str, help="Directory to ingest (searched recursively)")
+    parser.add_argument("--collection", type=str, default=qdrant_helper.COLLECTION_NAME, help="Target collection")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--state_file", type=str, default=None, help="Progress file used to resume")
+    parser.add_argument("--quarantine_dir", type=str, default=None, help="Where failed files are copied")
+    parser.add_argument("--retry_failed", action="store_true", help="Retry previously quarantined files")
+    parser.add_argument("--batch_size", type=int, default=50, help="Chunks per embedding/upsert batch")
+    parser.add_argument("--upsert_workers", type=int, default=4, help="Concurrent upload threads")
+    parser.add_argument("--embedding_mode", choices=["exact", "pooled"], default="exact", help="Chunk embedding mode")
+    parser.add_argument("--index_workers", type=int, default=2, help="Files embedded and uploaded concurrently")
+    args = parser.parse_args()
+
+    summary = ingest_directory(
+        args.directory,
+        args.collection,
+        workers=args.workers,
+        state_path=args.state_file,
+        quarantine_dir=args.quarantine_dir,
+        retry_failed=args.retry_failed,
+        batch_size=args.batch_size,
+        upsert_workers=args.upsert_workers,
+        embedding_mode=args.embedding_mode,
+        index_workers=args.index_workers
+    )
+
+    print("\nBulk ingestion summary:")
+    print(f"  Files ingested:  {summary['files']}")
+    print(f"  Files skipped:   {summary['skipped']}")
+    print(f"  Files failed:    {summary['failed']}" + (f" (copied to {summary['quarantine_dir']})" if summary["failed"] else ""))
+    print(f"  Chunks:          {summary['chunks']} ({summary['new_chunks']} new, {summary['duplicate_chunks']} near-duplicates skipped)")
+    print(f"  Elapsed:         {summary['elapsed_s']}s")
+    print(f"  Throughput:      {summary['files_per_s']} files/s, {summary['chunks_per_s']} chunks/s")
+    print(f"  Stage busy time: {summary['stage_busy_s']}")
+
+
+if __name__ == "__main__":
+    main()
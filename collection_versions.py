@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import logging
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+COLLECTION_VERSIONS_FILE = os.getenv("COLLECTION_VERSIONS_FILE", "data/collection_versions.sqlite")
+
+_db = None
+_db_lock = threading.Lock()
+
+
+def _get_db() -> sqlite3.Connection:
+    """Open the version table once per process. Caller holds _db_lock."""
+    global _db
+    if _db is None:
+        os.makedirs(os.path.dirname(COLLECTION_VERSIONS_FILE) or ".", exist_ok=True)
+        _db = sqlite3.connect(COLLECTION_VERSIONS_FILE, check_same_thread=False, timeout=30)
+        _db.execute("CREATE TABLE IF NOT EXISTS versions (collection_name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        _db.commit()
+    return _db
+
+
+def get_collection_version(collection_name: str) -> int:
+    """
+    Current version of a collection's contents (0 if it was never changed).
+
+    Versions live in SQLite so that every process (Streamlit, bulk ingestion)
+    sees the bumps of the others.
+    """
+    with _db_lock:
+        row = _get_db().execute(
+            "SELECT version FROM versions WHERE collection_name = ?", (collection_name,)
+        ).fetchone()
+    return row[0] if row else 0
+
+
+def bump_collection_version(collection_name: str) -> int:
+    """Mark a collection as changed; results cached for earlier versions become stale."""
+    with _db_lock:
+        db = _get_db()
+        db.execute(
+            "INSERT INTO versions VALUES (?, 1) "
+            "ON CONFLICT(collection_name) DO UPDATE SET version = version + 1",
+            (collection_name,)
+        )
+        db.commit()
+        version = db.execute("SELECT version FROM versions WHERE collection_name = ?", (collection_name,)).fetchone()[0]
+    logger.info(f"Collection '{collection_name}' is now at version {version}")
+    return version
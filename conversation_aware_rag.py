@@ -1,5 +1,8 @@
+import time
+import uuid
+import hashlib
 import logging
-from typing import Dict, List, Any
+from typing import Dict
 from langchain_core.messages import SystemMessage
 from memory_manager import (
     retrieve_context_relevant_messages, 
@@ -7,7 +10,10 @@ from memory_manager import (
     store_message
 )
 from qdrant_helper import hybrid_search
+from embedding_provider import get_provider_stats
 from rag import generate_answer
+from request_context import RequestContext
+from retrieval_orchestrator import run_retrieval_legs
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,11 +29,22 @@ def answer_query_with_conversation_context(
     conversation_weight: float = 0.3,
     document_weight: float = 0.7,
     top_k_docs: int = 5,
-    top_k_conversations: int = 3
+    top_k_conversations: int = 3,
+    collection_name: str = DOCUMENT_COLLECTION,
+    request_context: RequestContext = None,
+    leg_timeouts: Dict[str, float] = None
 ):
     """
     Answer a query using both document RAG and conversation history as context.
     
+    The query is embedded once and the vector is reused for storing the
+    message, document retrieval and conversation retrieval. Document and
+    conversation retrieval run concurrently, each with its own timeout; a
+    leg that fails or times out contributes no context instead of blocking
+    the answer. The vector also keys the semantic answer cache, together with
+    the retrieved chunk IDs and the IDs of the earlier messages used as
+    conversation context (the current message is left out).
+    
     Args:
         session_id: User's session ID
         query: User query
@@ -36,32 +53,61 @@ def answer_query_with_conversation_context(
         document_weight: Weight to give document context (0-1)
         top_k_docs: Number of document chunks to retrieve
         top_k_conversations: Number of conversation segments to retrieve
+        collection_name: Qdrant collection holding the document chunks
+        request_context: Optional per-request context carrying a precomputed query vector
+        leg_timeouts: Optional {"documents": seconds, "conversation": seconds}
+            (default RETRIEVAL_TIMEOUT_S per leg)
         
     Returns:
-        Dict containing the answer and source information
+        Dict containing the answer, source information, per-leg timings and
+        query_encodes, the number of model runs during the turn (the provider's
+        counter is process-wide, so concurrent turns are included)
     """
-    # Store the current query
-    store_message(session_id, query, "user")
+    encodes_before = get_provider_stats()["encode_calls"]
+    ctx = request_context or RequestContext(query, session_id=session_id)
+    
+    # Store the current query (conversation retrieval reads it back, so this stays ahead of the fan-out)
+    query_message_id = str(uuid.uuid4())
+    store_message(session_id, query, "user", message_id=query_message_id, embedding=ctx.query_vector)
     
     # Initialize contexts
     document_context = ""
     conversation_context = ""
     all_sources = []
     
-    # 1. Get document context from RAG
-    logger.info(f"Retrieving document context for query: {query}")
-    document_chunks = hybrid_search(
-        collection_name=DOCUMENT_COLLECTION,
-        query_text=query,
-        top_k=top_k_docs
+    # 1. Retrieve document and conversation context concurrently
+    legs = {
+        "documents": lambda: hybrid_search(
+            collection_name=collection_name,
+            query_text=query,
+            top_k=top_k_docs,
+            query_vector=ctx.query_vector
+        )
+    }
+    if use_conversation_memory:
+        legs["conversation"] = lambda: retrieve_context_relevant_messages(
+            session_id=session_id,
+            query=query,
+            context_window=2,
+            top_k=top_k_conversations,
+            query_vector=ctx.query_vector
+        )
+    logger.info(f"Retrieving context for query: {query}")
+    retrieved, timings = run_retrieval_legs(
+        legs,
+        timeouts=leg_timeouts,
+        defaults={"documents": [], "conversation": []}
     )
     
+    document_chunks = retrieved["documents"]
+    context_ids = []
     if document_chunks:
         # Remove duplicates while preserving order
         unique_texts = {}
         for chunk in document_chunks:
             unique_texts[chunk["text"]] = chunk
         unique_chunks = list(unique_texts.values())
+        context_ids.extend(chunk["id"] for chunk in unique_chunks)
         
         document_context = " ".join([chunk["text"] for chunk in unique_chunks])
         all_sources.extend([{
@@ -74,18 +120,17 @@ def answer_query_with_conversation_context(
         
         logger.info(f"Retrieved {len(unique_chunks)} unique document chunks")
     
-    # 2. Get conversation context if enabled
+    # 2. Use conversation context if enabled
     if use_conversation_memory:
-        logger.info(f"Retrieving conversation context for query: {query}")
-        relevant_messages = retrieve_context_relevant_messages(
-            session_id=session_id,
-            query=query,
-            context_window=2,
-            top_k=top_k_conversations
-        )
+        relevant_messages = retrieved["conversation"]
         
         if relevant_messages:
             conversation_context = format_context_messages(relevant_messages)
+            # Key cached answers on the earlier messages used: the current turn always
+            # matches itself and would make every key unique
+            earlier_ids = sorted(msg.id for msg in relevant_messages if msg.id and msg.id != query_message_id)
+            if earlier_ids:
+                context_ids.append("conversation:" + hashlib.sha1("\n".join(earlier_ids).encode("utf-8")).hexdigest())
             all_sources.extend([{
                 "type": "conversation",
                 "text": msg.content,
@@ -117,7 +162,17 @@ def answer_query_with_conversation_context(
         
         # 4. Generate answer using combined context
         logger.info("Generating answer using combined context")
-        answer = generate_answer(query, combined_context)
+        start = time.perf_counter()
+        answer = generate_answer(
+            query, combined_context,
+            query_vector=ctx.query_vector,
+            chunk_ids=context_ids,
+            collection_name=collection_name
+        )
+        timings["generate"] = {"status": "ok", "ms": round((time.perf_counter() - start) * 1000, 1)}
+    
+    # Model runs up to the answer; storing it below encodes the answer text
+    query_encodes = get_provider_stats()["encode_calls"] - encodes_before
     
     # 5. Store the response
     store_message(session_id, answer, "assistant")
@@ -127,7 +182,9 @@ def answer_query_with_conversation_context(
         "answer": answer,
         "sources": all_sources,
         "document_context_used": bool(document_context),
-        "conversation_context_used": bool(conversation_context)
+        "conversation_context_used": bool(conversation_context),
+        "query_encodes": query_encodes,
+        "timings": timings
     }
 
 def create_context_message(context_sources):
@@ -1,77 +1,356 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 import os
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Iterator, Tuple
 import uuid
 import logging
 from fuzzywuzzy import fuzz, process
+from langchain_core.documents import Document
 
-def load_and_chunk_documents_with_multiple_strategies(
-    file_path: str, 
-    chunk_strategies: List[Dict[str, int]] = None
-) -> Dict[str, List]:
+from index_manifest import content_hash
+
+# Default multi-strategy chunk sizes (characters)
+DEFAULT_CHUNK_STRATEGIES = [
+    {"id": "small", "chunk_size": 500, "chunk_overlap": 50},
+    {"id": "medium", "chunk_size": 1000, "chunk_overlap": 100},
+    {"id": "large", "chunk_size": 2000, "chunk_overlap": 200},
+]
+
+# Boundaries used for the base segmentation, from strongest to weakest
+SEGMENT_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+# Cap chunks at this many model tokens: "" = off, "model" = the embedding model's limit, or a number
+CHUNK_MAX_TOKENS = os.getenv("CHUNK_MAX_TOKENS", "")
+
+class ChunkRecord:
     """
-    Load a document and chunk it using multiple strategies.
+    Compact chunk: a reference to the source text plus start/end offsets.
+    
+    Behaves like a LangChain Document (page_content, metadata) without copying
+    anything per chunk: page_content slices the shared source text on access,
+    and metadata is assembled on access from the source document's metadata
+    (shared by all of its chunks) and the chunk's own fields. Text and metadata
+    are therefore only materialized while a chunk is embedded or stored.
+    
+    A chunk that was split to fit the embedding model's token limit is one
+    piece of a larger logical chunk, described by logical.
+    
+    The returned metadata is a fresh dict; change per-chunk fields through the
+    attributes instead.
+    """
+    __slots__ = ("text", "start", "end", "source_metadata", "doc_index", "chunk_type", "parent", "content_hash", "logical")
+    
+    def __init__(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        source_metadata: Dict[str, Any],
+        doc_index: int,
+        chunk_type: str = None,
+        parent: Tuple[str, int, str] = None,
+        content_hash: str = None,
+        logical: Tuple[int, int, str, int, int] = None
+    ):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.source_metadata = source_metadata
+        self.doc_index = doc_index
+        self.chunk_type = chunk_type
+        self.parent = parent  # (strategy, start_index, content_hash) of the enclosing chunk
+        self.content_hash = content_hash
+        self.logical = logical  # (start, end, content_hash, segment, segments) of the logical chunk
+    
+    @property
+    def page_content(self) -> str:
+        return self.text[self.start:self.end]
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        metadata = {**self.source_metadata, "doc_index": self.doc_index}
+        if self.chunk_type == "rolling_window":
+            metadata.update(chunk_start=self.start, chunk_end=self.end, chunk_type=self.chunk_type)
+        else:
+            metadata["start_index"] = self.start
+        if self.parent is not None:
+            strategy, start_index, parent_hash = self.parent
+            metadata["parent"] = {"strategy": strategy, "start_index": start_index, "content_hash": parent_hash}
+        if self.logical is not None:
+            start, end, logical_hash, segment, segments = self.logical
+            metadata["logical_chunk"] = {
+                "start_index": start,
+                "end_index": end,
+                "content_hash": logical_hash,
+                "segment": segment,
+                "segments": segments
+            }
+        return metadata
+    
+    def to_document(self) -> Document:
+        """Materialize as a standalone LangChain Document."""
+        return Document(page_content=self.page_content, metadata=self.metadata)
+    
+    def __repr__(self) -> str:
+        return f"ChunkRecord(doc_index={self.doc_index}, start={self.start}, end={self.end}, chunk_type={self.chunk_type!r})"
+
+def iter_documents(file_path: str) -> Iterator:
+    """
+    Load a document with the loader matching its file extension, yielding
+    Documents as they become available.
+    
+    PDFs are extracted page-parallel by pdf_loader and streamed page by page,
+    so chunking can start before the whole file is parsed. Scanned pages are
+    OCR'd on the way (see pdf_loader.ocr_missing_text).
     
     Args:
         file_path: Path to the document
-        chunk_strategies: List of dictionaries containing chunk_size and chunk_overlap
-            
-    Returns:
-        Dictionary with strategy_id as key and list of chunks as value
+        
+    Yields:
+        LangChain Documents (one per page for PDFs)
     """
     if not os.path.isfile(file_path):
         raise FileNotFoundError(f"File '{file_path}' not found. Please check the file path.")
     
-    # Default strategies if none provided
-    if not chunk_strategies:
-        chunk_strategies = [
-            {"id": "small", "chunk_size": 500, "chunk_overlap": 50},
-            {"id": "medium", "chunk_size": 1000, "chunk_overlap": 100},
-            {"id": "large", "chunk_size": 2000, "chunk_overlap": 200},
-        ]
-    
     # Determine loader based on file extension
     if file_path.endswith('.pdf'):
-        from langchain_community.document_loaders import PyPDFLoader
-        loader = PyPDFLoader(file_path)
+        from pdf_loader import iter_pdf_pages
+        yield from iter_pdf_pages(file_path)
+        return
     elif file_path.endswith('.docx'):
         from langchain_community.document_loaders import Docx2txtLoader
         loader = Docx2txtLoader(file_path)
-    elif file_path.endswith('.md'):
-        from langchain_community.document_loaders import UnstructuredMarkdownLoader
-        from langchain_core.documents import Document
-
-        # markdown_path = "../../../README.md"
-        loader = UnstructuredMarkdownLoader(file_path)
-        # assert len(data) == 1
-        # assert isinstance(data[0], Document)
-        # readme_content = data[0].page_content
-        # print(readme_content[:250])
-        
     else:
+        # Markdown is loaded as raw text, like large files in streaming_chunker,
+        # so a file gets the same chunks whichever side of the threshold it is on
         from langchain_community.document_loaders import TextLoader
         loader = TextLoader(file_path)
     
-    # Load the document
-    documents = loader.load()
+    yield from loader.lazy_load()
+
+def load_documents(file_path: str) -> List:
+    """
+    Load a document with the loader matching its file extension.
     
-    # Apply each chunking strategy
-    all_chunks = {}
-    for strategy in chunk_strategies:
-        strategy_id = strategy["id"]
-        chunk_size = strategy["chunk_size"]
-        chunk_overlap = strategy["chunk_overlap"]
+    Args:
+        file_path: Path to the document
         
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size, 
-            chunk_overlap=chunk_overlap
-        )
-        chunks = text_splitter.split_documents(documents)
-        all_chunks[strategy_id] = chunks
+    Returns:
+        List of LangChain Documents (one per page for PDFs)
+    """
+    return list(iter_documents(file_path))
+
+def _split_span(text: str, start: int, end: int, max_size: int, separators: List[str]) -> List[Tuple[int, int]]:
+    """Split text[start:end] into contiguous spans of at most max_size at the strongest possible boundary."""
+    if end - start <= max_size:
+        return [(start, end)]
+    
+    separator, remaining = separators[0], separators[1:]
+    if separator == "":
+        return [(i, min(i + max_size, end)) for i in range(start, end, max_size)]
+    
+    # Cut after each separator so the pieces cover the span without gaps
+    pieces = []
+    piece_start = start
+    position = text.find(separator, start, end)
+    while position != -1:
+        piece_end = position + len(separator)
+        pieces.append((piece_start, piece_end))
+        piece_start = piece_end
+        position = text.find(separator, piece_start, end)
+    if piece_start < end:
+        pieces.append((piece_start, end))
+    
+    spans = []
+    for piece_start, piece_end in pieces:
+        if piece_end - piece_start > max_size:
+            spans.extend(_split_span(text, piece_start, piece_end, max_size, remaining))
+        elif spans and piece_end - spans[-1][0] <= max_size:
+            # Merge small neighbouring pieces up to max_size
+            spans[-1] = (spans[-1][0], piece_end)
+        else:
+            spans.append((piece_start, piece_end))
+    return spans
+
+def segment_text(text: str, max_size: int) -> List[Tuple[int, int]]:
+    """
+    Base segmentation of a text: contiguous (start, end) offset ranges of at
+    most max_size characters, cut at paragraph, line, sentence or word
+    boundaries where possible.
+    """
+    if not text:
+        return []
+    return _split_span(text, 0, len(text), max_size, SEGMENT_SEPARATORS)
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Shrink a span so it does not start or end with whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+def pack_segments(
+    text: str,
+    segments: List[Tuple[int, int]],
+    chunk_size: int,
+    chunk_overlap: int
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Group consecutive base segments into chunks of at most chunk_size characters,
+    each overlapping the previous one by at most chunk_overlap characters.
+    
+    Returns:
+        List of (start, end, first_segment, last_segment) tuples
+    """
+    chunks = []
+    n = len(segments)
+    first = 0
+    while first < n:
+        last = first
+        while last + 1 < n and segments[last + 1][1] - segments[first][0] <= chunk_size:
+            last += 1
+        start, end = _strip_span(text, segments[first][0], segments[last][1])
+        if start < end:
+            chunks.append((start, end, first, last))
+        if last == n - 1:
+            break
+        # Step back over trailing segments that fit in the overlap
+        next_first = last + 1
+        while next_first - 1 > first and segments[last][1] - segments[next_first - 1][0] <= chunk_overlap:
+            next_first -= 1
+        first = next_first
+    return chunks
+
+def base_segment_size_for(levels: List[Dict[str, int]]) -> int:
+    """Default base segment length: the smallest overlap, so every overlap can be honoured."""
+    return max(1, min(
+        min(strategy["chunk_overlap"] for strategy in levels) or levels[0]["chunk_size"],
+        levels[0]["chunk_size"]
+    ))
+
+def _link_parents(children: List[ChunkRecord], parents: List[ChunkRecord], parent_strategy: str):
+    """Point each child chunk at the parent chunk it overlaps most (two-pointer sweep over sorted spans)."""
+    p = 0
+    for child in children:
+        while p + 1 < len(parents) and parents[p + 1].start <= child.start:
+            p += 1
+        best, best_overlap = None, -1
+        for candidate in parents[p:p + 2]:
+            overlap = min(child.end, candidate.end) - max(child.start, candidate.start)
+            if overlap > best_overlap:
+                best, best_overlap = candidate, overlap
+        if best is not None:
+            child.parent = (parent_strategy, best.start, best.content_hash)
+
+def build_chunk_views(
+    documents: List,
+    chunk_strategies: List[Dict[str, int]] = None,
+    rolling_window: Dict[str, int] = None,
+    base_segment_size: int = None,
+    max_tokens=None
+) -> Dict[str, List]:
+    """
+    Chunk documents for every strategy from a single base segmentation.
+    
+    Each document is segmented once; every strategy (and the optional rolling
+    window) is then derived as offset ranges over that text. Chunks of each
+    level carry a link to the overlapping chunk of the next larger level in
+    metadata["parent"], so a small-chunk hit can be expanded to its enclosing
+    large chunk without another search. metadata["doc_index"] and the chunk's
+    offsets locate it in its source document (used for pooled embeddings).
+    
+    Chunks are ChunkRecords that reference the document text by offset, so
+    overlapping views do not multiply the memory held by the text.
+    
+    With max_tokens set, chunk length is also measured with the embedding
+    model's tokenizer and chunks the model would truncate are split into
+    several pieces (vectors) that share one logical chunk (see
+    token_chunking.split_oversized_chunks).
+    
+    Args:
+        documents: Loaded documents (any iterable; consumed one document at a time)
+        chunk_strategies: List of dictionaries with id, chunk_size and chunk_overlap
+        rolling_window: Optional {"window_size": ..., "step_size": ...} for a rolling window view
+        base_segment_size: Maximum base segment length (default: smallest overlap)
+        max_tokens: Token cap per chunk: a number, "model" for the model's limit,
+            or 0 to disable (default: CHUNK_MAX_TOKENS)
+        
+    Returns:
+        Dictionary with strategy_id as key and list of ChunkRecords as value
+    """
+    chunk_strategies = chunk_strategies or DEFAULT_CHUNK_STRATEGIES
+    levels = sorted(chunk_strategies, key=lambda strategy: strategy["chunk_size"])
+    if base_segment_size is None:
+        base_segment_size = base_segment_size_for(levels)
+    
+    views = {strategy["id"]: [] for strategy in chunk_strategies}
+    if rolling_window:
+        views["rolling_window"] = []
+    
+    for doc_index, doc in enumerate(documents):
+        text = doc.page_content
+        segments = segment_text(text, base_segment_size)
         
+        chunks_by_level = []
+        for strategy in levels:
+            chunks_by_level.append([
+                ChunkRecord(text, start, end, doc.metadata, doc_index, content_hash=content_hash(text[start:end]))
+                for start, end, _, _ in pack_segments(text, segments, strategy["chunk_size"], strategy["chunk_overlap"])
+            ])
+        for level in range(len(levels) - 1):
+            _link_parents(chunks_by_level[level], chunks_by_level[level + 1], levels[level + 1]["id"])
+        
+        for strategy, chunks in zip(levels, chunks_by_level):
+            views[strategy["id"]].extend(chunks)
+        
+        if rolling_window:
+            window_size = rolling_window.get("window_size", 1000)
+            step_size = rolling_window.get("step_size", 200)
+            if len(text) <= window_size:
+                views["rolling_window"].append(ChunkRecord(text, 0, len(text), doc.metadata, doc_index, chunk_type="rolling_window"))
+                continue
+            views["rolling_window"].extend(
+                ChunkRecord(text, i, i + window_size, doc.metadata, doc_index, chunk_type="rolling_window")
+                for i in range(0, len(text) - window_size + 1, step_size)
+            )
+    
+    if max_tokens != 0 and (max_tokens or CHUNK_MAX_TOKENS):
+        from token_chunking import resolve_max_tokens, split_oversized_chunks
+        token_limit = resolve_max_tokens(max_tokens)
+        if token_limit:
+            views = {strategy_id: split_oversized_chunks(chunks, token_limit) for strategy_id, chunks in views.items()}
+    
+    for strategy_id, chunks in views.items():
         logging.info(f"Strategy '{strategy_id}' generated {len(chunks)} chunks")
+    return views
+
+def load_and_chunk_documents_with_multiple_strategies(
+    file_path: str, 
+    chunk_strategies: List[Dict[str, int]] = None,
+    rolling_window: Dict[str, int] = None,
+    max_tokens=None
+) -> Dict[str, List]:
+    """
+    Load a document and chunk it using multiple strategies.
     
-    return all_chunks
+    The document is parsed once and all strategies are derived from a single
+    base segmentation (see build_chunk_views). Pages are chunked as they are
+    extracted. Text and markdown files above STREAMING_THRESHOLD_MB are never
+    read whole: their strategies are generators that stream the file (see
+    streaming_chunker.stream_chunk_views).
+    
+    Args:
+        file_path: Path to the document
+        chunk_strategies: List of dictionaries containing chunk_size and chunk_overlap
+        rolling_window: Optional {"window_size": ..., "step_size": ...}; adds a "rolling_window" strategy
+        max_tokens: Token cap per chunk (see build_chunk_views); not applied to streamed files
+            
+    Returns:
+        Dictionary with strategy_id as key and list (or generator) of chunks as value
+    """
+    from streaming_chunker import should_stream, stream_chunk_views
+    if os.path.isfile(file_path) and should_stream(file_path):
+        return stream_chunk_views(file_path, chunk_strategies, rolling_window)
+    return build_chunk_views(iter_documents(file_path), chunk_strategies, rolling_window, max_tokens=max_tokens)
 
 def create_rolling_window_chunks(
     documents, 
@@ -87,34 +366,23 @@ def create_rolling_window_chunks(
         step_size: How much to move the window for each new chunk
         
     Returns:
-        List of chunks
+        List of chunks (ChunkRecords referencing the document text)
     """
     rolling_chunks = []
     
-    for doc in documents:
+    for doc_index, doc in enumerate(documents):
         text = doc.page_content
-        metadata = doc.metadata
         
         # For very short documents, just use the document as is
         if len(text) <= window_size:
             rolling_chunks.append(doc)
             continue
         
-        # Create rolling window chunks
-        for i in range(0, len(text) - window_size + 1, step_size):
-            chunk_text = text[i:i + window_size]
-            
-            # Create new metadata with position info
-            chunk_metadata = metadata.copy()
-            chunk_metadata.update({
-                "chunk_start": i,
-                "chunk_end": i + window_size,
-                "chunk_type": "rolling_window"
-            })
-            
-            from langchain.schema import Document
-            chunk = Document(page_content=chunk_text, metadata=chunk_metadata)
-            rolling_chunks.append(chunk)
+        # Create rolling window chunks as offsets into the shared text
+        rolling_chunks.extend(
+            ChunkRecord(text, i, i + window_size, doc.metadata, doc_index, chunk_type="rolling_window")
+            for i in range(0, len(text) - window_size + 1, step_size)
+        )
     
     logging.info(f"Rolling window approach generated {len(rolling_chunks)} chunks")
     return rolling_chunks
\ No newline at end of file
@@ -0,0 +1,184 @@
+import os
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Sequence
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_CACHE_DIR = "data/embedding_cache"
+DEFAULT_MAX_ENTRIES = 200_000
+RECENCY_FLUSH_EVERY = 256  # buffered lookups after which their recency is written to the index
+
+
+def make_cache_key(model_name: str, text: str) -> str:
+    """Content-addressed key for a (model, text) pair."""
+    return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache.
+
+    Vectors live in a fixed-size memory-mapped matrix (``vectors.bin``); a SQLite
+    index (``index.sqlite``) maps each key to its row. When the cache is full the
+    least recently used rows are reused. The cache is thread-safe, and several
+    processes can share one directory: rows are allocated and written under the
+    SQLite write lock, and lookups read vectors inside a read transaction, so a
+    row is never overwritten while another process is reading it.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        dimension: int = 384,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        dtype: str = "float16"
+    ):
+        self.cache_dir = cache_dir
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._touched = OrderedDict()  # keys read since the last flush, in access order
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False, timeout=30)
+        # Readers must block writers (see _transaction), which WAL mode would not do
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._db.commit()
+
+        layout = f"{self.dimension}:{self.max_entries}:{self.dtype.name}"
+        vectors_path = os.path.join(cache_dir, "vectors.bin")
+        with self._transaction("EXCLUSIVE"):
+            stored_layout = self._db.execute("SELECT value FROM meta WHERE name = 'layout'").fetchone()
+            if stored_layout is None or stored_layout[0] != layout or not os.path.exists(vectors_path):
+                if stored_layout is not None:
+                    logger.info(f"Embedding cache layout changed ({stored_layout[0]} -> {layout}), resetting cache")
+                self._db.execute("DELETE FROM entries")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('layout', ?)", (layout,))
+                mode = "w+"
+            else:
+                mode = "r+"
+            self._vectors = np.memmap(vectors_path, dtype=self.dtype, mode=mode, shape=(max_entries, dimension))
+        logger.info(f"Embedding cache opened at '{cache_dir}' with {len(self)} entries")
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @contextmanager
+    def _transaction(self, mode: str = "DEFERRED"):
+        """
+        SQLite transaction around a read or write of the vectors. A deferred
+        transaction holds a shared lock once it has read the index, and an
+        exclusive one waits for every shared lock to be released, so a row is
+        never rewritten by one process while another is copying it out.
+        """
+        self._db.execute(f"BEGIN {mode}")
+        try:
+            yield
+            self._db.commit()
+        except BaseException:
+            self._db.rollback()
+            raise
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors (as float32) for the keys that are present."""
+        found = {}
+        with self._lock:
+            with self._transaction():
+                for start in range(0, len(keys), 500):
+                    batch = list(keys[start:start + 500])
+                    placeholders = ",".join("?" * len(batch))
+                    rows = dict(self._db.execute(f"SELECT key, row FROM entries WHERE key IN ({placeholders})", batch))
+                    for key in batch:
+                        row = rows.get(key)
+                        if row is None:
+                            self.misses += 1
+                            continue
+                        self._touch(key)
+                        # Copy: a view into the memmap would change when the row is reused
+                        found[key] = np.array(self._vectors[row], dtype=np.float32)
+                        self.hits += 1
+            # Recency is buffered: writing it on every lookup would take the write lock each time
+            if len(self._touched) >= RECENCY_FLUSH_EVERY:
+                with self._transaction("IMMEDIATE"):
+                    self._persist_recency()
+        return found
+
+    def put_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Store vectors for the given keys, evicting least recently used rows if full."""
+        with self._lock:
+            with self._transaction("EXCLUSIVE"):
+                # Record what this process has read first, so those rows are not the ones evicted
+                self._persist_recency()
+                count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                clock = self._db.execute("SELECT COALESCE(MAX(last_used), 0) FROM entries").fetchone()[0]
+                for key, vector in zip(keys, vectors):
+                    existing = self._db.execute("SELECT row FROM entries WHERE key = ?", (key,)).fetchone()
+                    if existing is not None:
+                        row = existing[0]
+                    elif count < self.max_entries:
+                        row = count  # rows 0 .. count-1 are in use
+                        count += 1
+                    else:
+                        evicted_key, row = self._db.execute(
+                            "SELECT key, row FROM entries ORDER BY last_used LIMIT 1"
+                        ).fetchone()
+                        self._db.execute("DELETE FROM entries WHERE key = ?", (evicted_key,))
+                        self.evictions += 1
+                    self._vectors[row] = np.asarray(vector, dtype=self.dtype)
+                    clock += 1
+                    self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, row, clock))
+                self._vectors.flush()
+
+    def flush(self):
+        """Persist pending LRU order updates."""
+        with self._lock:
+            with self._transaction("IMMEDIATE"):
+                self._persist_recency()
+
+    def _touch(self, key: str):
+        self._touched.pop(key, None)
+        self._touched[key] = True
+
+    def _persist_recency(self):
+        """Write the buffered access order to the index. Caller holds _lock inside a write transaction."""
+        if not self._touched:
+            return
+        clock = self._db.execute("SELECT COALESCE(MAX(last_used), 0) FROM entries").fetchone()[0]
+        # UPDATE rather than INSERT: a key another process has evicted meanwhile stays evicted
+        self._db.executemany(
+            "UPDATE entries SET last_used = ? WHERE key = ?",
+            [(clock + i, key) for i, key in enumerate(self._touched, start=1)]
+        )
+        self._touched.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and current size."""
+        return {
+            "cache_dir": self.cache_dir,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
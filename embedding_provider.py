@@ -0,0 +1,284 @@
+import os
+import time
+import logging
+import threading
+from typing import List, Dict, Any
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache, make_cache_key
+from embedding_scheduler import EmbeddingBatcher
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE")  # None = cuda if available, else cpu
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # 0 = leave torch default
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" or "onnx"
+EMBEDDING_ONNX_QUANTIZE = os.getenv("EMBEDDING_ONNX_QUANTIZE", "0") == "1"
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "data/onnx_models")
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/embedding_cache")  # "" disables the cache
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")
+EMBEDDING_QUERY_MAX_BATCH = int(os.getenv("EMBEDDING_QUERY_MAX_BATCH", "32"))
+EMBEDDING_QUERY_MAX_WAIT_MS = float(os.getenv("EMBEDDING_QUERY_MAX_WAIT_MS", "5"))
+
+# Shared model state, initialized on first use
+_model = None
+_cache = None
+_query_batcher = None
+_model_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_config = {
+    "model_name": EMBEDDING_MODEL,
+    "device": EMBEDDING_DEVICE,
+    "threads": EMBEDDING_THREADS,
+    "batch_size": EMBEDDING_BATCH_SIZE,
+    "backend": EMBEDDING_BACKEND,
+    "onnx_quantize": EMBEDDING_ONNX_QUANTIZE,
+}
+_stats = {
+    "load_time_s": None,
+    "rss_before_load_mb": None,
+    "rss_after_load_mb": None,
+    "encode_calls": 0,
+    "texts_encoded": 0,
+}
+
+
+def _current_rss_mb() -> float:
+    """Return the resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Not on Linux: fall back to peak RSS (KB on Linux, bytes on macOS)
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def configure_embedding_provider(
+    model_name: str = None,
+    device: str = None,
+    threads: int = None,
+    batch_size: int = None,
+    backend: str = None,
+    onnx_quantize: bool = None
+):
+    """
+    Override the provider configuration. Must be called before the model is loaded.
+
+    Args:
+        model_name: SentenceTransformer model name
+        device: Torch device ("cpu", "cuda", ...)
+        threads: Number of intra-op CPU threads (0 = default)
+        batch_size: Maximum number of texts per forward pass
+        backend: "torch" (SentenceTransformer) or "onnx" (ONNX Runtime, CPU only)
+        onnx_quantize: Use the dynamically int8-quantized ONNX graph
+    """
+    with _model_lock:
+        if _model is not None:
+            raise RuntimeError("Embedding model already loaded; configure the provider before first use")
+        if model_name is not None:
+            _config["model_name"] = model_name
+        if device is not None:
+            _config["device"] = device
+        if threads is not None:
+            _config["threads"] = threads
+        if batch_size is not None:
+            _config["batch_size"] = batch_size
+        if backend is not None:
+            _config["backend"] = backend
+        if onnx_quantize is not None:
+            _config["onnx_quantize"] = onnx_quantize
+
+
+def _load_torch_model():
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    device = _config["device"] or ('cuda' if torch.cuda.is_available() else 'cpu')
+    if _config["threads"] > 0:
+        torch.set_num_threads(_config["threads"])
+    _config["device"] = device
+    return SentenceTransformer(_config["model_name"], device=device)
+
+
+def _load_onnx_model():
+    from onnx_embedder import OnnxEmbedder
+
+    _config["device"] = "cpu"
+    return OnnxEmbedder(
+        _config["model_name"],
+        onnx_dir=EMBEDDING_ONNX_DIR,
+        quantize=_config["onnx_quantize"],
+        threads=_config["threads"]
+    )
+
+
+def get_embedding_model():
+    """
+    Return the process-wide embedding model, loading it on first call.
+
+    Depending on the configured backend this is a SentenceTransformer or an
+    OnnxEmbedder; both expose encode() and get_sentence_embedding_dimension().
+    """
+    global _model
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        if _model is None:
+            if _config["backend"] not in ("torch", "onnx"):
+                raise ValueError(f"Unknown embedding backend '{_config['backend']}'")
+
+            rss_before = _current_rss_mb()
+            start = time.perf_counter()
+            model = _load_onnx_model() if _config["backend"] == "onnx" else _load_torch_model()
+            _stats["load_time_s"] = time.perf_counter() - start
+            _stats["rss_before_load_mb"] = rss_before
+            _stats["rss_after_load_mb"] = _current_rss_mb()
+
+            logger.info(
+                f"Loaded embedding model '{get_model_signature()}' on {_config['device']} in "
+                f"{_stats['load_time_s']:.2f}s (RSS {rss_before:.0f} MB -> {_stats['rss_after_load_mb']:.0f} MB)"
+            )
+            _model = model
+    return _model
+
+
+def get_embedding_dimension() -> int:
+    """Return the dimension of the vectors produced by the shared model."""
+    return get_embedding_model().get_sentence_embedding_dimension()
+
+
+def get_tokenizer():
+    """Tokenizer of the shared model, for measuring text in model tokens."""
+    return get_embedding_model().tokenizer
+
+
+def get_max_seq_length() -> int:
+    """Maximum input length of the shared model in tokens (special tokens included); longer input is truncated."""
+    return get_embedding_model().max_seq_length
+
+
+def get_model_signature() -> str:
+    """Identifier of the model and backend that produce the vectors, used to key cached embeddings."""
+    if _config["backend"] == "onnx":
+        return f"{_config['model_name']}:onnx-int8" if _config["onnx_quantize"] else f"{_config['model_name']}:onnx"
+    return _config["model_name"]
+
+
+def get_embedding_cache():
+    """Return the shared on-disk embedding cache, or None if caching is disabled."""
+    global _cache
+    if _cache is None and EMBEDDING_CACHE_DIR:
+        dimension = get_embedding_dimension()
+        with _model_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    cache_dir=EMBEDDING_CACHE_DIR,
+                    dimension=dimension,
+                    max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+                    dtype=EMBEDDING_CACHE_DTYPE
+                )
+    return _cache
+
+
+def _encode_with_model(texts: List[str]) -> np.ndarray:
+    """Run the model on texts, bypassing the cache."""
+    model = get_embedding_model()
+    embeddings = model.encode(
+        texts,
+        batch_size=_config["batch_size"],
+        convert_to_tensor=False,
+        show_progress_bar=False
+    )
+    with _stats_lock:
+        _stats["encode_calls"] += 1
+        _stats["texts_encoded"] += len(texts)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def encode_documents(texts: List[str], use_cache: bool = True) -> List[List[float]]:
+    """
+    Encode a list of texts with the shared model.
+
+    Texts already present in the embedding cache (and duplicates within the
+    list) are not sent to the model again.
+
+    Args:
+        texts: Texts to encode
+        use_cache: Whether to consult and fill the embedding cache
+
+    Returns:
+        List of embedding vectors, one per input text
+    """
+    if not texts:
+        return []
+
+    cache = get_embedding_cache() if use_cache else None
+    if cache is None:
+        return _encode_with_model(texts).tolist()
+
+    signature = get_model_signature()
+    keys = [make_cache_key(signature, text) for text in texts]
+    vectors = cache.get_many(list(dict.fromkeys(keys)))
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors:
+            missing[key] = text
+    if missing:
+        new_vectors = _encode_with_model(list(missing.values()))
+        cache.put_many(list(missing.keys()), new_vectors)
+        vectors.update(zip(missing.keys(), new_vectors))
+
+    return [vectors[key].tolist() for key in keys]
+
+
+def get_query_batcher() -> EmbeddingBatcher:
+    """Return the shared micro-batching scheduler used for single-text encodes."""
+    global _query_batcher
+    if _query_batcher is None:
+        with _model_lock:
+            if _query_batcher is None:
+                _query_batcher = EmbeddingBatcher(
+                    encode_documents,
+                    max_batch_size=EMBEDDING_QUERY_MAX_BATCH,
+                    max_wait_ms=EMBEDDING_QUERY_MAX_WAIT_MS
+                )
+    return _query_batcher
+
+
+def encode_query(text: str) -> List[float]:
+    """
+    Encode a single query or message text.
+
+    Concurrent calls are coalesced by the query batcher into one forward pass.
+    """
+    return get_query_batcher().encode(text)
+
+
+async def aencode_query(text: str) -> List[float]:
+    """Asyncio variant of encode_query."""
+    return await get_query_batcher().aencode(text)
+
+
+def get_provider_stats() -> Dict[str, Any]:
+    """Return configuration, load time, memory and usage counters of the provider."""
+    return {
+        **_config,
+        **_stats,
+        "loaded": _model is not None,
+        "rss_mb": _current_rss_mb(),
+        "cache": _cache.stats() if _cache is not None else None,
+        "query_batcher": _query_batcher.stats() if _query_batcher is not None else None,
+    }
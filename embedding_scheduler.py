@@ -0,0 +1,161 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, List, Dict, Any
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upper bounds (inclusive) of the histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+def _bucket(value: float, bounds: List[float]) -> str:
+    for bound in bounds:
+        if value <= bound:
+            return f"<={bound}"
+    return f">{bounds[-1]}"
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class EmbeddingBatcher:
+    """
+    Dynamic micro-batching front end for an encode function.
+
+    Concurrent callers enqueue single texts; a worker thread collects requests
+    until ``max_batch_size`` is reached or ``max_wait_ms`` has passed since the
+    first request of the batch, encodes them with one call and resolves every
+    caller's future with its own vector. A request that finds nobody else
+    waiting is encoded at once, so only callers under contention pay the wait.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        latency_window: int = 10_000
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self._batches = 0
+        self._requests = 0
+        self._max_queue_depth = 0
+        self._batch_size_hist = {}
+        self._latency_hist = {}
+        self._latencies_ms = deque(maxlen=latency_window)
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                worker.start()
+                self._worker = worker
+
+    def submit(self, text: str) -> Future:
+        """Enqueue a text and return a future that resolves to its vector."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+        return future
+
+    def encode(self, text: str, timeout: float = None) -> List[float]:
+        """Encode a single text, blocking until its batch has run."""
+        return self.submit(text).result(timeout=timeout)
+
+    async def aencode(self, text: str) -> List[float]:
+        """Asyncio front end: encode a single text without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect_batch(self) -> List:
+        batch = [self._queue.get()]
+        if self._queue.empty():
+            # Lone request and no encode running: waiting would only add latency.
+            # Requests arriving meanwhile queue up and form the next batch.
+            return batch
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Window closed: still take whatever is already waiting
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Skip callers that cancelled while waiting in the queue
+            batch = [item for item in self._collect_batch() if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            texts = [text for text, _, _ in batch]
+            try:
+                vectors = self.encode_fn(texts)
+            except Exception as e:
+                logger.error(f"Batched encode of {len(texts)} texts failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            for (_, future, enqueued), vector in zip(batch, vectors):
+                future.set_result(vector)
+            self._record(len(batch), [(finished - enqueued) * 1000.0 for _, _, enqueued in batch])
+
+    def _record(self, batch_size: int, latencies_ms: List[float]):
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += batch_size
+            size_bucket = _bucket(batch_size, BATCH_SIZE_BUCKETS)
+            self._batch_size_hist[size_bucket] = self._batch_size_hist.get(size_bucket, 0) + 1
+            for latency in latencies_ms:
+                latency_bucket = _bucket(latency, LATENCY_BUCKETS_MS)
+                self._latency_hist[latency_bucket] = self._latency_hist.get(latency_bucket, 0) + 1
+            self._latencies_ms.extend(latencies_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, batch-size and latency histograms for tuning the wait window."""
+        with self._stats_lock:
+            latencies = list(self._latencies_ms)
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "requests": self._requests,
+                "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+                "batch_size_histogram": dict(self._batch_size_hist),
+                "latency_ms_histogram": dict(self._latency_hist),
+                "latency_ms_p50": _percentile(latencies, 50),
+                "latency_ms_p99": _percentile(latencies, 99),
+            }
@@ -1,12 +1,8 @@
-from sentence_transformers import SentenceTransformer
-import torch
-
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-embeddings_model = SentenceTransformer('all-MiniLM-L6-v2', device=device)
+from embedding_provider import encode_documents, get_provider_stats
 
 def generate_embeddings(chunks):
     texts = [chunk.page_content for chunk in chunks]
-    embeddings = embeddings_model.encode(texts)
+    embeddings = encode_documents(texts)
     return embeddings
 
 # Example usage
@@ -15,3 +11,4 @@ if __name__ == '__main__':
     sample_chunks = [Document(page_content='Sample text for embedding generation.')]
     embeddings = generate_embeddings(sample_chunks)
     print(embeddings)
+    print(get_provider_stats())
@@ -0,0 +1,241 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+MANIFEST_DIR = os.getenv("INDEX_MANIFEST_DIR", "data/index_manifests")
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c1d52-5b7e-4d8a-9a57-0f3c2f6f4b1e")
+
+_dbs: Dict[str, sqlite3.Connection] = {}
+_manifest_lock = threading.Lock()
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of chunk text."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def chunk_offset(metadata: Dict[str, Any], chunk_index: int) -> str:
+    """
+    Position of a chunk inside its document.
+
+    Uses the page (for paginated sources) plus the character start offset
+    recorded by the splitter; falls back to the chunk's index in its strategy.
+    """
+    start = metadata.get("start_index", metadata.get("chunk_start"))
+    if start is None:
+        start = f"#{chunk_index}"
+    page = metadata.get("page")
+    return f"{page}:{start}" if page is not None else str(start)
+
+
+def chunk_point_id(document_id: str, strategy: str, offset: str, text_hash: str) -> str:
+    """Deterministic Qdrant point ID for a chunk."""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{document_id}|{strategy}|{offset}|{text_hash}"))
+
+
+def _legacy_manifest_path(collection_name: str, document_id: str) -> str:
+    document_key = hashlib.sha1(document_id.encode("utf-8")).hexdigest()
+    return os.path.join(MANIFEST_DIR, collection_name, f"{document_key}.json")
+
+
+def _get_db(collection_name: str) -> sqlite3.Connection:
+    """The manifest table of a collection, opened once per process. Caller holds _manifest_lock."""
+    db = _dbs.get(collection_name)
+    if db is None:
+        os.makedirs(MANIFEST_DIR, exist_ok=True)
+        db = sqlite3.connect(os.path.join(MANIFEST_DIR, f"{collection_name}.sqlite"), check_same_thread=False, timeout=30)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS points ("
+            "document_id TEXT NOT NULL, point_id TEXT NOT NULL, strategy TEXT NOT NULL, run INTEGER NOT NULL, "
+            "PRIMARY KEY (document_id, point_id))"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS documents (document_id TEXT PRIMARY KEY, run INTEGER NOT NULL, embedding TEXT)"
+        )
+        if "embedding" not in [column[1] for column in db.execute("PRAGMA table_info(documents)")]:
+            db.execute("ALTER TABLE documents ADD COLUMN embedding TEXT")
+        db.commit()
+        _dbs[collection_name] = db
+    return db
+
+
+class DocumentManifest:
+    """
+    The points indexed for one document, kept in SQLite instead of memory.
+
+    Each indexing run gets a new run number. Points seen during the run are
+    recorded under it as they stream past, and a point counts as indexed
+    only if it was recorded by the last completed run. commit() marks the
+    run as completed; points of earlier runs that were not seen again are
+    then stale. Memory use therefore does not depend on the document size.
+
+    Point IDs do not depend on how the vectors were computed, so the manifest
+    also stores the embedding mode of the completed run (indexed_embedding;
+    manifests written before it was stored count as "exact").
+    """
+
+    def __init__(self, collection_name: str, document_id: str, embedding: str = "exact"):
+        self.collection_name = collection_name
+        self.document_id = document_id
+        self.embedding = embedding
+        with _manifest_lock:
+            db = _get_db(collection_name)
+            self._import_legacy(db)
+            row = db.execute(
+                "SELECT run, embedding FROM documents WHERE document_id = ?", (document_id,)
+            ).fetchone()
+            self.indexed_run = row[0] if row else None
+            self.indexed_embedding = (row[1] or "exact") if row else None
+            last_run = db.execute(
+                "SELECT MAX(run) FROM points WHERE document_id = ?", (document_id,)
+            ).fetchone()[0]
+            self.run = max(last_run or 0, self.indexed_run or 0) + 1
+
+    def _import_legacy(self, db: sqlite3.Connection):
+        """Move a per-document JSON manifest of earlier versions into the table. Caller holds _manifest_lock."""
+        path = _legacy_manifest_path(self.collection_name, self.document_id)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r") as f:
+                points = json.load(f)["points"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable manifest for '{self.document_id}': {e}")
+            points = None
+        if points is not None:
+            db.execute("DELETE FROM points WHERE document_id = ?", (self.document_id,))
+            db.executemany(
+                "INSERT INTO points VALUES (?, ?, ?, 1)",
+                [(self.document_id, point_id, strategy) for point_id, strategy in points.items()]
+            )
+            db.execute("INSERT OR REPLACE INTO documents VALUES (?, 1, NULL)", (self.document_id,))
+            db.commit()
+        os.remove(path)
+
+    @property
+    def indexed(self) -> bool:
+        """Whether a previous run of this document completed."""
+        return self.indexed_run is not None
+
+    def indexed_count(self) -> int:
+        """Number of points recorded for the document, by any run."""
+        with _manifest_lock:
+            return _get_db(self.collection_name).execute(
+                "SELECT COUNT(*) FROM points WHERE document_id = ?", (self.document_id,)
+            ).fetchone()[0]
+
+    def _select(self, point_ids: List[str], run: int) -> Set[str]:
+        found = set()
+        with _manifest_lock:
+            db = _get_db(self.collection_name)
+            for start in range(0, len(point_ids), 500):
+                part = point_ids[start:start + 500]
+                found.update(row[0] for row in db.execute(
+                    "SELECT point_id FROM points WHERE document_id = ? AND run = ? "
+                    f"AND point_id IN ({', '.join('?' * len(part))})",
+                    (self.document_id, run, *part)
+                ))
+        return found
+
+    def indexed_among(self, point_ids: List[str]) -> Set[str]:
+        """The subset of point_ids stored by the last completed run."""
+        if self.indexed_run is None:
+            return set()
+        return self._select(point_ids, self.indexed_run)
+
+    def recorded_among(self, point_ids: List[str]) -> Set[str]:
+        """The subset of point_ids recorded by the current run."""
+        return self._select(point_ids, self.run)
+
+    def discard(self):
+        """Treat the document as never indexed, e.g. when the collection no longer matches the manifest."""
+        self.indexed_run = None
+
+    def record(self, points: List[Tuple[str, str]]):
+        """Record (point_id, strategy) pairs as part of the current run."""
+        if not points:
+            return
+        with _manifest_lock:
+            db = _get_db(self.collection_name)
+            db.executemany(
+                "INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?)",
+                [(self.document_id, point_id, strategy, self.run) for point_id, strategy in points]
+            )
+            db.commit()
+
+    def record_indexed(self, points: List[Tuple[str, str]]):
+        """
+        Record (point_id, strategy) pairs as stored by the last completed run,
+        e.g. copies of another document's points made for this one. A document
+        without a completed run gets one holding just these points.
+        """
+        if not points:
+            return
+        with _manifest_lock:
+            db = _get_db(self.collection_name)
+            run = self.indexed_run if self.indexed_run is not None else self.run
+            db.executemany(
+                "INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?)",
+                [(self.document_id, point_id, strategy, run) for point_id, strategy in points]
+            )
+            if self.indexed_run is None:
+                db.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, NULL)", (self.document_id, run))
+                self.indexed_run, self.indexed_embedding = run, "exact"
+                self.run += 1
+            db.commit()
+
+    def current_count(self) -> int:
+        """Number of points recorded by the current run."""
+        with _manifest_lock:
+            return _get_db(self.collection_name).execute(
+                "SELECT COUNT(*) FROM points WHERE document_id = ? AND run = ?", (self.document_id, self.run)
+            ).fetchone()[0]
+
+    def iter_stale(self, page_size: int = 1000) -> Iterator[List[str]]:
+        """Pages of point IDs recorded by earlier runs but not by the current one."""
+        last = ""
+        while True:
+            with _manifest_lock:
+                page = [row[0] for row in _get_db(self.collection_name).execute(
+                    "SELECT point_id FROM points WHERE document_id = ? AND run != ? AND point_id > ? "
+                    "ORDER BY point_id LIMIT ?",
+                    (self.document_id, self.run, last, page_size)
+                )]
+            if not page:
+                return
+            yield page
+            last = page[-1]
+
+    def commit(self):
+        """Mark the current run as completed and forget points it did not record."""
+        with _manifest_lock:
+            db = _get_db(self.collection_name)
+            db.execute("DELETE FROM points WHERE document_id = ? AND run != ?", (self.document_id, self.run))
+            db.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?)", (self.document_id, self.run, self.embedding)
+            )
+            db.commit()
+        self.indexed_run = self.run
+        self.indexed_embedding = self.embedding
+
+
+def delete_manifest(collection_name: str, document_id: str):
+    """Remove the document's manifest, e.g. to force a full rebuild."""
+    with _manifest_lock:
+        db = _get_db(collection_name)
+        db.execute("DELETE FROM points WHERE document_id = ?", (document_id,))
+        db.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+        db.commit()
+    path = _legacy_manifest_path(collection_name, document_id)
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,323 @@
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Any
+
+from document_loader import load_and_chunk_documents_with_multiple_strategies
+from qdrant_helper import index_document_with_strategies
+from upload_registry import set_upload_status
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+JOBS_DIR = os.getenv("INGESTION_JOBS_DIR", "data/ingestion_jobs")
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+INGESTION_JOB_RETENTION_S = float(os.getenv("INGESTION_JOB_RETENTION_S", str(7 * 24 * 3600)))
+INGESTION_JOBS_KEEP = int(os.getenv("INGESTION_JOBS_KEEP", "100"))  # most recent finished jobs kept
+INGESTION_HEARTBEAT_S = float(os.getenv("INGESTION_HEARTBEAT_S", "10"))
+INGESTION_HEARTBEAT_TIMEOUT_S = float(os.getenv("INGESTION_HEARTBEAT_TIMEOUT_S", "60"))  # owner presumed dead after this
+ACTIVE_STATUSES = ("queued", "running")
+HOSTNAME = socket.gethostname()
+
+_jobs: Dict[str, Dict[str, Any]] = {}
+_jobs_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+_heartbeat = None
+
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _save_job(job: Dict[str, Any]):
+    """Atomically persist a job snapshot. Caller holds _jobs_lock."""
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    path = _job_path(job["job_id"])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(job, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _process_alive(host: str, pid: int) -> bool:
+    """Whether a job owner's process still runs. Owners on other hosts (and on Windows) are judged by heartbeat only."""
+    if host != HOSTNAME or pid is None or os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _owner_alive(job: Dict[str, Any]) -> bool:
+    """Whether the process that owns an active job is still working on it."""
+    heartbeat = job.get("heartbeat_at", job["updated_at"])
+    if time.time() - heartbeat > INGESTION_HEARTBEAT_TIMEOUT_S:
+        return False
+    return _process_alive(job.get("owner_host"), job.get("owner_pid"))
+
+
+def _load_jobs():
+    """
+    Load persisted jobs into memory. Jobs that were still queued or running
+    when their owner process stopped (its pid is gone, or its heartbeat is
+    older than INGESTION_HEARTBEAT_TIMEOUT_S) are marked "interrupted".
+    Active jobs of other live processes sharing JOBS_DIR are left to them.
+    """
+    if not os.path.isdir(JOBS_DIR):
+        return
+    for name in os.listdir(JOBS_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(JOBS_DIR, name), "r") as f:
+                job = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable job file '{name}': {e}")
+            continue
+        if job["status"] in ACTIVE_STATUSES:
+            if _owner_alive(job):
+                continue
+            job["status"] = "interrupted"
+            for file in job["files"]:
+                if file["status"] in ("queued", "parsing", "indexing"):
+                    file["status"] = "interrupted"
+                    if file.get("content_hash"):
+                        set_upload_status(job["collection_name"], file["content_hash"], "interrupted")
+            _save_job(job)
+        _jobs[job["job_id"]] = job
+
+
+def _prune_jobs() -> int:
+    """
+    Forget finished jobs that are older than INGESTION_JOB_RETENTION_S or
+    not among the INGESTION_JOBS_KEEP most recent ones. Caller holds _jobs_lock.
+    """
+    finished = sorted(
+        (job for job in _jobs.values() if job["status"] not in ACTIVE_STATUSES),
+        key=lambda job: job["created_at"],
+        reverse=True
+    )
+    cutoff = time.time() - INGESTION_JOB_RETENTION_S
+    pruned = 0
+    for rank, job in enumerate(finished):
+        if rank >= INGESTION_JOBS_KEEP or job["updated_at"] < cutoff:
+            del _jobs[job["job_id"]]
+            try:
+                os.remove(_job_path(job["job_id"]))
+            except OSError:
+                pass
+            pruned += 1
+    if pruned:
+        logger.info(f"Pruned {pruned} finished ingestion job(s)")
+    return pruned
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Worker pool shared by all Streamlit sessions of this process."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=INGESTION_WORKERS, thread_name_prefix="ingestion")
+    return _executor
+
+
+def _beat():
+    """Heartbeat thread: keep this process's active jobs from being taken for interrupted ones."""
+    while True:
+        time.sleep(INGESTION_HEARTBEAT_S)
+        with _jobs_lock:
+            for job in _jobs.values():
+                if job["status"] in ACTIVE_STATUSES:
+                    job["heartbeat_at"] = time.time()
+                    _save_job(job)
+
+
+def _start_heartbeat():
+    global _heartbeat
+    with _executor_lock:
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_beat, name="ingestion-heartbeat", daemon=True)
+            _heartbeat.start()
+
+
+def _update_file(job_id: str, index: int, **changes):
+    with _jobs_lock:
+        job = _jobs[job_id]
+        job["files"][index].update(changes)
+        job["updated_at"] = time.time()
+        _save_job(job)
+
+
+def _update_job(job_id: str, **changes):
+    with _jobs_lock:
+        job = _jobs[job_id]
+        job.update(changes)
+        job["updated_at"] = time.time()
+        _save_job(job)
+
+
+def _run_job(job_id: str):
+    """Worker: parse, chunk and index every file of a job in order."""
+    _update_job(job_id, status="running", started_at=time.time())
+    with _jobs_lock:
+        files = [dict(file) for file in _jobs[job_id]["files"]]
+        collection_name = _jobs[job_id]["collection_name"]
+
+    failed = 0
+    for index, file in enumerate(files):
+        try:
+            _update_file(job_id, index, status="parsing")
+            chunks = load_and_chunk_documents_with_multiple_strategies(file["path"])
+            # Streamed views (large text files) are generators with no length up front
+            chunks_total = None
+            if all(hasattr(v, "__len__") for v in chunks.values()):
+                chunks_total = sum(len(v) for v in chunks.values())
+            _update_file(job_id, index, status="indexing", chunks_total=chunks_total)
+
+            def on_progress(progress, index=index):
+                _update_file(job_id, index, chunks_seen=progress["chunks_seen"], chunks_indexed=progress["chunks_indexed"])
+
+            result = index_document_with_strategies(
+                collection_name, file["document_id"], chunks, progress_callback=on_progress
+            )
+            if result["status"] != "success":
+                raise RuntimeError(result.get("message", "indexing failed"))
+            _update_file(
+                job_id, index,
+                status="done",
+                chunks_total=result["total_chunks"],
+                chunks_seen=result["total_chunks"],
+                new_chunks=result["new_chunks"],
+                duplicate_chunks=result["duplicate_chunks"],
+                duplicate_of=result["duplicate_of"]
+            )
+            if file["content_hash"]:
+                # A whole-document near-duplicate stores nothing of its own
+                if result["duplicate_of"]:
+                    set_upload_status(collection_name, file["content_hash"], "duplicate", chunks=0)
+                else:
+                    set_upload_status(collection_name, file["content_hash"], "indexed", chunks=result["total_chunks"])
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id}: failed to ingest '{file['document_id']}': {e}")
+            _update_file(job_id, index, status="failed", error=str(e))
+            if file["content_hash"]:
+                set_upload_status(collection_name, file["content_hash"], "failed", error=str(e))
+            failed += 1
+
+    status = "done" if not failed else ("failed" if failed == len(files) else "partial")
+    _update_job(job_id, status=status, finished_at=time.time())
+    with _jobs_lock:
+        _prune_jobs()
+    logger.info(f"Ingestion job {job_id} finished: {status}")
+
+
+def submit_ingestion_job(collection_name: str, files: List[Tuple], owner: str = None) -> str:
+    """
+    Queue files for background ingestion and return immediately.
+
+    Args:
+        collection_name: Target Qdrant collection
+        files: List of (file_path, document_id) or (file_path, document_id, content_hash)
+            tuples, ingested in order. Files with a content hash have their
+            upload registry entry updated when they finish.
+        owner: Optional owner (e.g. username) used to filter list_jobs
+
+    Returns:
+        Job ID to poll with get_job
+    """
+    job_id = str(uuid.uuid4())
+    now = time.time()
+    job = {
+        "job_id": job_id,
+        "owner": owner,
+        "collection_name": collection_name,
+        "status": "queued",
+        "created_at": now,
+        "updated_at": now,
+        "owner_host": HOSTNAME,
+        "owner_pid": os.getpid(),
+        "heartbeat_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "files": [
+            {
+                "path": file[0],
+                "document_id": file[1],
+                "content_hash": file[2] if len(file) > 2 else None,
+                "status": "queued",
+                "chunks_total": None,
+                "chunks_seen": 0,
+                "chunks_indexed": 0,
+                "new_chunks": None,
+                "duplicate_chunks": 0,
+                "duplicate_of": None,
+                "error": None
+            }
+            for file in files
+        ]
+    }
+    with _jobs_lock:
+        _jobs[job_id] = job
+        _save_job(job)
+    _start_heartbeat()
+    _get_executor().submit(_run_job, job_id)
+    logger.info(f"Queued ingestion job {job_id} with {len(files)} file(s) for '{collection_name}'")
+    return job_id
+
+
+def get_job(job_id: str) -> Dict[str, Any]:
+    """Return a snapshot of a job, or None if it is unknown."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return json.loads(json.dumps(job)) if job else None
+
+
+def list_jobs(owner: str = None, active_only: bool = False, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Return job snapshots, newest first.
+
+    Args:
+        owner: Only return jobs submitted by this owner
+        active_only: Only return queued or running jobs
+        limit: Maximum number of jobs
+
+    Returns:
+        List of job dictionaries
+    """
+    with _jobs_lock:
+        jobs = [
+            job for job in _jobs.values()
+            if (owner is None or job["owner"] == owner)
+            and (not active_only or job["status"] in ACTIVE_STATUSES)
+        ]
+        jobs = sorted(jobs, key=lambda job: job["created_at"], reverse=True)[:limit]
+        return json.loads(json.dumps(jobs))
+
+
+def job_progress(job: Dict[str, Any]) -> float:
+    """Fraction of the job's chunks that have been processed (0.0 - 1.0)."""
+    done = 0.0
+    for file in job["files"]:
+        if file["status"] in ("done", "failed"):
+            done += 1
+        elif file["chunks_total"]:
+            done += min(file["chunks_seen"] / file["chunks_total"], 1.0)
+    return done / len(job["files"]) if job["files"] else 1.0
+
+
+with _jobs_lock:
+    _load_jobs()
+    _prune_jobs()
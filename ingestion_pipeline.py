@@ -0,0 +1,172 @@
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage."""
+
+    def __init__(self, name: str, workers: int = 1):
+        self.name = name
+        self.workers = workers
+        self.batches = 0
+        self.items = 0
+        self.busy_s = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, elapsed: float):
+        with self._lock:
+            self.batches += 1
+            self.items += items
+            self.busy_s += elapsed
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "batches": self.batches,
+            "items": self.items,
+            "busy_s": round(self.busy_s, 4),
+            "items_per_s": round(self.items / self.busy_s, 2) if self.busy_s else None,
+        }
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up when the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def run_pipeline(
+    source: Iterable,
+    stages: List[Tuple[str, Callable, int]],
+    source_name: str = "load",
+    max_pending: int = 4,
+    item_count: Callable[[Any], int] = len
+) -> Dict[str, Any]:
+    """
+    Run batches from source through a chain of stages connected by bounded queues.
+
+    Every stage runs in its own worker thread(s), so a stage can work on batch
+    n+1 while the next stage is still busy with batch n. The bounded queues
+    apply backpressure: a fast producer blocks once max_pending batches are
+    waiting, which keeps memory proportional to the batch size.
+
+    Args:
+        source: Iterable of batches (iterating it is timed as the first stage)
+        stages: List of (name, fn, workers); fn maps a batch to the next stage's input
+        source_name: Stage name reported for the source
+        max_pending: Maximum number of batches queued between two stages
+        item_count: Function returning the number of items in a stage's input batch
+
+    Returns:
+        Dictionary with per-stage statistics and total wall time
+
+    Raises:
+        The first exception raised by the source or any stage
+    """
+    stop = threading.Event()
+    errors = []
+    queues = [queue.Queue(maxsize=max_pending) for _ in stages]
+    stats = {source_name: StageStats(source_name)}
+    for name, _, workers in stages:
+        stats[name] = StageStats(name, workers)
+
+    def fail(error: Exception):
+        if not errors:
+            errors.append(error)
+        stop.set()
+
+    def produce():
+        iterator = iter(source)
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    batch = next(iterator)
+                except StopIteration:
+                    break
+                stats[source_name].record(item_count(batch), time.perf_counter() - start)
+                if not _put(queues[0], batch, stop):
+                    return
+        except Exception as e:
+            fail(e)
+        finally:
+            for _ in range(stages[0][2]):
+                _put(queues[0], _END, stop)
+
+    def work(index: int, name: str, fn: Callable, finished: List[int], finished_lock: threading.Lock):
+        in_queue = queues[index]
+        out_queue = queues[index + 1] if index + 1 < len(queues) else None
+        try:
+            while True:
+                batch = _get(in_queue, stop)
+                if batch is _END:
+                    break
+                start = time.perf_counter()
+                result = fn(batch)
+                stats[name].record(item_count(batch), time.perf_counter() - start)
+                if out_queue is not None and not _put(out_queue, result, stop):
+                    break
+        except Exception as e:
+            fail(e)
+        finally:
+            # The last worker of a stage to finish forwards end-of-stream to the next stage
+            with finished_lock:
+                finished[0] += 1
+                last = finished[0] == stages[index][2]
+            if last and out_queue is not None:
+                for _ in range(stages[index + 1][2]):
+                    _put(out_queue, _END, stop)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=produce, name=f"pipeline-{source_name}", daemon=True)]
+    for index, (name, fn, workers) in enumerate(stages):
+        finished, finished_lock = [0], threading.Lock()
+        for worker in range(workers):
+            threads.append(threading.Thread(
+                target=work,
+                args=(index, name, fn, finished, finished_lock),
+                name=f"pipeline-{name}-{worker}",
+                daemon=True
+            ))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    wall_s = time.perf_counter() - started
+    stage_stats = {name: stage.as_dict() for name, stage in stats.items()}
+    bottleneck = max(stats.values(), key=lambda stage: stage.busy_s / stage.workers).name
+    logger.info(
+        "Pipeline finished in %.2fs: %s (bottleneck: %s)",
+        wall_s,
+        ", ".join(f"{name}={stage['items_per_s']}/s" for name, stage in stage_stats.items()),
+        bottleneck
+    )
+    return {"wall_s": round(wall_s, 4), "stages": stage_stats, "bottleneck": bottleneck}
@@ -0,0 +1,53 @@
+import streamlit as st
+
+from ingestion_jobs import list_jobs, job_progress
+
+# Constants
+FILE_STATUS_ICONS = {"queued": "⏳", "parsing": "📖", "indexing": "⚙️", "done": "✅", "failed": "❌", "interrupted": "⚠️"}
+JOBS_POLL_INTERVAL_S = 2
+
+
+def _render_jobs(owner):
+    jobs = list_jobs(owner=owner, limit=5)
+    if not jobs:
+        return
+    st.subheader("Indexing jobs")
+    for job in jobs:
+        st.progress(job_progress(job), text=f"{job['status'].capitalize()} · {len(job['files'])} file(s)")
+        for file in job["files"]:
+            line = f"{FILE_STATUS_ICONS.get(file['status'], '')} {file['document_id']}"
+            if file["status"] == "indexing" and file["chunks_total"]:
+                line += f" ({file['chunks_seen']}/{file['chunks_total']} chunks)"
+            elif file["status"] == "indexing":
+                line += f" ({file['chunks_seen']} chunks)"
+            elif file["status"] == "done":
+                line += f" ({file['chunks_total']} chunks, {file['new_chunks']} new)"
+                if file.get("duplicate_of"):
+                    line += f", duplicate of {file['duplicate_of']}"
+                elif file.get("duplicate_chunks"):
+                    line += f", {file['duplicate_chunks']} near-duplicates skipped"
+            elif file["status"] == "failed":
+                line += f": {file['error']}"
+            st.caption(line)
+
+
+@st.fragment(run_every=JOBS_POLL_INTERVAL_S)
+def _live_jobs_panel(owner):
+    _render_jobs(owner)
+    if not list_jobs(owner=owner, active_only=True, limit=1):
+        # Last job finished: rerun the app once so the panel stops polling
+        st.rerun()
+
+
+def show_ingestion_jobs(owner):
+    """
+    Sidebar panel of an owner's recent ingestion jobs.
+
+    While a job is queued or running, the panel is a fragment that refreshes
+    itself every JOBS_POLL_INTERVAL_S seconds without blocking the chat;
+    otherwise it is drawn once and does not poll.
+    """
+    if list_jobs(owner=owner, active_only=True, limit=1):
+        _live_jobs_panel(owner)
+    else:
+        _render_jobs(owner)
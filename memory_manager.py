@@ -1,7 +1,8 @@
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from qdrant_client import QdrantClient
 from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue, Range
-from sentence_transformers import SentenceTransformer
+from embedding_provider import encode_query, get_embedding_dimension
+from retrieval_orchestrator import RETRIEVAL_CLIENT_TIMEOUT_S
 import uuid
 import logging
 from typing import List
@@ -12,11 +13,11 @@ logger = logging.getLogger(__name__)
 
 # Constants
 COLLECTION_NAME = "chat_memory"
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
-# Initialize Qdrant and Embedding Model
+# Initialize Qdrant (the embedding model is shared via embedding_provider)
 qdrant_client = QdrantClient(url="http://localhost:6333")
-embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+# Conversation retrieval runs as a retrieval leg: bound each request so a timed-out leg frees its worker
+retrieval_client = QdrantClient(url="http://localhost:6333", timeout=RETRIEVAL_CLIENT_TIMEOUT_S)
 
 
 def ensure_memory_collection_exists():
@@ -30,18 +31,19 @@ def ensure_memory_collection_exists():
         qdrant_client.create_collection(
             collection_name=COLLECTION_NAME,
             vectors_config=VectorParams(
-                size=embedding_model.get_sentence_embedding_dimension(),
+                size=get_embedding_dimension(),
                 distance=Distance.COSINE
             ),
         )
 
 
-def store_message(session_id: str, message_content: str, role: str, timestamp=None, message_id=None):
-    """Store a chat message in Qdrant with metadata."""
+def store_message(session_id: str, message_content: str, role: str, timestamp=None, message_id=None, embedding=None):
+    """Store a chat message in Qdrant with metadata. A precomputed embedding can be passed to skip encoding."""
     ensure_memory_collection_exists()
 
     # Generate embedding
-    embedding = embedding_model.encode(message_content).tolist()
+    if embedding is None:
+        embedding = encode_query(message_content)
 
     # Generate message ID if not provided
     message_id = message_id or str(uuid.uuid4())
@@ -51,12 +53,12 @@ def store_message(session_id: str, message_content: str, role: str, timestamp=No
         FieldCondition(key="session_id", match=MatchValue(value=session_id))
     ])
 
-    existing_messages = qdrant_client.scroll(
-    collection_name=COLLECTION_NAME,
-    scroll_filter=filter_query,
-    limit=1000
-    )[0]
-    sequence_num = len(existing_messages) + 1
+    existing_messages = qdrant_client.count(
+        collection_name=COLLECTION_NAME,
+        count_filter=filter_query,
+        exact=True
+    ).count
+    sequence_num = existing_messages + 1
 
     # Store the message
     point = PointStruct(
@@ -81,6 +83,22 @@ def import_time_module():
     return time
 
 
+def _scroll_all(client: QdrantClient, scroll_filter: Filter, page_size: int = 1000) -> List:
+    """Return every chat memory point matching scroll_filter, with payload, fetched page_size at a time."""
+    points, offset = [], None
+    while True:
+        page, offset = client.scroll(
+            collection_name=COLLECTION_NAME,
+            scroll_filter=scroll_filter,
+            limit=page_size,
+            offset=offset,
+            with_payload=True,
+        )
+        points.extend(page)
+        if offset is None:
+            return points
+
+
 def retrieve_messages_by_sequence(session_id: str, start_seq: int = None, end_seq: int = None) -> List:
     """Retrieve chat messages by sequence range."""
     filter_query = [FieldCondition(key="session_id", match=MatchValue(value=session_id))]
@@ -95,12 +113,7 @@ def retrieve_messages_by_sequence(session_id: str, start_seq: int = None, end_se
         filter_query.append(FieldCondition(key="sequence_num", range=Range(**range_condition)))
 
     # Execute query
-    search_result = qdrant_client.scroll(
-    collection_name=COLLECTION_NAME,
-    scroll_filter=Filter(must=filter_query), 
-    limit=1000,
-    with_payload=True,
-    )[0]
+    search_result = _scroll_all(qdrant_client, Filter(must=filter_query))
 
     # Create a mapping of content to sequence number for easier lookup
     content_to_seq = {}
@@ -129,15 +142,41 @@ def retrieve_messages_by_sequence(session_id: str, start_seq: int = None, end_se
     return messages
 
 
-def retrieve_context_relevant_messages(session_id: str, query: str, context_window: int = 2, top_k: int = 5) -> List:
-    """Retrieve relevant messages based on semantic similarity with context."""
-    query_vector = embedding_model.encode(query).tolist()
+def retrieve_messages_by_ranges(session_id: str, ranges: List) -> List:
+    """
+    Retrieve chat messages in several (start_seq, end_seq) ranges with one
+    (paged) scroll, ordered by sequence number. Each message's id is its point ID.
+    """
+    filter_query = Filter(
+        must=[FieldCondition(key="session_id", match=MatchValue(value=session_id))],
+        should=[FieldCondition(key="sequence_num", range=Range(gte=start, lte=end)) for start, end in ranges]
+    )
+
+    search_result = _scroll_all(retrieval_client, filter_query)
+    search_result = sorted(search_result, key=lambda result: result.payload.get("sequence_num", 0))
+
+    messages = []
+    for result in search_result:
+        payload = result.payload
+        if payload["role"] == "user":
+            messages.append(HumanMessage(content=payload["content"], id=str(result.id)))
+        elif payload["role"] == "assistant":
+            messages.append(AIMessage(content=payload["content"], id=str(result.id)))
+        elif payload["role"] == "system":
+            messages.append(SystemMessage(content=payload["content"], id=str(result.id)))
+    return messages
+
+
+def retrieve_context_relevant_messages(session_id: str, query: str, context_window: int = 2, top_k: int = 5, query_vector=None) -> List:
+    """Retrieve relevant messages based on semantic similarity with context. A precomputed query_vector skips encoding."""
+    if query_vector is None:
+        query_vector = encode_query(query)
 
     filter_query = Filter(must=[
         FieldCondition(key="session_id", match=MatchValue(value=session_id))
     ])
 
-    search_results = qdrant_client.search(
+    search_results = retrieval_client.search(
         collection_name=COLLECTION_NAME,
         query_vector=query_vector,
         query_filter=filter_query,
@@ -178,11 +217,8 @@ def retrieve_context_relevant_messages(session_id: str, query: str, context_wind
 
     merged_ranges.append((current_start, current_end))
 
-    # Retrieve messages within these ranges
-    all_messages = []
-    for start_seq, end_seq in merged_ranges:
-        messages = retrieve_messages_by_sequence(session_id, start_seq, end_seq)
-        all_messages.extend(messages)
+    # Retrieve messages within these ranges in one round trip
+    all_messages = retrieve_messages_by_ranges(session_id, merged_ranges)
 
     # Remove duplicates
     seen = set()
@@ -0,0 +1,306 @@
+import os
+import re
+import zlib
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Tuple, Iterable
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+DEDUP_MODE = os.getenv("DEDUP_MODE", "off")  # "link", "skip" or "off"
+DEDUP_INDEX_DIR = os.getenv("DEDUP_INDEX_DIR", "data/dedup_index")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))  # estimated Jaccard similarity
+DEDUP_NUM_PERM = 128
+DEDUP_SHINGLE_SIZE = 5  # words per shingle
+DEDUP_MIN_WORDS = int(os.getenv("DEDUP_MIN_WORDS", "16"))  # shorter texts are never treated as duplicates
+DOCUMENT_KIND = "__document__"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_PATTERN = re.compile(r"\w+")
+
+_permutations = {}
+_indexes: Dict[str, "NearDuplicateIndex"] = {}
+_indexes_lock = threading.Lock()
+
+
+def _get_permutations(num_perm: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Fixed (a, b) coefficients of the hash permutations; seeded so signatures are stable across runs."""
+    if num_perm not in _permutations:
+        generator = np.random.RandomState(1)
+        a = generator.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        b = generator.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        _permutations[num_perm] = (a, b)
+    return _permutations[num_perm]
+
+
+def shingle_hashes(text: str, shingle_size: int = DEDUP_SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the distinct word shingles of a text (lower-cased, punctuation ignored)."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= shingle_size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signature(text: str, num_perm: int = DEDUP_NUM_PERM) -> np.ndarray:
+    """MinHash signature (num_perm uint32 values) of a text's word shingles."""
+    a, b = _get_permutations(num_perm)
+    hashes = shingle_hashes(text)
+    permuted = ((np.outer(a, hashes) + b[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def merge_signatures(signatures: Iterable[np.ndarray]) -> np.ndarray:
+    """Signature of the union of several texts (e.g. a document from its chunks)."""
+    merged = None
+    for signature in signatures:
+        merged = signature.copy() if merged is None else np.minimum(merged, signature)
+    return merged
+
+
+def estimate_jaccard(first: np.ndarray, second: np.ndarray) -> float:
+    """Jaccard similarity estimated from two MinHash signatures."""
+    return float(np.mean(first == second))
+
+
+def word_count(text: str) -> int:
+    return len(_WORD_PATTERN.findall(text))
+
+
+def lsh_params(threshold: float, num_perm: int = DEDUP_NUM_PERM) -> Tuple[int, int]:
+    """
+    Bands and rows per band for LSH bucketing.
+
+    Picks the split whose S-curve minimizes the weighted false positive and
+    false negative probability mass around the threshold. Candidates are
+    verified against the threshold afterwards, so false positives only cost
+    a comparison.
+    """
+    similarities = np.linspace(0.0, 1.0, 201)
+    best, best_error = (1, num_perm), None
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        probability = 1.0 - (1.0 - similarities ** rows) ** bands
+        false_positive = np.mean(np.where(similarities < threshold, probability, 0.0))
+        false_negative = np.mean(np.where(similarities >= threshold, 1.0 - probability, 0.0))
+        # Missed duplicates cost index growth; weigh them higher than extra comparisons
+        error = 0.3 * false_positive + 0.7 * false_negative
+        if best_error is None or error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash/LSH index of the chunks and documents of one collection.
+
+    Signatures and LSH band buckets are stored in SQLite (one file per
+    collection), so the index is updated incrementally as documents are
+    indexed and survives restarts. Only canonical copies, i.e. chunks that
+    were actually written to Qdrant, are indexed; skipped duplicates are
+    recorded as links to the copy they matched. Chunks are only compared
+    with chunks of the same strategy.
+    """
+
+    def __init__(self, path: str, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM):
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS signatures "
+            "(point_id TEXT PRIMARY KEY, document_id TEXT NOT NULL, kind TEXT NOT NULL, signature BLOB NOT NULL)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS buckets (bucket INTEGER NOT NULL, point_id TEXT NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS buckets_by_bucket ON buckets (bucket)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS buckets_by_point ON buckets (point_id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS signatures_by_document ON signatures (document_id)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS links "
+            "(point_id TEXT NOT NULL, document_id TEXT NOT NULL, canonical_id TEXT NOT NULL, similarity REAL NOT NULL, "
+            "PRIMARY KEY (point_id, document_id))"
+        )
+
+        # Signatures are only comparable with the same permutations and shingling
+        layout = f"{num_perm}:{DEDUP_SHINGLE_SIZE}:{self.bands}x{self.rows}"
+        stored_layout = self._db.execute("SELECT value FROM meta WHERE name = 'layout'").fetchone()
+        if stored_layout is None or stored_layout[0] != layout:
+            if stored_layout is not None:
+                logger.info(f"Near-duplicate index layout changed ({stored_layout[0]} -> {layout}), resetting '{path}'")
+            for table in ("signatures", "buckets", "links"):
+                self._db.execute(f"DELETE FROM {table}")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('layout', ?)", (layout,))
+        self._db.commit()
+
+    def _buckets(self, kind: str, signature: np.ndarray) -> List[int]:
+        """One LSH bucket key per band, namespaced by kind."""
+        keys = []
+        for band in range(self.bands):
+            band_bytes = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            key = zlib.crc32(band_bytes, zlib.crc32(f"{kind}|{band}".encode("utf-8")))
+            keys.append(key)
+        return keys
+
+    def find_duplicate(self, kind: str, signature: np.ndarray, exclude_document: str = None) -> Tuple[str, str, float]:
+        """
+        Most similar indexed copy of the same kind at or above the threshold.
+
+        Args:
+            kind: Chunk strategy, or DOCUMENT_KIND for whole documents
+            signature: MinHash signature of the text
+            exclude_document: Ignore copies belonging to this document
+
+        Returns:
+            (point_id, document_id, similarity), or None
+        """
+        buckets = self._buckets(kind, signature)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT s.point_id, s.document_id, s.signature FROM buckets b "
+                "JOIN signatures s ON s.point_id = b.point_id "
+                f"WHERE b.bucket IN ({','.join('?' * len(buckets))}) AND s.kind = ? AND s.document_id != ?",
+                (*buckets, kind, exclude_document or "")
+            ).fetchall()
+        best = None
+        for point_id, document_id, blob in rows:
+            similarity = estimate_jaccard(signature, np.frombuffer(blob, dtype=np.uint32))
+            if similarity >= self.threshold and (best is None or similarity > best[2]):
+                best = (point_id, document_id, similarity)
+        return best
+
+    def add(self, document_id: str, entries: Iterable[Tuple[str, str, np.ndarray]]):
+        """Index canonical copies given as (point_id, kind, signature)."""
+        signature_rows, bucket_rows = [], []
+        for point_id, kind, signature in entries:
+            signature_rows.append((point_id, document_id, kind, signature.astype(np.uint32).tobytes()))
+            bucket_rows.extend((bucket, point_id) for bucket in self._buckets(kind, signature))
+        if not signature_rows:
+            return
+        with self._lock:
+            self._db.executemany("DELETE FROM buckets WHERE point_id = ?", [(row[0],) for row in signature_rows])
+            self._db.executemany("INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?)", signature_rows)
+            self._db.executemany("INSERT INTO buckets VALUES (?, ?)", bucket_rows)
+            self._db.commit()
+
+    def remove(self, point_ids: Iterable[str]):
+        """Drop copies that were deleted from the collection, with the links that pointed at them."""
+        rows = [(point_id,) for point_id in point_ids]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany("DELETE FROM signatures WHERE point_id = ?", rows)
+            self._db.executemany("DELETE FROM buckets WHERE point_id = ?", rows)
+            self._db.executemany("DELETE FROM links WHERE canonical_id = ?", rows)
+            self._db.commit()
+
+    def link(self, document_id: str, links: Iterable[Tuple[str, str, float]]):
+        """Record skipped duplicates of a document as (point_id, canonical_id, similarity)."""
+        rows = [(point_id, document_id, canonical_id, similarity) for point_id, canonical_id, similarity in links]
+        with self._lock:
+            self._db.execute("DELETE FROM links WHERE document_id = ?", (document_id,))
+            self._db.executemany("INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def links_to(self, canonical_ids: Iterable[str]) -> List[Tuple[str, str, str]]:
+        """Links to the given canonical copies as (point_id, document_id, canonical_id)."""
+        canonical_ids = list(canonical_ids)
+        if not canonical_ids:
+            return []
+        with self._lock:
+            return self._db.execute(
+                f"SELECT point_id, document_id, canonical_id FROM links WHERE canonical_id IN ({','.join('?' * len(canonical_ids))})",
+                canonical_ids
+            ).fetchall()
+
+    def canonical_ids(self, point_ids: Iterable[str]) -> Dict[str, str]:
+        """{skipped point_id: canonical point_id it was linked to} for linked point IDs."""
+        point_ids = list(point_ids)
+        if not point_ids:
+            return {}
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT point_id, canonical_id FROM links WHERE point_id IN ({','.join('?' * len(point_ids))})",
+                point_ids
+            ).fetchall()
+        return dict(rows)
+
+    def unlink(self, point_ids: Iterable[str]):
+        """Drop the links of skipped copies that now have a point of their own."""
+        rows = [(point_id,) for point_id in point_ids]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany("DELETE FROM links WHERE point_id = ?", rows)
+            self._db.commit()
+
+    def signatures(self, point_ids: Iterable[str]) -> Dict[str, Tuple[str, np.ndarray]]:
+        """{point_id: (kind, signature)} of indexed canonical copies."""
+        point_ids = list(point_ids)
+        if not point_ids:
+            return {}
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT point_id, kind, signature FROM signatures WHERE point_id IN ({','.join('?' * len(point_ids))})",
+                point_ids
+            ).fetchall()
+        return {point_id: (kind, np.frombuffer(blob, dtype=np.uint32)) for point_id, kind, blob in rows}
+
+    def linked_documents(self, point_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """{canonical point_id: [document_ids whose duplicate copy was linked to it]}."""
+        point_ids = list(point_ids)
+        if not point_ids:
+            return {}
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT canonical_id, document_id FROM links WHERE canonical_id IN ({','.join('?' * len(point_ids))})",
+                point_ids
+            ).fetchall()
+        linked = {}
+        for canonical_id, document_id in rows:
+            linked.setdefault(canonical_id, []).append(document_id)
+        return linked
+
+    def stats(self) -> Dict[str, int]:
+        """Indexed chunks, indexed documents and linked duplicates."""
+        with self._lock:
+            chunks, documents = self._db.execute(
+                "SELECT COALESCE(SUM(kind != ?), 0), COALESCE(SUM(kind = ?), 0) FROM signatures",
+                (DOCUMENT_KIND, DOCUMENT_KIND)
+            ).fetchone()
+            links = self._db.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+        return {"chunks": chunks, "documents": documents, "linked_duplicates": links}
+
+
+def dedup_enabled() -> bool:
+    return DEDUP_MODE in ("link", "skip")
+
+
+def get_dedup_index(collection_name: str, create: bool = True) -> NearDuplicateIndex:
+    """
+    The near-duplicate index of a collection, opened once per process.
+
+    With create=False, returns None if the collection has no index on disk,
+    e.g. to resolve links recorded while DEDUP_MODE was "link".
+    """
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        if index is None:
+            path = os.path.join(DEDUP_INDEX_DIR, f"{collection_name}.sqlite")
+            if not create and not os.path.exists(path):
+                return None
+            index = NearDuplicateIndex(path)
+            _indexes[collection_name] = index
+        return index
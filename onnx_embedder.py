@@ -0,0 +1,139 @@
+import os
+import logging
+from typing import List
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_ONNX_DIR = "data/onnx_models"
+
+
+def _hub_model_id(model_name: str) -> str:
+    """SentenceTransformer short names live under the sentence-transformers org on the hub."""
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def export_onnx_model(model_name: str, onnx_dir: str = DEFAULT_ONNX_DIR, quantize: bool = False) -> str:
+    """
+    Export the transformer of a SentenceTransformer model to ONNX, optionally with
+    dynamic int8 weight quantization. Existing exports are reused.
+
+    Args:
+        model_name: SentenceTransformer model name
+        onnx_dir: Directory holding exported graphs
+        quantize: Whether to produce the int8-quantized graph
+
+    Returns:
+        Path to the ONNX graph to load
+    """
+    model_dir = os.path.join(onnx_dir, model_name.replace("/", "__"))
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    int8_path = os.path.join(model_dir, "model.int8.onnx")
+    os.makedirs(model_dir, exist_ok=True)
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        logger.info(f"Exporting '{model_name}' to ONNX at {fp32_path}")
+        hub_id = _hub_model_id(model_name)
+        tokenizer = AutoTokenizer.from_pretrained(hub_id)
+        model = AutoModel.from_pretrained(hub_id)
+        model.eval()
+
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        input_names = list(sample.keys())
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+        tokenizer.save_pretrained(model_dir)
+
+    if not quantize:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        logger.info(f"Quantizing ONNX graph to int8 at {int8_path}")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+class OnnxEmbedder:
+    """
+    ONNX Runtime replacement for SentenceTransformer.encode on CPU.
+
+    Reproduces the all-MiniLM-L6-v2 pipeline (transformer, mean pooling,
+    L2 normalization) so vectors stay compatible with collections built by
+    the PyTorch model.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        onnx_dir: str = DEFAULT_ONNX_DIR,
+        quantize: bool = False,
+        threads: int = 0,
+        max_seq_length: int = 256
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.max_seq_length = max_seq_length
+
+        graph_path = export_onnx_model(model_name, onnx_dir=onnx_dir, quantize=quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(graph_path))
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(graph_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = [graph_input.name for graph_input in self.session.get_inputs()]
+        self._dimension = self.session.get_outputs()[0].shape[-1]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, sentences: List[str], batch_size: int = 64, **kwargs) -> np.ndarray:
+        """Encode sentences; extra SentenceTransformer keyword arguments are ignored."""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+
+        # Sort by length so each batch pads to a similar sequence length
+        order = np.argsort([-len(sentence) for sentence in sentences])
+        embeddings = np.empty((len(sentences), self._dimension), dtype=np.float32)
+
+        for start in range(0, len(sentences), batch_size):
+            batch_index = order[start:start + batch_size]
+            encoded = self.tokenizer(
+                [sentences[i] for i in batch_index],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            inputs = {name: encoded[name].astype(np.int64) for name in self._input_names}
+            token_embeddings = self.session.run(None, inputs)[0]
+
+            # Mean pooling over non-padding tokens, then L2 normalization
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            embeddings[batch_index] = pooled
+
+        return embeddings
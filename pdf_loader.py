@@ -0,0 +1,342 @@
+import os
+import time
+import hashlib
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from langchain_core.documents import Document
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+PDF_BACKEND = os.getenv("PDF_BACKEND")  # None = fastest installed backend
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0"))  # 0 = CPU count
+PAGES_PER_TASK = 8
+
+# OCR for pages without a text layer (scanned PDFs)
+PDF_OCR = os.getenv("PDF_OCR", "1") == "1"
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0"))  # 0 = CPU count
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "data/ocr_cache")
+OCR_MIN_TEXT_CHARS = 16  # pages with less extracted text are treated as scanned
+OCR_PROGRESS_EVERY = 10
+
+_ocr_available = None
+
+
+def _pymupdf_page_count(path: str) -> int:
+    import fitz
+    with fitz.open(path) as pdf:
+        return pdf.page_count
+
+
+def _pymupdf_extract(path: str, first: int, last: int) -> List[Tuple[int, str]]:
+    import fitz
+    with fitz.open(path) as pdf:
+        return [(number, pdf[number].get_text()) for number in range(first, last)]
+
+
+def _pymupdf_page_fingerprint(path: str, number: int, digest):
+    import fitz
+    with fitz.open(path) as pdf:
+        page = pdf[number]
+        digest.update(f"{tuple(page.rect)}|{page.rotation}|".encode("utf-8"))
+        digest.update(page.read_contents())
+        for image in page.get_images(full=True):
+            digest.update(pdf.xref_stream_raw(image[0]) or b"")
+
+
+def _pypdf_page_count(path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _pypdf_extract(path: str, first: int, last: int) -> List[Tuple[int, str]]:
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [(number, reader.pages[number].extract_text() or "") for number in range(first, last)]
+
+
+def _pypdf_page_fingerprint(path: str, number: int, digest):
+    from pypdf import PdfReader
+    page = PdfReader(path).pages[number]
+    digest.update(f"{tuple(page.mediabox)}|{page.rotation}|".encode("utf-8"))
+    contents = page.get_contents()
+    digest.update(contents.get_data() if contents is not None else b"")
+
+    def add_xobjects(resources, depth=0):
+        resources = resources.get_object() if resources is not None else None
+        xobjects = resources.get("/XObject") if resources else None
+        if not xobjects or depth > 4:
+            return
+        xobjects = xobjects.get_object()
+        for name in sorted(xobjects):
+            xobject = xobjects[name].get_object()
+            digest.update(xobject.get_data())
+            if xobject.get("/Subtype") == "/Form":
+                add_xobjects(xobject.get("/Resources"), depth + 1)
+
+    add_xobjects(page.get("/Resources"))
+
+
+# name -> (module to probe, page_count, extract, page_fingerprint); ordered from fastest to slowest
+PDF_BACKENDS: Dict[str, Tuple[str, Callable, Callable, Callable]] = {
+    "pymupdf": ("fitz", _pymupdf_page_count, _pymupdf_extract, _pymupdf_page_fingerprint),
+    "pypdf": ("pypdf", _pypdf_page_count, _pypdf_extract, _pypdf_page_fingerprint),
+}
+
+
+def available_pdf_backends() -> List[str]:
+    """Names of the PDF backends whose parser library is installed, fastest first."""
+    import importlib.util
+    return [name for name, (module, *_) in PDF_BACKENDS.items() if importlib.util.find_spec(module) is not None]
+
+
+def get_pdf_backend(name: str = None) -> str:
+    """Resolve the backend to use: explicit name, then PDF_BACKEND, then the fastest installed."""
+    name = name or PDF_BACKEND
+    if name:
+        if name not in PDF_BACKENDS:
+            raise ValueError(f"Unknown PDF backend '{name}', expected one of {list(PDF_BACKENDS)}")
+        return name
+    available = available_pdf_backends()
+    if not available:
+        raise ImportError("No PDF parser installed; install pymupdf or pypdf")
+    return available[0]
+
+
+def _extract_pages(backend: str, path: str, first: int, last: int) -> List[Tuple[int, str]]:
+    """Process-pool worker: extract text of pages [first, last)."""
+    return PDF_BACKENDS[backend][2](path, first, last)
+
+
+def iter_pdf_pages(
+    path: str,
+    backend: str = None,
+    workers: int = None,
+    pages_per_task: int = PAGES_PER_TASK,
+    ocr: bool = None,
+    progress_callback: Callable[[Dict], None] = None
+) -> Iterator[Document]:
+    """
+    Extract a PDF page by page in parallel worker processes.
+
+    Page ranges are dispatched to a process pool and page Documents are
+    yielded in page order as soon as they are ready, so chunking can start
+    on the first pages while later ones are still being parsed. At most
+    two tasks per worker are in flight, which bounds memory for large files.
+    Pages without a text layer are OCR'd (see ocr_missing_text).
+
+    Args:
+        path: Path to the PDF
+        backend: Parser backend name (see PDF_BACKENDS)
+        workers: Worker processes (default: PDF_WORKERS or CPU count)
+        pages_per_task: Pages extracted per worker task
+        ocr: OCR scanned pages (default: PDF_OCR)
+        progress_callback: OCR progress callback (see ocr_missing_text)
+
+    Yields:
+        One Document per page with "source", "page" (0-based) and "total_pages" metadata
+    """
+    if PDF_OCR if ocr is None else ocr:
+        pages = iter_pdf_pages(path, backend=backend, workers=workers, pages_per_task=pages_per_task, ocr=False)
+        yield from ocr_missing_text(pages, backend=backend, progress_callback=progress_callback)
+        return
+
+    backend = get_pdf_backend(backend)
+    total_pages = PDF_BACKENDS[backend][1](path)
+    workers = workers or PDF_WORKERS or os.cpu_count() or 1
+    ranges = [(first, min(first + pages_per_task, total_pages)) for first in range(0, total_pages, pages_per_task)]
+
+    def to_document(number: int, text: str) -> Document:
+        return Document(page_content=text, metadata={"source": path, "page": number, "total_pages": total_pages})
+
+    # Small files are not worth the process start-up cost
+    if workers == 1 or len(ranges) <= 1:
+        for first, last in ranges:
+            for number, text in _extract_pages(backend, path, first, last):
+                yield to_document(number, text)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(ranges)))
+    try:
+        pending = iter(ranges)
+        in_flight = []
+        for first, last in pending:
+            in_flight.append(pool.submit(_extract_pages, backend, path, first, last))
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            # Ranges are consumed in submission order, which keeps pages in order
+            pages = in_flight.pop(0).result()
+            next_range = next(pending, None)
+            if next_range is not None:
+                in_flight.append(pool.submit(_extract_pages, backend, path, *next_range))
+            for number, text in pages:
+                yield to_document(number, text)
+    finally:
+        # Also reached when the consumer stops early: drop work that has not started
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def ocr_available() -> bool:
+    """Whether pdf2image, pytesseract and the tesseract binary are installed."""
+    global _ocr_available
+    if _ocr_available is None:
+        try:
+            import pdf2image  # noqa: F401
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            _ocr_available = True
+        except Exception as e:
+            logger.warning(f"OCR disabled, scanned pages will be indexed without text: {e}")
+            _ocr_available = False
+    return _ocr_available
+
+
+def _ocr_cache_path(cache_dir: str, page_hash: str) -> str:
+    return os.path.join(cache_dir, page_hash[:2], f"{page_hash}.txt")
+
+
+def _ocr_page(backend: str, path: str, number: int, dpi: int, language: str, cache_dir: str) -> Tuple[str, bool, float]:
+    """
+    Process-pool worker: rasterize one page and OCR it.
+
+    The cache key is a hash of the page's content stream, the raw streams of
+    the images it draws, its size and rotation (plus DPI and language). It is
+    computed before rendering, so a cache hit skips rasterization as well as
+    OCR, and the same page is recognized once even if it reappears in another
+    file. If the page cannot be fingerprinted, the rendered pixels are hashed.
+
+    Returns:
+        (text, served_from_cache, seconds spent rendering and recognizing)
+    """
+    from pdf2image import convert_from_path
+
+    started = time.perf_counter()
+    digest = hashlib.sha1(f"{dpi}|{language}|".encode("utf-8"))
+    image = None
+    try:
+        PDF_BACKENDS[backend][3](path, number, digest)
+    except Exception as e:
+        logger.debug(f"Could not fingerprint page {number} of '{path}', hashing its pixels: {e}")
+        image = convert_from_path(path, dpi=dpi, first_page=number + 1, last_page=number + 1)[0]
+        digest = hashlib.sha1(f"{dpi}|{language}|{image.mode}|{image.size}|".encode("utf-8"))
+        digest.update(image.tobytes())
+    cache_path = _ocr_cache_path(cache_dir, digest.hexdigest())
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read(), True, time.perf_counter() - started
+
+    import pytesseract
+    if image is None:
+        image = convert_from_path(path, dpi=dpi, first_page=number + 1, last_page=number + 1)[0]
+    text = pytesseract.image_to_string(image, lang=language)
+
+    # Write-then-rename so concurrent workers never read a partial entry
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, cache_path)
+    return text, False, time.perf_counter() - started
+
+
+def ocr_missing_text(
+    pages: Iterator[Document],
+    workers: int = None,
+    dpi: int = OCR_DPI,
+    language: str = OCR_LANGUAGE,
+    cache_dir: str = OCR_CACHE_DIR,
+    progress_callback: Callable[[Dict], None] = None,
+    backend: str = None
+) -> Iterator[Document]:
+    """
+    OCR stage for a stream of page Documents.
+
+    Pages whose text layer is empty (fewer than OCR_MIN_TEXT_CHARS characters)
+    are rasterized and recognized in a bounded process pool; all other pages
+    pass through untouched. Pages are yielded in their original order, each as
+    soon as it and every page before it are ready. OCR'd pages get "ocr": True
+    in their metadata. In the stats, "ocr_s" is the time the workers spent
+    rendering and recognizing pages, summed over workers, and "pages_per_s"
+    is OCR'd pages per second of wall time.
+
+    Args:
+        pages: Page Documents with "source" and "page" metadata
+        workers: OCR processes (default: OCR_WORKERS or CPU count)
+        dpi: Rasterization resolution
+        language: Tesseract language code(s), e.g. "eng" or "eng+deu"
+        cache_dir: Directory of the per-page OCR cache
+        progress_callback: Called with a stats dict after every OCR'd page
+        backend: Parser backend used to fingerprint pages (see PDF_BACKENDS)
+
+    Yields:
+        Page Documents with OCR text filled in where needed
+    """
+    workers = workers or OCR_WORKERS or os.cpu_count() or 1
+    stats = {"pages": 0, "ocr_pages": 0, "ocr_cached": 0, "ocr_s": 0.0, "elapsed_s": 0.0, "pages_per_s": 0.0}
+    ordered = deque()  # Documents and (Document, Future) pairs, in page order
+    pool = None
+    started = time.perf_counter()
+
+    def report(document):
+        stats["elapsed_s"] = round(time.perf_counter() - started, 2)
+        stats["pages_per_s"] = round(stats["ocr_pages"] / stats["elapsed_s"], 2) if stats["elapsed_s"] else 0.0
+        if progress_callback:
+            progress_callback(dict(stats, page=document.metadata.get("page"), total_pages=document.metadata.get("total_pages")))
+        if stats["ocr_pages"] % OCR_PROGRESS_EVERY == 0:
+            logger.info(
+                f"OCR: {stats['ocr_pages']} pages ({stats['ocr_cached']} cached) of "
+                f"'{document.metadata.get('source')}', {stats['pages_per_s']} pages/s"
+            )
+
+    def finish(entry) -> Document:
+        if isinstance(entry, Document):
+            return entry
+        document, future = entry
+        text, cached, seconds = future.result()
+        document.page_content = text
+        document.metadata["ocr"] = True
+        stats["ocr_pages"] += 1
+        stats["ocr_cached"] += cached
+        stats["ocr_s"] = round(stats["ocr_s"] + seconds, 2)
+        report(document)
+        return document
+
+    def is_ready(entry) -> bool:
+        return isinstance(entry, Document) or entry[1].done()
+
+    try:
+        for document in pages:
+            stats["pages"] += 1
+            if len(document.page_content.strip()) >= OCR_MIN_TEXT_CHARS or not ocr_available():
+                ordered.append(document)
+            else:
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=workers)
+                    backend = get_pdf_backend(backend)
+                future = pool.submit(
+                    _ocr_page, backend, document.metadata["source"], document.metadata["page"], dpi, language, cache_dir
+                )
+                ordered.append((document, future))
+
+            # Yield everything that is ready; block only when too much OCR is queued
+            while ordered and (is_ready(ordered[0]) or sum(not isinstance(e, Document) for e in ordered) > workers * 2):
+                yield finish(ordered.popleft())
+
+        while ordered:
+            yield finish(ordered.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+            logger.info(
+                f"OCR finished: {stats['ocr_pages']} of {stats['pages']} pages "
+                f"({stats['ocr_cached']} from cache) in {stats['elapsed_s']}s ({stats['ocr_s']}s of OCR work), "
+                f"{stats['pages_per_s']} pages/s"
+            )
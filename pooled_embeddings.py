@@ -0,0 +1,150 @@
+import logging
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+from document_loader import segment_text, ChunkRecord
+from embedding_provider import encode_documents
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Maximum length of a sentence-level segment (characters)
+SENTENCE_SEGMENT_SIZE = 300
+
+POOLING_MODES = ("mean", "weighted")
+
+
+def chunk_span(chunk) -> Tuple[int, int]:
+    """Character range of a chunk inside its source document, or None if unknown."""
+    if isinstance(chunk, ChunkRecord):
+        return chunk.start, chunk.end
+    metadata = chunk.metadata
+    if "chunk_start" in metadata:
+        return metadata["chunk_start"], metadata["chunk_end"]
+    if "start_index" in metadata:
+        return metadata["start_index"], metadata["start_index"] + len(chunk.page_content)
+    return None
+
+
+class PooledChunkEncoder:
+    """
+    Builds chunk vectors from sentence vectors instead of encoding every chunk.
+
+    Each source document is split once into sentence-level segments that are
+    encoded once (through the shared, cached provider). A chunk's vector is the
+    L2-normalized mean of the vectors of the segments it overlaps, either
+    unweighted ("mean") or weighted by the number of overlapping characters
+    ("weighted"). Both are computed with prefix sums, so pooling a chunk costs
+    O(1) regardless of its length.
+
+    Prepared segments are kept per source document (page) for the life of the
+    encoder, because the strategies of a document are encoded one after the
+    other and each revisits every page; clear() releases them once the
+    document is indexed.
+    """
+
+    def __init__(
+        self,
+        documents: List,
+        pooling: str = "weighted",
+        segment_size: int = SENTENCE_SEGMENT_SIZE
+    ):
+        if pooling not in POOLING_MODES:
+            raise ValueError(f"Unknown pooling mode '{pooling}', expected one of {POOLING_MODES}")
+        self.documents = documents
+        self.pooling = pooling
+        self.segment_size = segment_size
+        self.segments_encoded = 0
+        self._prepared = {}  # doc_index -> (starts, ends, vectors, prefix sums)
+
+    def clear(self):
+        """Release the prepared segments of every document."""
+        self._prepared.clear()
+
+    def _prepare(self, doc_index: int):
+        prepared = self._prepared.get(doc_index)
+        if prepared is not None:
+            return prepared
+
+        text = self.documents[doc_index].page_content
+        spans = segment_text(text, self.segment_size)
+        starts = np.array([start for start, _ in spans], dtype=np.int64)
+        ends = np.array([end for _, end in spans], dtype=np.int64)
+        vectors = np.asarray(encode_documents([text[start:end] for start, end in spans]), dtype=np.float32)
+        self.segments_encoded += len(spans)
+
+        lengths = (ends - starts).astype(np.float32)[:, None]
+        dimension = vectors.shape[1]
+        prefix = np.zeros((len(spans) + 1, dimension), dtype=np.float32)
+        prefix_weighted = np.zeros((len(spans) + 1, dimension), dtype=np.float32)
+        np.cumsum(vectors, axis=0, out=prefix[1:])
+        np.cumsum(vectors * lengths, axis=0, out=prefix_weighted[1:])
+
+        prepared = (starts, ends, vectors, prefix, prefix_weighted)
+        self._prepared[doc_index] = prepared
+        return prepared
+
+    def _pool(self, doc_index: int, chunk_starts: np.ndarray, chunk_ends: np.ndarray) -> np.ndarray:
+        starts, ends, vectors, prefix, prefix_weighted = self._prepare(doc_index)
+
+        # First and last segment overlapping each chunk
+        first = np.searchsorted(ends, chunk_starts, side="right")
+        last = np.searchsorted(starts, chunk_ends, side="left") - 1
+        last = np.maximum(last, first)
+
+        if self.pooling == "mean":
+            pooled = (prefix[last + 1] - prefix[first]) / (last - first + 1)[:, None]
+        else:
+            pooled = prefix_weighted[last + 1] - prefix_weighted[first]
+            # Edge segments only partially overlap the chunk: remove their uncovered part
+            first_cut = (np.maximum(chunk_starts, starts[first]) - starts[first]).astype(np.float32)
+            last_cut = (ends[last] - np.minimum(chunk_ends, ends[last])).astype(np.float32)
+            pooled -= first_cut[:, None] * vectors[first]
+            pooled -= last_cut[:, None] * vectors[last]
+
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def encode_chunks(self, chunks: List) -> List[List[float]]:
+        """
+        Return one vector per chunk. Chunks without a known source document
+        and offset are encoded exactly.
+        """
+        result = [None] * len(chunks)
+        by_document = {}
+        exact = []
+        for position, chunk in enumerate(chunks):
+            doc_index = chunk.doc_index if isinstance(chunk, ChunkRecord) else chunk.metadata.get("doc_index")
+            span = chunk_span(chunk)
+            if (doc_index is None or span is None or doc_index >= len(self.documents)
+                    or not self.documents[doc_index].page_content):
+                exact.append(position)
+                continue
+            by_document.setdefault(doc_index, []).append((position, span))
+
+        for doc_index, items in by_document.items():
+            chunk_starts = np.array([span[0] for _, span in items], dtype=np.int64)
+            chunk_ends = np.array([span[1] for _, span in items], dtype=np.int64)
+            pooled = self._pool(doc_index, chunk_starts, chunk_ends)
+            for (position, _), vector in zip(items, pooled):
+                result[position] = vector.tolist()
+
+        if exact:
+            for position, vector in zip(exact, encode_documents([chunks[i].page_content for i in exact])):
+                result[position] = vector
+        return result
+
+
+def pooled_chunk_vectors(
+    documents: List,
+    chunking_strategies: Dict[str, List],
+    pooling: str = "weighted"
+) -> Dict[str, np.ndarray]:
+    """Pooled vectors for every strategy as {strategy_id: matrix}."""
+    encoder = PooledChunkEncoder(documents, pooling=pooling)
+    return {
+        strategy_id: np.asarray(encoder.encode_chunks(list(chunks)), dtype=np.float32)
+        for strategy_id, chunks in chunking_strategies.items()
+    }
@@ -1,24 +1,92 @@
-import uuid
+import os
 import logging
-from typing import List, Dict, Any, Tuple
+import threading
+from typing import List, Dict, Any, Callable, Tuple
 from qdrant_client import QdrantClient
 from qdrant_client.http.models import VectorParams, Distance
-from sentence_transformers import SentenceTransformer
-from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue
-from fuzzywuzzy import fuzz, process
+from qdrant_client.models import (
+    PointStruct, Filter, FieldCondition, MatchValue, MatchAny, PointIdsList,
+    SparseVectorParams, Modifier, NamedSparseVector, SearchRequest, PayloadSchemaType, IsEmptyCondition, PayloadField
+)
+from fuzzywuzzy import fuzz
+from embedding_provider import encode_documents, encode_query
+from ingestion_pipeline import run_pipeline
+from index_manifest import content_hash, chunk_offset, chunk_point_id, DocumentManifest
+from pooled_embeddings import PooledChunkEncoder
+from bm25 import SPARSE_VECTOR_NAME, bm25_document_vector, bm25_query_vector
+from rank_fusion import fuse
+from trigram_index import get_trigram_index
+from collection_versions import bump_collection_version, get_collection_version
+from retrieval_cache import get_retrieval_cache, make_retrieval_key
+from retrieval_orchestrator import RETRIEVAL_CLIENT_TIMEOUT_S
+from near_duplicates import (
+    DEDUP_MODE, DEDUP_MIN_WORDS, DOCUMENT_KIND, dedup_enabled, get_dedup_index,
+    merge_signatures, minhash_signature, word_count
+)
 
-# Initialize Qdrant client and model
+# Initialize Qdrant client (the embedding model is shared via embedding_provider)
 qdrant_client = QdrantClient(host="localhost", port=6333)
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Searches run as retrieval legs: a bounded request timeout stops a leg that missed
+# its deadline from holding a retrieval worker for as long as Qdrant takes
+retrieval_client = QdrantClient(host="localhost", port=6333, timeout=RETRIEVAL_CLIENT_TIMEOUT_S)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
 COLLECTION_NAME = "document_chunks"
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")  # "rrf" or "score"
+HYBRID_CANDIDATE_POOL = int(os.getenv("HYBRID_CANDIDATE_POOL", "50"))  # candidates per leg before fusion
+
+# Collections with a BM25 sparse vector, looked up once per collection
+_sparse_collections: Dict[str, bool] = {}
+# Keyword indexes for strategy filters and grouping by text
+PAYLOAD_INDEX_FIELDS = ("strategy", "content_hash")
+# Collections whose payload indexes were checked by this process
+_payload_indexed_collections = set()
+# collection -> (collection version, whether some points have no content_hash)
+_unhashed_collections: Dict[str, Tuple[int, bool]] = {}
+
+def ensure_payload_indexes(collection_name: str):
+    """Create the keyword payload indexes a collection is missing, e.g. one created before they were added."""
+    if collection_name in _payload_indexed_collections:
+        return
+    existing = qdrant_client.get_collection(collection_name).payload_schema or {}
+    for field_name in PAYLOAD_INDEX_FIELDS:
+        if field_name not in existing:
+            qdrant_client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD
+            )
+            logging.info(f"Created payload index on '{field_name}' for collection '{collection_name}'")
+    _payload_indexed_collections.add(collection_name)
+
+def _has_unhashed_points(collection_name: str) -> bool:
+    """
+    Whether some points of the collection have no content_hash (indexed
+    before it was stored). Checked once per collection version.
+    """
+    version = get_collection_version(collection_name)
+    cached = _unhashed_collections.get(collection_name)
+    if cached is None or cached[0] != version:
+        points, _ = qdrant_client.scroll(
+            collection_name=collection_name,
+            scroll_filter=Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="content_hash"))]),
+            limit=1,
+            with_payload=False,
+            with_vectors=False
+        )
+        cached = (version, bool(points))
+        _unhashed_collections[collection_name] = cached
+    return cached[1]
 
 def create_collection_if_not_exists(collection_name):
     """
     Creates a Qdrant collection if it doesn't already exist.
+    
+    Every point stores a dense embedding (the unnamed vector) and a BM25
+    sparse vector named SPARSE_VECTOR_NAME; Qdrant applies IDF to the sparse
+    vector at query time.
     """
     try:
         collections_response = qdrant_client.get_collections()
@@ -30,263 +98,998 @@ def create_collection_if_not_exists(collection_name):
                 vectors_config=VectorParams(
                     size=384,  # Embedding dimension of all-MiniLM-L6-v2
                     distance=Distance.COSINE  # Cosine distance for similarity search
-                )
+                ),
+                sparse_vectors_config={
+                    SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)
+                }
             )
+            ensure_payload_indexes(collection_name)
+            _sparse_collections[collection_name] = True
+            # A new collection has no chunks: its empty index is complete
+            trigram_index = get_trigram_index(collection_name)
+            trigram_index.reset()
+            trigram_index.mark_complete()
+            # A recreated collection must not serve results cached for its predecessor
+            bump_collection_version(collection_name)
             logging.info(f"Collection '{collection_name}' created.")
         else:
+            ensure_payload_indexes(collection_name)
             logging.info(f"Collection '{collection_name}' already exists.")
     except Exception as e:
         logging.error(f"Error creating collection '{collection_name}': {e}")
         raise
 
+def has_sparse_vectors(collection_name: str) -> bool:
+    """Whether the collection stores BM25 sparse vectors (collections created before they were added do not)."""
+    if collection_name not in _sparse_collections:
+        sparse_vectors = qdrant_client.get_collection(collection_name).config.params.sparse_vectors or {}
+        _sparse_collections[collection_name] = SPARSE_VECTOR_NAME in sparse_vectors
+        if not _sparse_collections[collection_name]:
+            logging.warning(
+                f"Collection '{collection_name}' has no '{SPARSE_VECTOR_NAME}' sparse vector; "
+                f"lexical search falls back to fuzzy matching until it is re-created and re-indexed"
+            )
+    return _sparse_collections[collection_name]
+
+def _iter_chunk_batches(
+    document_id: str,
+    chunking_strategies: Dict[str, List],
+    batch_size: int,
+    chunk_counts: Dict[str, int],
+    manifest: DocumentManifest,
+    skip_chunk: Callable = None
+):
+    """
+    Yield (strategy_id, items) batches of chunks that are not indexed yet.
+
+    Each item is (chunk_index, point_id, text_hash, chunk). Chunks are looked
+    up in the manifest batch_size at a time: those stored by the last
+    completed run are skipped, and every ID kept is recorded in the current
+    run. New chunks for which skip_chunk(strategy_id, point_id, text_hash, chunk)
+    returns True are dropped and not recorded. Chunk lists may also be generators.
+    """
+    def resolve(strategy_id, seen):
+        indexed = manifest.indexed_among([point_id for _, point_id, _, _ in seen])
+        kept = [
+            item for item in seen
+            if item[1] in indexed or skip_chunk is None or not skip_chunk(strategy_id, *item[1:])
+        ]
+        manifest.record([(point_id, strategy_id) for _, point_id, _, _ in kept])
+        return [item for item in kept if item[1] not in indexed]
+
+    for strategy_id, chunks in chunking_strategies.items():
+        chunk_counts.setdefault(strategy_id, 0)
+        seen, batch = [], []
+        for chunk in chunks:
+            chunk_index = chunk_counts[strategy_id]
+            chunk_counts[strategy_id] += 1
+            # ChunkRecords from build_chunk_views carry their hash already
+            text_hash = getattr(chunk, "content_hash", None) or content_hash(chunk.page_content)
+            point_id = chunk_point_id(
+                document_id, strategy_id, chunk_offset(chunk.metadata, chunk_index), text_hash
+            )
+            seen.append((chunk_index, point_id, text_hash, chunk))
+            if len(seen) == batch_size:
+                batch.extend(resolve(strategy_id, seen))
+                seen = []
+            if len(batch) >= batch_size:
+                yield strategy_id, batch[:batch_size]
+                batch = batch[batch_size:]
+        if seen:
+            batch.extend(resolve(strategy_id, seen))
+        if batch:
+            yield strategy_id, batch
+
+def _open_manifest(collection_name: str, document_id: str, embedding: str = "exact") -> DocumentManifest:
+    """
+    Manifest of the document, discarded if it no longer matches the collection
+    or was indexed with another embedding mode (its vectors would be reused).
+    """
+    manifest = DocumentManifest(collection_name, document_id, embedding=embedding)
+    if not manifest.indexed:
+        return manifest
+    if manifest.indexed_embedding != embedding:
+        logging.info(
+            f"Document '{document_id}' was indexed with embedding mode '{manifest.indexed_embedding}', "
+            f"now '{embedding}'; re-embedding all chunks"
+        )
+        manifest.discard()
+        return manifest
+    recorded = manifest.indexed_count()
+    stored = qdrant_client.count(
+        collection_name=collection_name,
+        count_filter=Filter(must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))]),
+        exact=True
+    ).count
+    if stored != recorded:
+        logging.warning(
+            f"Manifest for '{document_id}' lists {recorded} points but collection has {stored}; re-indexing all chunks"
+        )
+        manifest.discard()
+    return manifest
+
+def _iter_unrecorded_points(collection_name: str, document_id: str, manifest: DocumentManifest, page_size: int = 1000):
+    """Pages of the document's point IDs in the collection that the current run did not record."""
+    offset = None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            scroll_filter=Filter(must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))]),
+            limit=page_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False
+        )
+        point_ids = [str(point.id) for point in points]
+        recorded = manifest.recorded_among(point_ids)
+        unrecorded = [point_id for point_id in point_ids if point_id not in recorded]
+        if unrecorded:
+            yield unrecorded
+        if offset is None:
+            return
+
+def _chunk_payload(
+    document_id: str, strategy_id: str, chunk_index: int, text_hash: str, text: str, metadata: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Payload of a chunk point, with the IDs of its parent and logical chunk."""
+    payload = {
+        "document_id": document_id,
+        "text": text,
+        "metadata": metadata,
+        "chunk_index": chunk_index,
+        "strategy": strategy_id,
+        "content_hash": text_hash
+    }
+    parent = metadata.get("parent")
+    if parent:
+        parent_offset = chunk_offset({**metadata, "start_index": parent["start_index"]}, 0)
+        payload["parent_id"] = chunk_point_id(
+            document_id, parent["strategy"], parent_offset, parent["content_hash"]
+        )
+    logical = metadata.get("logical_chunk")
+    if logical:
+        # Pieces of a chunk split to fit the model share the ID the whole chunk would have
+        logical_offset = chunk_offset({**metadata, "start_index": logical["start_index"]}, 0)
+        payload["logical_id"] = chunk_point_id(
+            document_id, strategy_id, logical_offset, logical["content_hash"]
+        )
+    return payload
+
+def _copy_points(collection_name: str, copies: List[Tuple[str, str, Any]], dedup_index, trigram_index) -> int:
+    """
+    Store copies of existing points for other documents.
+
+    copies holds (point_id, document_id, point) with point retrieved with
+    payload and vectors. Each copy keeps the vectors and text but gets its
+    own payload, and takes over the near-duplicate signature of the original,
+    so it becomes a canonical copy itself. Copies are recorded in the manifest
+    of the document that now owns them, so re-indexing that document treats
+    them as its own (unchanged or stale) points.
+    """
+    if not copies:
+        return 0
+    points = []
+    for point_id, document_id, point in copies:
+        payload = point.payload
+        points.append(PointStruct(
+            id=point_id,
+            vector=point.vector,
+            payload=_chunk_payload(
+                document_id, payload["strategy"], payload["chunk_index"], payload["content_hash"],
+                payload["text"], payload["metadata"]
+            )
+        ))
+    qdrant_client.upsert(collection_name=collection_name, points=points, wait=True)
+    by_document = {}
+    for point in points:
+        by_document.setdefault(point.payload["document_id"], []).append((point.id, point.payload["strategy"]))
+    for document_id, recorded in by_document.items():
+        DocumentManifest(collection_name, document_id).record_indexed(recorded)
+    trigram_index.add((point.id, point.payload["text"]) for point in points)
+    signatures = dedup_index.signatures({str(point.id) for _, _, point in copies})
+    for point_id, document_id, point in copies:
+        if str(point.id) in signatures:
+            dedup_index.add(document_id, [(point_id, *signatures[str(point.id)])])
+    dedup_index.unlink(point_id for point_id, _, _ in copies)
+    return len(points)
+
+def _promote_linked_chunks(collection_name: str, stale_ids: List[str], dedup_index, trigram_index) -> int:
+    """
+    Before canonical chunks are deleted, give every document whose
+    near-duplicate chunk was linked to one of them a copy of its own,
+    stored under the ID the skipped chunk would have had.
+    """
+    links = dedup_index.links_to(stale_ids)
+    if not links:
+        return 0
+    points = qdrant_client.retrieve(
+        collection_name=collection_name,
+        ids=list({canonical_id for _, _, canonical_id in links}),
+        with_payload=True,
+        with_vectors=True
+    )
+    points_by_id = {str(point.id): point for point in points}
+    copies = [
+        (point_id, document_id, points_by_id[canonical_id])
+        for point_id, document_id, canonical_id in links if canonical_id in points_by_id
+    ]
+    return _copy_points(collection_name, copies, dedup_index, trigram_index)
+
+def _promote_document_links(collection_name: str, document_id: str, dedup_index, trigram_index, page_size: int = 256) -> int:
+    """
+    Before a document is re-indexed, copy its points to every document that
+    was skipped as a whole as a near-duplicate of it, so those documents do
+    not change or disappear with it. Copies get the IDs the skipped document
+    would have had for the same chunks.
+    """
+    links = dedup_index.links_to([f"document:{document_id}"])
+    if not links:
+        return 0
+    copied, offset = 0, None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            scroll_filter=Filter(must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))]),
+            limit=page_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        copies = []
+        for point in points:
+            payload = point.payload
+            offset_key = chunk_offset(payload["metadata"], payload["chunk_index"])
+            for _, linked_document, _ in links:
+                copies.append((
+                    chunk_point_id(linked_document, payload["strategy"], offset_key, payload["content_hash"]),
+                    linked_document,
+                    point
+                ))
+        copied += _copy_points(collection_name, copies, dedup_index, trigram_index)
+        if offset is None:
+            break
+    # The linked documents now stand on their own, document signature included
+    signature = dedup_index.signatures([f"document:{document_id}"]).get(f"document:{document_id}")
+    for point_id, linked_document, _ in links:
+        if signature is not None:
+            dedup_index.add(linked_document, [(point_id, *signature)])
+    dedup_index.unlink(point_id for point_id, _, _ in links)
+    logging.info(f"Copied {copied} points of '{document_id}' to {len(links)} document(s) linked to it as near-duplicates")
+    return copied
+
+def _document_signature(strategies: Dict[str, List], signature_cache: Dict[str, Any]):
+    """
+    MinHash signature of a whole document, merged from the signatures of its
+    coarsest chunk view (the union of a view's chunks covers the document).
+    Chunk signatures are kept in signature_cache by content hash for reuse.
+    """
+    chunks = min((chunks for chunks in strategies.values() if chunks), key=len, default=[])
+    if sum(word_count(chunk.page_content) for chunk in chunks) < DEDUP_MIN_WORDS:
+        return None
+    signatures = []
+    for chunk in chunks:
+        text_hash = getattr(chunk, "content_hash", None) or content_hash(chunk.page_content)
+        signature = minhash_signature(chunk.page_content)
+        signature_cache[text_hash] = signature
+        signatures.append(signature)
+    return merge_signatures(signatures)
+
 def index_document_with_strategies(
     collection_name: str, 
     document_id: str, 
     chunking_strategies: Dict[str, List], 
     rolling_window_chunks: List = None,
-    batch_size: int = 50
+    batch_size: int = 50,
+    max_pending_batches: int = 4,
+    upsert_workers: int = 2,
+    embedding_mode: str = "exact",
+    source_documents: List = None,
+    pooling: str = "weighted",
+    progress_callback: Callable[[Dict[str, Any]], None] = None
 ) -> Dict:
     """
     Index document chunks from multiple chunking strategies.
     
+    Chunks flow through a staged pipeline (batch -> embed -> upsert) with
+    bounded queues between stages, so the model encodes the next batch while
+    earlier batches are still being written to Qdrant. Upserts do not wait
+    for indexing; a single wait at the end guarantees all points are visible.
+    
+    Point IDs are derived from document_id, strategy, chunk offset and a hash
+    of the chunk text, and a per-document manifest in SQLite records what is
+    indexed; it is read and written a batch at a time, so memory does not
+    grow with the number of chunks.
+    Re-indexing a document therefore only embeds new or changed chunks and
+    deletes the points of chunks that disappeared. Each point also gets a
+    BM25 sparse vector of its text for lexical search.
+    
+    Unless DEDUP_MODE is "off", new chunks are checked against a persistent
+    MinHash/LSH index of the collection before they are embedded. A document
+    that is a near-duplicate of another indexed document, or a chunk that is
+    a near-duplicate of a chunk of the same strategy in another document
+    (estimated Jaccard >= DEDUP_THRESHOLD), is not embedded or stored; in
+    "link" mode it is recorded as a link to the copy it matched. Links are
+    resolved at query time, and before a linked copy is deleted or a linked
+    document re-indexed, the documents that depend on it get copies of
+    their own.
+    
+    With embedding_mode="pooled", the source documents are encoded once at
+    sentence level and every chunk vector is pooled from the sentences it
+    covers instead of pushing each (overlapping) chunk through the model.
+    The manifest records the mode (and pooling), and switching either
+    re-embeds every chunk of the document.
+    
+    Once all writes are visible, the collection version is bumped so cached
+    search results from before this call are no longer served.
+    
     Args:
         collection_name: Qdrant collection name
         document_id: Unique identifier for the document
         chunking_strategies: Dictionary of chunking strategies with chunks
         rolling_window_chunks: Optional list of rolling window chunks
         batch_size: Number of chunks to process in each batch
+        max_pending_batches: Maximum batches buffered between two stages (bounds memory)
+        upsert_workers: Number of concurrent upload threads
+        embedding_mode: "exact" (encode each chunk) or "pooled" (pool sentence vectors)
+        source_documents: Documents the chunks were built from (required for "pooled")
+        pooling: "weighted" (by overlap length) or "mean"; used in pooled mode
+        progress_callback: Called after every upserted batch with a dict of
+            chunks_seen, chunks_total (None if the chunk lists are generators)
+            and chunks_indexed (new/changed chunks written so far)
         
     Returns:
-        Dictionary with indexing results
+        Dictionary with indexing results, duplicate counts and per-stage throughput
     """
+    pooled_encoder = None
     try:
         logging.info(f"Starting multi-strategy indexing for document: {document_id}")
         create_collection_if_not_exists(collection_name)
         
-        results = {}
-        total_chunks = 0
+        strategies = dict(chunking_strategies)
+        if rolling_window_chunks:
+            strategies["rolling_window"] = rolling_window_chunks
         
-        # Process each chunking strategy
-        for strategy_id, chunks in chunking_strategies.items():
-            if not chunks:
-                logging.warning(f"No chunks provided for strategy '{strategy_id}'")
-                results[strategy_id] = {"status": "error", "message": "No chunks found"}
-                continue
-            
-            logging.info(f"Indexing {len(chunks)} chunks for strategy '{strategy_id}'")
-            
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i + batch_size]
-                logging.info(f"Processing batch {i//batch_size + 1}, size: {len(batch)}")
-                
-                # Get embeddings only for text content in chunks
-                embeddings = model.encode([chunk.page_content for chunk in batch], convert_to_tensor=False).tolist()
-                
-                points = []
-                for idx, (chunk, embedding) in enumerate(zip(batch, embeddings)):
-                    chunk_id = str(uuid.uuid4())
-                    payload = {
-                        "document_id": document_id,
-                        "text": chunk.page_content,
-                        "metadata": chunk.metadata,
-                        "chunk_index": i + idx,
-                        "strategy": strategy_id
-                    }
-                    points.append(
-                        PointStruct(
-                            id=chunk_id,
-                            vector=embedding,
-                            payload=payload
-                        )
-                    )
-                
-                qdrant_client.upsert(
-                    collection_name=collection_name,
-                    points=points,
-                    wait=True
+        sparse = has_sparse_vectors(collection_name)
+        trigram_index = get_trigram_index(collection_name)
+        
+        if embedding_mode == "pooled":
+            if source_documents:
+                pooled_encoder = PooledChunkEncoder(source_documents, pooling=pooling)
+            else:
+                logging.warning("Pooled embedding mode needs source_documents; falling back to exact encoding")
+        elif embedding_mode != "exact":
+            raise ValueError(f"Unknown embedding mode '{embedding_mode}'")
+        
+        chunk_counts = {}
+        embedding = f"pooled:{pooling}" if pooled_encoder is not None else "exact"
+        manifest = _open_manifest(collection_name, document_id, embedding)
+        last_points = []
+        
+        chunks_total = None
+        if all(hasattr(chunks, "__len__") for chunks in strategies.values()):
+            chunks_total = sum(len(chunks) for chunks in strategies.values())
+        progress = {"chunks_seen": 0, "chunks_total": chunks_total, "chunks_indexed": 0}
+        
+        dedup_index = get_dedup_index(collection_name) if dedup_enabled() else None
+        # Links recorded earlier are maintained even if dedup has been turned off since
+        link_index = dedup_index or get_dedup_index(collection_name, create=False)
+        if link_index is not None:
+            _promote_document_links(collection_name, document_id, link_index, trigram_index)
+        signature_cache = {}
+        document_signature = None
+        duplicate_links = []
+        pending_signatures = {}  # point_id -> (strategy, signature) of canonical chunks until they are upserted
+        if dedup_index is not None and chunks_total:
+            document_signature = _document_signature(strategies, signature_cache)
+        if document_signature is not None and not manifest.indexed:
+            # Only new documents are skipped whole; re-indexing an indexed document updates it in place
+            match = dedup_index.find_duplicate(DOCUMENT_KIND, document_signature, exclude_document=document_id)
+            if match is not None:
+                point_id, duplicate_of, similarity = match
+                if DEDUP_MODE == "link":
+                    dedup_index.link(document_id, [(f"document:{document_id}", point_id, similarity)])
+                logging.info(
+                    f"Document '{document_id}' is a near-duplicate of '{duplicate_of}' "
+                    f"(Jaccard ~{similarity:.2f}); skipping {chunks_total} chunks"
                 )
-            
-            results[strategy_id] = {"status": "success", "chunks": len(chunks)}
-            total_chunks += len(chunks)
+                return {
+                    "status": "success",
+                    "strategies": {strategy_id: {"status": "duplicate", "chunks": len(chunks)} for strategy_id, chunks in strategies.items()},
+                    "total_chunks": chunks_total,
+                    "new_chunks": 0,
+                    "unchanged_chunks": 0,
+                    "deleted_chunks": 0,
+                    "duplicate_chunks": chunks_total,
+                    "duplicate_of": duplicate_of,
+                    "embedding_mode": embedding_mode,
+                    "pipeline": {"stages": {}}
+                }
         
-        # Process rolling window chunks if provided
-        if rolling_window_chunks:
-            logging.info(f"Indexing {len(rolling_window_chunks)} rolling window chunks")
-            
-            for i in range(0, len(rolling_window_chunks), batch_size):
-                batch = rolling_window_chunks[i:i + batch_size]
-                
+        def skip_duplicate(strategy_id, point_id, text_hash, chunk):
+            text = chunk.page_content
+            if word_count(text) < DEDUP_MIN_WORDS:
+                return False
+            signature = signature_cache.pop(text_hash, None)
+            if signature is None:
+                signature = minhash_signature(text)
+            # Never match this document's own chunks: changed chunks replace them
+            match = dedup_index.find_duplicate(strategy_id, signature, exclude_document=document_id)
+            if match is None:
+                pending_signatures[point_id] = (strategy_id, signature)
+                return False
+            duplicate_links.append((point_id, match[0], match[2]))
+            return True
+        
+        progress_lock = threading.Lock()
+        
+        def report_progress(indexed: int = 0):
+            if progress_callback is None:
+                return
+            with progress_lock:
+                progress["chunks_indexed"] += indexed
+                # Copy first: the batching thread may add strategies concurrently
+                progress["chunks_seen"] = sum(dict(chunk_counts).values())
+                snapshot = dict(progress)
+            progress_callback(snapshot)
+        
+        def embed(batch):
+            strategy_id, items = batch
+            chunks = [chunk for _, _, _, chunk in items]
+            if pooled_encoder is not None:
+                embeddings = pooled_encoder.encode_chunks(chunks)
+            else:
                 # Get embeddings only for text content in chunks
-                embeddings = model.encode([chunk.page_content for chunk in batch], convert_to_tensor=False).tolist()
-                
-                points = []
-                for idx, (chunk, embedding) in enumerate(zip(batch, embeddings)):
-                    chunk_id = str(uuid.uuid4())
-                    payload = {
-                        "document_id": document_id,
-                        "text": chunk.page_content,
-                        "metadata": chunk.metadata,
-                        "chunk_index": i + idx,
-                        "strategy": "rolling_window"
-                    }
-                    points.append(
-                        PointStruct(
-                            id=chunk_id,
-                            vector=embedding,
-                            payload=payload
-                        )
+                embeddings = encode_documents([chunk.page_content for chunk in chunks])
+            return strategy_id, items, embeddings
+        
+        def upsert(batch):
+            strategy_id, items, embeddings = batch
+            points = []
+            for (chunk_index, chunk_id, text_hash, chunk), embedding in zip(items, embeddings):
+                payload = _chunk_payload(document_id, strategy_id, chunk_index, text_hash, chunk.page_content, chunk.metadata)
+                if sparse:
+                    vector = {"": embedding, SPARSE_VECTOR_NAME: bm25_document_vector(chunk.page_content)}
+                else:
+                    vector = embedding
+                points.append(
+                    PointStruct(
+                        id=chunk_id,
+                        vector=vector,
+                        payload=payload
                     )
-                
-                qdrant_client.upsert(
-                    collection_name=collection_name,
-                    points=points,
-                    wait=True
                 )
             
-            results["rolling_window"] = {"status": "success", "chunks": len(rolling_window_chunks)}
-            total_chunks += len(rolling_window_chunks)
+            qdrant_client.upsert(
+                collection_name=collection_name,
+                points=points,
+                wait=False
+            )
+            last_points[:] = points
+            trigram_index.add((point.id, point.payload["text"]) for point in points)
+            if dedup_index is not None:
+                dedup_index.add(document_id, [
+                    (point.id, *pending_signatures.pop(point.id))
+                    for point in points if point.id in pending_signatures
+                ])
+            report_progress(len(points))
+        
+        pipeline_stats = run_pipeline(
+            _iter_chunk_batches(
+                document_id, strategies, batch_size, chunk_counts, manifest,
+                skip_chunk=skip_duplicate if dedup_index is not None else None
+            ),
+            stages=[("embed", embed, 1), ("upsert", upsert, upsert_workers)],
+            source_name="batch",
+            max_pending=max_pending_batches,
+            item_count=lambda batch: len(batch[1])
+        )
+        
+        # Updates are applied in order, so waiting on a final write waits for all earlier ones
+        if last_points:
+            qdrant_client.upsert(collection_name=collection_name, points=last_points, wait=True)
+        
+        # Remove points of chunks that are no longer part of the document, a page at a time.
+        # Without a usable manifest, that is every point of the document this run did not
+        # record, e.g. left by earlier (random-ID) indexing.
+        if manifest.indexed:
+            stale_pages = manifest.iter_stale()
+        else:
+            stale_pages = _iter_unrecorded_points(collection_name, document_id, manifest)
+        deleted_chunks = 0
+        for stale_ids in stale_pages:
+            if link_index is not None:
+                _promote_linked_chunks(collection_name, stale_ids, link_index, trigram_index)
+            qdrant_client.delete(
+                collection_name=collection_name,
+                points_selector=PointIdsList(points=stale_ids),
+                wait=True
+            )
+            trigram_index.remove(stale_ids)
+            if link_index is not None:
+                link_index.remove(stale_ids)
+            deleted_chunks += len(stale_ids)
+        was_indexed = manifest.indexed
+        manifest.commit()
+        if pipeline_stats["stages"]["batch"]["items"] or deleted_chunks or not was_indexed:
+            bump_collection_version(collection_name)
+        if dedup_index is not None:
+            if DEDUP_MODE == "link":
+                dedup_index.link(document_id, duplicate_links)
+            if document_signature is not None:
+                dedup_index.add(document_id, [(f"document:{document_id}", DOCUMENT_KIND, document_signature)])
+        new_chunks = pipeline_stats["stages"]["batch"]["items"]
+        report_progress()
+        logging.info(
+            f"Document '{document_id}': {new_chunks} new/changed chunks, "
+            f"{manifest.current_count() - new_chunks} unchanged, {len(duplicate_links)} near-duplicates skipped, "
+            f"{deleted_chunks} stale removed"
+        )
+        
+        results = {}
+        for strategy_id, count in chunk_counts.items():
+            if count:
+                results[strategy_id] = {"status": "success", "chunks": count}
+            else:
+                logging.warning(f"No chunks provided for strategy '{strategy_id}'")
+                results[strategy_id] = {"status": "error", "message": "No chunks found"}
+        total_chunks = sum(chunk_counts.values())
         
         logging.info(f"Total chunks indexed: {total_chunks}")
         
         collection_info = qdrant_client.get_collection(collection_name)
         logging.info(f"Collection now has {collection_info.points_count} points total")
         
-        return {"status": "success", "strategies": results, "total_chunks": total_chunks}
+        return {
+            "status": "success",
+            "strategies": results,
+            "total_chunks": total_chunks,
+            "new_chunks": new_chunks,
+            "unchanged_chunks": manifest.current_count() - new_chunks,
+            "deleted_chunks": deleted_chunks,
+            "duplicate_chunks": len(duplicate_links),
+            "duplicate_of": None,
+            "embedding_mode": "pooled" if pooled_encoder is not None else "exact",
+            "pipeline": pipeline_stats
+        }
     
     except Exception as e:
         logging.error(f"Error indexing document '{document_id}': {e}")
+        # Some batches may have been written before the failure
+        bump_collection_version(collection_name)
         return {"status": "error", "message": str(e)}
+    finally:
+        if pooled_encoder is not None:
+            pooled_encoder.clear()
 
 def query_qdrant_multi_strategy(
     collection_name: str, 
     query_text: str, 
     strategies: List[str] = None,
-    top_k: int = 5
+    top_k: int = 5,
+    query_vector: List[float] = None,
+    dedupe: bool = True
 ) -> List[Dict]:
     """
     Query the Qdrant collection across multiple chunking strategies and return top results.
     
+    The query is encoded once. Without strategies, one grouped search returns
+    the best chunk per distinct text (grouped on content_hash server-side),
+    so the same text indexed by several strategies takes one slot. If the
+    collection still has points without content_hash, which grouping would
+    drop, a plain search for top_k * 3 hits is deduplicated client-side. With a
+    list of strategies, one request per strategy is sent in a single
+    search_batch round trip and duplicate texts are dropped client-side.
+    
     Args:
         collection_name: Qdrant collection name
         query_text: Query text
         strategies: List of strategies to query (None = all strategies)
         top_k: Number of results to retrieve per strategy
+        query_vector: Precomputed embedding of query_text (encoded here if None)
+        dedupe: Keep only the best-scoring chunk of identical texts
         
     Returns:
         Combined and sorted list of results
     """
     try:
-        query_vector = model.encode([query_text], convert_to_tensor=False)[0].tolist()
-        all_results = []
+        if query_vector is None:
+            query_vector = encode_query(query_text)
         
-        # If no specific strategies provided, query all strategies
+        # If no specific strategies provided, query all strategies.
+        # Grouping drops points without the group_by field, so collections
+        # holding points indexed before content_hash was stored are deduplicated client-side.
         if not strategies:
-            search_results = qdrant_client.search(
-                collection_name=collection_name,
-                query_vector=query_vector,
-                limit=top_k * 3,  # Get more results to account for multiple strategies
-                score_threshold=0.3
-            )
-            
-            for hit in search_results:
-                all_results.append({
-                    "score": hit.score,
-                    "text": hit.payload['text'],
-                    "metadata": hit.payload.get("metadata", {}),
-                    "strategy": hit.payload.get("strategy", "unknown")
-                })
-        
-        # Otherwise, query each specified strategy
-        else:
-            for strategy in strategies:
-                filter_by_strategy = Filter(
-                    must=[
-                        FieldCondition(
-                            key="strategy",
-                            match=MatchValue(value=strategy)
-                        )
-                    ]
-                )
-                
-                strategy_results = qdrant_client.search(
+            if dedupe and not _has_unhashed_points(collection_name):
+                groups = retrieval_client.search_groups(
                     collection_name=collection_name,
                     query_vector=query_vector,
+                    group_by="content_hash",
                     limit=top_k,
+                    group_size=1,
                     score_threshold=0.3,
-                    filter=filter_by_strategy
+                    with_payload=True
+                ).groups
+                hits = [group.hits[0] for group in groups]
+            else:
+                hits = retrieval_client.search(
+                    collection_name=collection_name,
+                    query_vector=query_vector,
+                    limit=top_k * 3,  # Get more results to account for multiple strategies
+                    score_threshold=0.3,
+                    with_payload=True
                 )
-                
-                for hit in strategy_results:
-                    all_results.append({
-                        "score": hit.score,
-                        "text": hit.payload['text'],
-                        "metadata": hit.payload.get("metadata", {}),
-                        "strategy": hit.payload.get("strategy", strategy)
-                    })
+        
+        # Otherwise, query each specified strategy in one batch
+        else:
+            responses = retrieval_client.search_batch(
+                collection_name=collection_name,
+                requests=_dense_search_requests(query_vector, strategies, top_k)
+            )
+            hits = [hit for response in responses for hit in response]
         
         # Sort by score and take top results
-        all_results.sort(key=lambda x: x["score"], reverse=True)
-        top_results = all_results[:top_k]
+        ranked = sorted(hits, key=lambda hit: hit.score, reverse=True)
+        if dedupe:
+            seen_hashes, unique_hits = set(), []
+            for hit in ranked:
+                text_hash = hit.payload.get("content_hash") or content_hash(hit.payload.get("text", ""))
+                if text_hash in seen_hashes:
+                    continue
+                seen_hashes.add(text_hash)
+                unique_hits.append(hit)
+            ranked = unique_hits
+        top_results = _attach_linked_documents(collection_name, [_hit_to_result(hit, "vector") for hit in ranked[:top_k]])
         
-        logging.info(f"Multi-strategy query returned {len(top_results)} results from {len(all_results)} candidates")
+        logging.info(f"Multi-strategy query returned {len(top_results)} results from {len(hits)} candidates")
         return top_results
     
     except Exception as e:
         logging.error(f"Error querying collection '{collection_name}': {e}")
         return []
 
-def fuzzy_search(collection_name: str, query_text: str, min_score: int = 70, top_k: int = 5) -> List[Dict]:
+def _merge_pieces(pieces: List) -> Dict[str, Any]:
+    """Rebuild a logical chunk's payload from the payloads of its pieces."""
+    pieces = sorted(pieces, key=lambda piece: piece["metadata"]["logical_chunk"]["segment"])
+    logical = pieces[0]["metadata"]["logical_chunk"]
+    text, covered_to = "", None
+    for piece in pieces:
+        start = piece["metadata"]["start_index"] if "start_index" in piece["metadata"] else piece["metadata"]["chunk_start"]
+        # Consecutive pieces overlap: only append the part past what is already covered
+        skip = 0 if covered_to is None else max(0, covered_to - start)
+        text += piece["text"][skip:]
+        covered_to = start + len(piece["text"])
+    metadata = {key: value for key, value in pieces[0]["metadata"].items() if key != "logical_chunk"}
+    if "start_index" in metadata:
+        metadata["start_index"] = logical["start_index"]
+    else:
+        metadata.update(chunk_start=logical["start_index"], chunk_end=logical["end_index"])
+    payload = {key: value for key, value in pieces[0].items() if key not in ("logical_id", "chunk_index", "content_hash")}
+    payload.update(text=text, metadata=metadata, content_hash=logical["content_hash"])
+    return payload
+
+def _retrieve_chunks(collection_name: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Payloads of chunks by point ID. IDs of chunks that were split to fit the
+    model (no point of their own) are resolved by merging their pieces.
+    """
+    points = retrieval_client.retrieve(collection_name=collection_name, ids=list(ids), with_payload=True)
+    payloads = {str(point.id): point.payload for point in points}
+    missing = [point_id for point_id in ids if str(point_id) not in payloads]
+    if missing:
+        pieces_by_chunk = {}
+        offset = None
+        while True:
+            pieces, offset = retrieval_client.scroll(
+                collection_name=collection_name,
+                scroll_filter=Filter(must=[FieldCondition(key="logical_id", match=MatchAny(any=missing))]),
+                limit=256,
+                offset=offset,
+                with_payload=True
+            )
+            for piece in pieces:
+                pieces_by_chunk.setdefault(piece.payload["logical_id"], []).append(piece.payload)
+            if offset is None:
+                break
+        for logical_id, pieces in pieces_by_chunk.items():
+            payloads[logical_id] = _merge_pieces(pieces)
+    return payloads
+
+def merge_logical_chunks(collection_name: str, results: List[Dict]) -> List[Dict]:
+    """
+    Replace hits on pieces of a split chunk by the whole chunk.
+    
+    Several vectors of one logical chunk can match the same query; they are
+    merged into one result that keeps the best score.
+    
+    Args:
+        collection_name: Qdrant collection name
+        results: Results from query_qdrant_multi_strategy
+        
+    Returns:
+        List of results in the original score order
     """
-    Perform fuzzy text search on documents using fuzzywuzzy.
+    try:
+        logical_ids = list({result["logical_id"] for result in results if result.get("logical_id")})
+        if not logical_ids:
+            return results
+        chunks = _retrieve_chunks(collection_name, logical_ids)
+        merged, seen = [], set()
+        for result in results:
+            logical_id = result.get("logical_id")
+            if not logical_id:
+                merged.append(result)
+                continue
+            if logical_id in seen:
+                continue
+            seen.add(logical_id)
+            payload = chunks.get(logical_id)
+            if payload is None:
+                merged.append(result)
+                continue
+            merged.append({**result, "text": payload["text"], "metadata": payload["metadata"], "logical_id": None})
+        return merged
+    
+    except Exception as e:
+        logging.error(f"Error merging split chunks: {e}")
+        return results
+
+def expand_to_parents(collection_name: str, results: List[Dict], target_strategy: str = "large") -> List[Dict]:
+    """
+    Replace chunk hits by their enclosing chunk of target_strategy.
+    
+    Follows the parent links written at indexing time with point lookups
+    (no additional search). A parent that was skipped as a near-duplicate
+    is replaced by the chunk it was linked to. Hits without a parent chain to target_strategy
+    are returned unchanged; hits sharing a parent are merged, keeping the
+    best score.
+    
+    Args:
+        collection_name: Qdrant collection name
+        results: Results from query_qdrant_multi_strategy or hybrid_search
+        target_strategy: Strategy of the chunks to expand to
+        
+    Returns:
+        List of expanded results in the original score order
+    """
+    try:
+        expanded = [dict(result) for result in results]
+        pending = [result for result in expanded if result.get("strategy") != target_strategy and result.get("parent_id")]
+        link_index = get_dedup_index(collection_name, create=False)
+        while pending:
+            parent_ids = list({str(result["parent_id"]) for result in pending})
+            parents_by_id = _retrieve_chunks(collection_name, parent_ids)
+            missing = [parent_id for parent_id in parent_ids if parent_id not in parents_by_id]
+            if missing and link_index is not None:
+                # A parent skipped as a near-duplicate resolves to the copy it was linked to
+                canonical = link_index.canonical_ids(missing)
+                canonical_payloads = _retrieve_chunks(collection_name, list(set(canonical.values()))) if canonical else {}
+                for parent_id, canonical_id in canonical.items():
+                    if canonical_id in canonical_payloads:
+                        parents_by_id[parent_id] = canonical_payloads[canonical_id]
+            next_pending = []
+            for result in pending:
+                payload = parents_by_id.get(str(result["parent_id"]))
+                if payload is None:
+                    continue
+                result.update({
+                    "text": payload["text"],
+                    "metadata": payload.get("metadata", {}),
+                    "strategy": payload.get("strategy", "unknown"),
+                    "parent_id": payload.get("parent_id"),
+                    "logical_id": payload.get("logical_id")
+                })
+                if result["strategy"] != target_strategy and result["parent_id"]:
+                    next_pending.append(result)
+            pending = next_pending
+        
+        # Merge hits that expanded to the same chunk
+        merged = {}
+        for result in expanded:
+            if result["text"] not in merged:
+                merged[result["text"]] = result
+        return list(merged.values())
+    
+    except Exception as e:
+        logging.error(f"Error expanding results to '{target_strategy}' chunks: {e}")
+        return results
+
+def _payload_to_result(point_id: str, payload: Dict[str, Any], score: float, search_type: str) -> Dict[str, Any]:
+    """Result dictionary of a point."""
+    return {
+        "id": str(point_id),
+        "score": score,
+        "document_id": payload.get("document_id"),
+        "text": payload["text"],
+        "metadata": payload.get("metadata", {}),
+        "strategy": payload.get("strategy", "unknown"),
+        "parent_id": payload.get("parent_id"),
+        "logical_id": payload.get("logical_id"),
+        "search_type": search_type
+    }
+
+def _attach_linked_documents(collection_name: str, results: List[Dict]) -> List[Dict]:
+    """
+    Add "linked_documents" to each result: the documents whose near-duplicate
+    copy of the chunk, or of its whole document, was skipped and linked to it.
+    """
+    link_index = get_dedup_index(collection_name, create=False)
+    if link_index is None or not results:
+        return results
+    keys = {result["id"] for result in results}
+    keys.update(f"document:{result['document_id']}" for result in results if result.get("document_id"))
+    linked = link_index.linked_documents(keys)
+    for result in results:
+        documents = linked.get(result["id"], []) + linked.get(f"document:{result.get('document_id')}", [])
+        result["linked_documents"] = sorted(set(documents))
+    return results
+
+def _hit_to_result(hit, search_type: str) -> Dict[str, Any]:
+    """Result dictionary of a scored point."""
+    return _payload_to_result(hit.id, hit.payload, hit.score, search_type)
+
+def _strategy_filter(strategies: List[str]) -> Filter:
+    if not strategies:
+        return None
+    return Filter(must=[FieldCondition(key="strategy", match=MatchAny(any=list(strategies)))])
+
+def _dense_search_requests(query_vector: List[float], strategies: List[str], limit: int, with_payload=True) -> List[SearchRequest]:
+    """Dense search requests: one over all strategies, or limit results per strategy."""
+    if not strategies:
+        return [SearchRequest(vector=query_vector, limit=limit, score_threshold=0.3, with_payload=with_payload)]
+    return [
+        SearchRequest(
+            vector=query_vector,
+            filter=Filter(must=[FieldCondition(key="strategy", match=MatchValue(value=strategy))]),
+            limit=limit,
+            score_threshold=0.3,
+            with_payload=with_payload
+        )
+        for strategy in strategies
+    ]
+
+def _sparse_search_request(query_text: str, strategies: List[str], top_k: int, with_payload=True) -> SearchRequest:
+    """BM25 search request, or None if the query has no searchable terms."""
+    sparse_vector = bm25_query_vector(query_text)
+    if not sparse_vector.indices:
+        return None
+    return SearchRequest(
+        vector=NamedSparseVector(name=SPARSE_VECTOR_NAME, vector=sparse_vector),
+        filter=_strategy_filter(strategies),
+        limit=top_k,
+        with_payload=with_payload
+    )
+
+def lexical_search(collection_name: str, query_text: str, strategies: List[str] = None, top_k: int = 5) -> List[Dict]:
+    """
+    Keyword search with BM25 over the collection's sparse vectors.
+    
+    Uses Qdrant's inverted index, so latency does not grow with the number
+    of chunks. Collections without sparse vectors fall back to fuzzy_search.
     
     Args:
         collection_name: Qdrant collection name
         query_text: Query text
-        min_score: Minimum similarity score (0-100)
+        strategies: List of strategies to search (None = all strategies)
         top_k: Maximum number of results to return
         
     Returns:
-        List of matching results with scores
+        List of matching results with raw BM25 scores
     """
     try:
-        # Get all documents from the collection
-        # In a production environment, this would need pagination for large collections
-        scroll_results = qdrant_client.scroll(
+        if not has_sparse_vectors(collection_name):
+            return fuzzy_search(collection_name, query_text, min_score=70, top_k=top_k)
+        request = _sparse_search_request(query_text, strategies, top_k)
+        if request is None:
+            return []
+        hits = retrieval_client.search(
             collection_name=collection_name,
-            limit=1000,  # Consider implementing proper pagination in production
+            query_vector=request.vector,
+            query_filter=request.filter,
+            limit=top_k,
             with_payload=True
         )
+        results = _attach_linked_documents(collection_name, [_hit_to_result(hit, "bm25") for hit in hits])
+        logging.info(f"BM25 search returned {len(results)} results")
+        return results
+    
+    except Exception as e:
+        logging.error(f"Error performing BM25 search: {e}")
+        return []
+
+def rebuild_trigram_index(collection_name: str) -> int:
+    """
+    Build the collection's trigram index from scratch by scrolling all chunk texts.
+    
+    Runs automatically the first time fuzzy_search is used on a collection
+    whose index is missing or incomplete.
+    
+    Returns:
+        Number of chunks indexed
+    """
+    index = get_trigram_index(collection_name)
+    index.reset()
+    total, offset = 0, None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            limit=1000,
+            offset=offset,
+            with_payload=["text"]
+        )
+        index.add((str(point.id), point.payload["text"]) for point in points if "text" in point.payload)
+        total += len(points)
+        if offset is None:
+            break
+    # Only a finished scroll makes the index complete; an interrupted rebuild is redone next time
+    index.mark_complete()
+    logging.info(f"Built trigram index for '{collection_name}' with {total} chunks")
+    return total
+
+def _fuzzy_scores(query_text: str, texts: List[str]) -> List[int]:
+    """token_set_ratio of the query against each text, in one vectorized call when rapidfuzz is installed."""
+    try:
+        from rapidfuzz import process as rapidfuzz_process, fuzz as rapidfuzz_fuzz, utils as rapidfuzz_utils
+    except ImportError:
+        return [fuzz.token_set_ratio(query_text, text) for text in texts]
+    scores = rapidfuzz_process.cdist(
+        [query_text], texts, scorer=rapidfuzz_fuzz.token_set_ratio, processor=rapidfuzz_utils.default_process
+    )
+    return [int(round(score)) for score in scores[0]]
+
+def fuzzy_search(collection_name: str, query_text: str, min_score: int = 70, top_k: int = 5) -> List[Dict]:
+    """
+    Perform typo-tolerant fuzzy text search on documents.
+    
+    A character-trigram index of the collection (trigram_index.py) yields a
+    small set of candidate chunks; only those are fetched and scored with
+    token_set_ratio (vectorized with rapidfuzz when installed, fuzzywuzzy
+    otherwise). Cost therefore depends on the candidate count, not on the
+    size of the collection.
+    
+    Args:
+        collection_name: Qdrant collection name
+        query_text: Query text
+        min_score: Minimum similarity score (0-100)
+        top_k: Maximum number of results to return
         
-        all_documents = scroll_results[0]
-        if not all_documents:
+    Returns:
+        List of matching results with scores
+    """
+    try:
+        index = get_trigram_index(collection_name)
+        if not index.complete:
+            rebuild_trigram_index(collection_name)
+        candidate_ids = index.candidates(query_text)
+        if not candidate_ids:
             return []
         
-        # Extract text content for fuzzy matching
-        documents_text = [(doc.id, doc.payload["text"]) for doc in all_documents if "text" in doc.payload]
+        candidates = retrieval_client.retrieve(
+            collection_name=collection_name,
+            ids=candidate_ids,
+            with_payload=True,
+            with_vectors=False
+        )
+        candidates = [doc for doc in candidates if "text" in doc.payload]
         
         # Perform fuzzy matching
+        similarities = _fuzzy_scores(query_text.lower(), [doc.payload["text"].lower() for doc in candidates])
         results = []
-        for doc_id, text in documents_text:
-            # Calculate similarity ratio
-            similarity = fuzz.token_set_ratio(query_text.lower(), text.lower())
-            
+        for doc, similarity in zip(candidates, similarities):
             if similarity >= min_score:
-                # Find the original document to get the full data
-                doc = next((d for d in all_documents if d.id == doc_id), None)
-                if doc:
-                    results.append({
-                        "score": similarity / 100.0,  # Normalize to 0-1 scale to match vector search
-                        "text": doc.payload["text"],
-                        "metadata": doc.payload.get("metadata", {}),
-                        "strategy": doc.payload.get("strategy", "unknown"),
-                        "search_type": "fuzzy"
-                    })
+                results.append({
+                    "id": str(doc.id),
+                    "score": similarity / 100.0,  # Normalize to 0-1 scale to match vector search
+                    "text": doc.payload["text"],
+                    "metadata": doc.payload.get("metadata", {}),
+                    "strategy": doc.payload.get("strategy", "unknown"),
+                    "search_type": "fuzzy"
+                })
         
         # Sort by score and take top results
         results.sort(key=lambda x: x["score"], reverse=True)
         top_results = results[:top_k]
         
-        logging.info(f"Fuzzy search returned {len(top_results)} results")
+        logging.info(f"Fuzzy search returned {len(top_results)} results from {len(candidates)} candidates")
         return top_results
     
     except Exception as e:
@@ -299,23 +1102,57 @@ def hybrid_search(
     strategies: List[str] = None,
     vector_weight: float = 0.7, 
     fuzzy_weight: float = 0.3,
-    top_k: int = 5
+    top_k: int = 5,
+    query_vector: List[float] = None,
+    fusion: str = HYBRID_FUSION,
+    candidate_pool: int = HYBRID_CANDIDATE_POOL,
+    use_cache: bool = True
 ) -> List[Dict]:
     """
-    Perform hybrid search combining vector search and fuzzy text search.
+    Perform hybrid search combining dense vector search and BM25 keyword search.
+    
+    Both legs are sent to Qdrant in a single search_batch call and return up
+    to candidate_pool point IDs each (per strategy for the dense leg), with
+    only the content hash as payload. The legs are fused on point ID with
+    reciprocal-rank fusion ("rrf") or a weighted sum of min-max normalized
+    scores ("score"); candidates with the same text are collapsed, and full
+    payloads are fetched for the final top_k only. Collections created
+    without sparse vectors use fuzzy_search as the lexical leg instead.
+    
+    Results are cached per (collection, normalized query, strategies,
+    weights, top_k) and tagged with the collection version read before the
+    search; indexing bumps the version, so a cached result never predates
+    the last ingest into the collection.
     
     Args:
         collection_name: Qdrant collection name
         query_text: Query text
         strategies: List of strategies to query (None = all strategies)
         vector_weight: Weight for vector search results (0-1)
-        fuzzy_weight: Weight for fuzzy search results (0-1)
+        fuzzy_weight: Weight for lexical (BM25 or fuzzy) search results (0-1)
         top_k: Number of results to return
+        query_vector: Precomputed embedding of query_text (encoded once if None)
+        fusion: "rrf" (reciprocal rank) or "score" (normalized score)
+        candidate_pool: Candidates taken from each leg before fusion
+        use_cache: Serve and store results in the retrieval cache
         
     Returns:
-        List of combined and ranked results
+        List of combined and ranked results with per-leg scores and ranks
     """
     try:
+        cache = get_retrieval_cache() if use_cache else None
+        if cache is not None:
+            # Read the version first: results computed during an ingest are tagged with the old one
+            version = get_collection_version(collection_name)
+            cache_key = make_retrieval_key(
+                collection_name, query_text, strategies=strategies, vector_weight=vector_weight,
+                fuzzy_weight=fuzzy_weight, top_k=top_k, fusion=fusion, candidate_pool=candidate_pool
+            )
+            cached = cache.get(cache_key, version)
+            if cached is not None:
+                logging.info(f"Hybrid search served {len(cached)} results from the retrieval cache")
+                return cached
+        
         # Validate weights
         if vector_weight + fuzzy_weight != 1.0:
             logging.warning("Weights don't sum to 1.0, normalizing...")
@@ -323,59 +1160,85 @@ def hybrid_search(
             vector_weight /= total
             fuzzy_weight /= total
         
-        # Get results from both search methods
-        vector_results = query_qdrant_multi_strategy(collection_name, query_text, strategies, top_k * 2)
-        fuzzy_results = fuzzy_search(collection_name, query_text, min_score=70, top_k=top_k * 2)
-        
-        # Combine results and assign weighted scores
-        combined_results = {}
-        
-        # Process vector search results
-        for result in vector_results:
-            doc_id = result.get("id", str(uuid.uuid4()))  # Use a unique ID if not available
-            combined_results[doc_id] = {
-                "vector_score": result["score"],
-                "fuzzy_score": 0,
-                "text": result["text"],
-                "metadata": result["metadata"],
-                "strategy": result["strategy"]
-            }
-        
-        # Process fuzzy search results
-        for result in fuzzy_results:
-            doc_id = result.get("id", str(uuid.uuid4()))
-            if doc_id in combined_results:
-                # Document already in results, update fuzzy score
-                combined_results[doc_id]["fuzzy_score"] = result["score"]
-            else:
-                # New document
-                combined_results[doc_id] = {
-                    "vector_score": 0,
-                    "fuzzy_score": result["score"],
-                    "text": result["text"],
-                    "metadata": result["metadata"],
-                    "strategy": result["strategy"]
-                }
+        if query_vector is None:
+            query_vector = encode_query(query_text)
+        candidate_pool = max(candidate_pool, top_k)
+        
+        # Dense and BM25 legs in one round trip, IDs and content hashes only
+        requests = _dense_search_requests(query_vector, strategies, candidate_pool, with_payload=["content_hash"])
+        sparse = has_sparse_vectors(collection_name)
+        sparse_request = None
+        if sparse:
+            sparse_request = _sparse_search_request(query_text, strategies, candidate_pool, with_payload=["content_hash"])
+        if sparse_request is not None:
+            requests.append(sparse_request)
+        responses = retrieval_client.search_batch(collection_name=collection_name, requests=requests)
+        
+        content_hashes = {}
+        dense_hits = [hit for response in responses[:len(requests) - (sparse_request is not None)] for hit in response]
+        dense_hits.sort(key=lambda hit: hit.score, reverse=True)
+        vector_leg = []
+        for hit in dense_hits[:candidate_pool]:
+            vector_leg.append((str(hit.id), hit.score))
+            content_hashes[str(hit.id)] = (hit.payload or {}).get("content_hash")
+        
+        lexical_leg = []
+        if sparse_request is not None:
+            for hit in responses[-1]:
+                lexical_leg.append((str(hit.id), hit.score))
+                content_hashes[str(hit.id)] = (hit.payload or {}).get("content_hash")
+        elif not sparse:
+            for result in fuzzy_search(collection_name, query_text, min_score=70, top_k=candidate_pool):
+                lexical_leg.append((result["id"], result["score"]))
+                content_hashes[result["id"]] = content_hash(result["text"])
+        
+        fused = fuse([vector_leg, lexical_leg], [vector_weight, fuzzy_weight], method=fusion)
+        
+        # The same text can be indexed by several strategies; keep its best-ranked copy
+        selected, seen_hashes = [], set()
+        for point_id, score in fused:
+            text_hash = content_hashes.get(point_id)
+            if text_hash is not None:
+                if text_hash in seen_hashes:
+                    continue
+                seen_hashes.add(text_hash)
+            selected.append((point_id, score))
+            if len(selected) == top_k:
+                break
         
-        # Calculate combined scores
-        results_list = []
-        for doc_id, result in combined_results.items():
-            combined_score = (result["vector_score"] * vector_weight) + (result["fuzzy_score"] * fuzzy_weight)
-            results_list.append({
-                "id": doc_id,
-                "score": combined_score,
-                "vector_score": result["vector_score"],
-                "fuzzy_score": result["fuzzy_score"],
-                "text": result["text"],
-                "metadata": result["metadata"],
-                "strategy": result["strategy"]
-            })
-        
-        # Sort by combined score and take top results
-        results_list.sort(key=lambda x: x["score"], reverse=True)
-        top_results = results_list[:top_k]
-        
-        logging.info(f"Hybrid search returned {len(top_results)} results")
+        # Payloads for the final results only
+        points = retrieval_client.retrieve(
+            collection_name=collection_name,
+            ids=[point_id for point_id, _ in selected],
+            with_payload=True,
+            with_vectors=False
+        )
+        payloads = {str(point.id): point.payload for point in points}
+        vector_ranks = {point_id: (rank, score) for rank, (point_id, score) in enumerate(vector_leg, start=1)}
+        lexical_ranks = {point_id: (rank, score) for rank, (point_id, score) in enumerate(lexical_leg, start=1)}
+        
+        top_results = []
+        for point_id, score in selected:
+            payload = payloads.get(point_id)
+            if payload is None:
+                continue  # deleted since the search
+            result = _payload_to_result(point_id, payload, score, "hybrid")
+            result.update(
+                vector_score=vector_ranks.get(point_id, (None, 0.0))[1],
+                lexical_score=lexical_ranks.get(point_id, (None, 0.0))[1],
+                vector_rank=vector_ranks.get(point_id, (None,))[0],
+                lexical_rank=lexical_ranks.get(point_id, (None,))[0],
+                fusion=fusion
+            )
+            top_results.append(result)
+        _attach_linked_documents(collection_name, top_results)
+        
+        logging.info(
+            f"Hybrid search returned {len(top_results)} results "
+            f"({fusion} fusion of {len(vector_leg)} vector and {len(lexical_leg)} lexical candidates)"
+        )
+        if cache is not None:
+            cache.put(cache_key, version, top_results)
         return top_results
     
     except Exception as e:
@@ -1,12 +1,13 @@
 import os
+import time
 import logging
 import uuid
-from typing import List, Dict, Any
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 import qdrant_helper as qdrant_helper
-from document_loader import load_and_chunk_documents_with_multiple_strategies, create_rolling_window_chunks
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
+from document_loader import load_documents, build_chunk_views
+from embedding_provider import encode_query
+from answer_cache import get_answer_cache
+from collection_versions import get_collection_version
 from openai import OpenAI
 
 load_dotenv()
@@ -23,28 +24,45 @@ if not DEEPSEEK_API_KEY:
 # Initialize OpenAI client with DeepSeek endpoint
 client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com")
 
-# Load Sentence Transformer for Query Embeddings
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-
-def generate_answer(query, context, max_tokens=256, temperature=1.0):
+def generate_answer(query, context, max_tokens=256, temperature=1.0, query_vector=None, chunk_ids=None,
+                    collection_name=qdrant_helper.COLLECTION_NAME):
     """
     Generate an answer for a query based on the provided context using DeepSeek API.
     
+    When query_vector and chunk_ids are given, the semantic answer cache is
+    consulted first: a previous answer is reused if its query was within
+    ANSWER_CACHE_MAX_DISTANCE of this one and was answered from the same
+    set of chunks, with the collection unchanged since. Failed calls are
+    not cached.
+    
     Args:
         query (str): The user's question
         context (str): The context text to use for answering
         max_tokens (int): Maximum tokens in the response
         temperature (float): Temperature for response generation
+        query_vector (list): Embedding of the query (enables the answer cache)
+        chunk_ids (iterable): IDs of the chunks the context was built from
+        collection_name (str): Collection the chunks were retrieved from
         
     Returns:
         str: The generated answer
     """
-    logger.info("Generating answer using DeepSeek API")
     if not context.strip():
         logger.warning("Empty context provided to generate_answer")
         return "No information found in the database."
 
+    cache = get_answer_cache() if query_vector is not None and chunk_ids is not None else None
+    if cache is not None:
+        version = get_collection_version(collection_name)
+        context_key = (frozenset(chunk_ids), max_tokens, temperature)
+        answer = cache.get(query_vector, collection_name, version, context_key)
+        if answer is not None:
+            logger.info("Answer served from the semantic answer cache")
+            return answer
+
+    logger.info("Generating answer using DeepSeek API")
     try:
+        start = time.perf_counter()
         # Construct a prompt that includes both the context and the question
         prompt = f"""
 Context information:
@@ -68,19 +86,24 @@ Answer:"""
         
         # Extract the response text
         answer = response.choices[0].message.content
+        if cache is not None:
+            cache.put(query_vector, collection_name, version, context_key, answer, (time.perf_counter() - start) * 1000)
         return answer
 
     except Exception as e:
         logger.error(f"Error generating answer: {str(e)}")
         return f"Error generating answer: {str(e)}"
 
-def process_document(file_path, document_id=None):
+def process_document(file_path, document_id=None, embedding_mode="exact", max_tokens=None):
     """
     Process a document with multiple chunking strategies and index it in Qdrant.
     
     Args:
         file_path: Path to the document
         document_id: Optional document ID (will generate UUID if not provided)
+        embedding_mode: "exact" to encode every chunk, "pooled" to pool sentence vectors
+        max_tokens: Split chunks longer than this many model tokens ("model" = the
+            embedding model's limit, 0 = off, None = CHUNK_MAX_TOKENS)
         
     Returns:
         Dictionary with processing results
@@ -98,27 +121,13 @@ def process_document(file_path, document_id=None):
             {"id": "large", "chunk_size": 2048, "chunk_overlap": 512},
         ]
         
-        # Load document with different chunking strategies
-        chunking_results = load_and_chunk_documents_with_multiple_strategies(
-            file_path=file_path,
-            chunk_strategies=chunk_strategies
-        )
-        
-        # Get original document to create rolling window chunks
-        if file_path.endswith('.pdf'):
-            loader = PyPDFLoader(file_path)
-        elif file_path.endswith('.docx'):
-            loader = Docx2txtLoader(file_path)
-        else:
-            loader = TextLoader(file_path)
-        
-        documents = loader.load()
-        
-        # Create rolling window chunks
-        rolling_window_chunks = create_rolling_window_chunks(
-            documents=documents,
-            window_size=1000,
-            step_size=200
+        # Load the document once and derive all strategies, including the rolling window
+        documents = load_documents(file_path)
+        chunking_results = build_chunk_views(
+            documents,
+            chunk_strategies=chunk_strategies,
+            rolling_window={"window_size": 1000, "step_size": 200},
+            max_tokens=max_tokens
         )
         
         # Index document with all strategies
@@ -126,16 +135,14 @@ def process_document(file_path, document_id=None):
             collection_name=qdrant_helper.COLLECTION_NAME,
             document_id=document_id,
             chunking_strategies=chunking_results,
-            rolling_window_chunks=rolling_window_chunks
+            embedding_mode=embedding_mode,
+            source_documents=documents
         )
         
         return {
             "document_id": document_id,
-            "strategies": list(chunking_results.keys()) + ["rolling_window"],
-            "chunks_count": {
-                **{k: len(v) for k, v in chunking_results.items()},
-                "rolling_window": len(rolling_window_chunks)
-            },
+            "strategies": list(chunking_results.keys()),
+            "chunks_count": {k: len(v) for k, v in chunking_results.items()},
             "indexing_result": indexing_result
         }
     
@@ -157,13 +164,16 @@ def answer_query_enhanced(user_query, search_type="hybrid", top_k=5):
     """
     try:
         logger.info(f"🔍 Processing query: {user_query}")
+        # Encoded once for retrieval and the answer cache
+        query_vector = encode_query(user_query)
         
         # Get relevant contexts based on search type
         if search_type == "vector":
             context_items = qdrant_helper.query_qdrant_multi_strategy(
                 collection_name=qdrant_helper.COLLECTION_NAME,
                 query_text=user_query,
-                top_k=top_k
+                top_k=top_k,
+                query_vector=query_vector
             )
         elif search_type == "fuzzy":
             context_items = qdrant_helper.fuzzy_search(
@@ -177,7 +187,8 @@ def answer_query_enhanced(user_query, search_type="hybrid", top_k=5):
                 query_text=user_query,
                 vector_weight=0.7,
                 fuzzy_weight=0.3,
-                top_k=top_k
+                top_k=top_k,
+                query_vector=query_vector
             )
         
         logger.debug(f"Retrieved {len(context_items)} contexts using {search_type} search")
@@ -199,7 +210,11 @@ def answer_query_enhanced(user_query, search_type="hybrid", top_k=5):
             return {"answer": "No relevant information found.", "chunks": []}
 
         # Generate answer from combined context
-        generated_answer = generate_answer(user_query, combined_context)
+        generated_answer = generate_answer(
+            user_query, combined_context,
+            query_vector=query_vector,
+            chunk_ids=[item["id"] for item in context_items]
+        )
         logger.info("Answer generated successfully")
 
         return {
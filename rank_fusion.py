@@ -0,0 +1,70 @@
+import os
+import logging
+from typing import Dict, List, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+RRF_K = int(os.getenv("RRF_K", "60"))  # rank offset of reciprocal-rank fusion
+FUSION_METHODS = ("rrf", "score")
+
+
+def reciprocal_rank_fusion(legs: List[List[Tuple[str, float]]], weights: List[float], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked result lists by reciprocal rank.
+
+    Each ID scores sum(weight / (k + rank)) over the legs that returned it
+    (rank starts at 1). Only ranks matter, so legs with incomparable scores
+    (cosine, BM25) fuse without calibration.
+
+    Args:
+        legs: One list of (id, score) per leg, best first
+        weights: Weight of each leg
+        k: Rank offset; larger values flatten the contribution of top ranks
+
+    Returns:
+        List of (id, fused score), best first
+    """
+    fused: Dict[str, float] = {}
+    for leg, weight in zip(legs, weights):
+        for rank, (point_id, _) in enumerate(leg, start=1):
+            fused[point_id] = fused.get(point_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def normalized_score_fusion(legs: List[List[Tuple[str, float]]], weights: List[float]) -> List[Tuple[str, float]]:
+    """
+    Fuse result lists by a weighted sum of min-max normalized scores.
+
+    Scores are rescaled to 0-1 within each leg's candidates (a leg with a
+    single candidate, or all-equal scores, gives them 1.0). An ID missing from
+    a leg contributes 0 for that leg.
+
+    Args:
+        legs: One list of (id, score) per leg, best first
+        weights: Weight of each leg
+
+    Returns:
+        List of (id, fused score), best first
+    """
+    fused: Dict[str, float] = {}
+    for leg, weight in zip(legs, weights):
+        if not leg:
+            continue
+        scores = [score for _, score in leg]
+        low, high = min(scores), max(scores)
+        for point_id, score in leg:
+            normalized = (score - low) / (high - low) if high > low else 1.0
+            fused[point_id] = fused.get(point_id, 0.0) + weight * normalized
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def fuse(legs: List[List[Tuple[str, float]]], weights: List[float], method: str = "rrf") -> List[Tuple[str, float]]:
+    """Fuse result lists with "rrf" (reciprocal rank) or "score" (normalized score) fusion."""
+    if method == "rrf":
+        return reciprocal_rank_fusion(legs, weights)
+    if method == "score":
+        return normalized_score_fusion(legs, weights)
+    raise ValueError(f"Unknown fusion method '{method}'; expected one of {FUSION_METHODS}")
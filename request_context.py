@@ -0,0 +1,28 @@
+import threading
+from typing import List
+
+from embedding_provider import encode_query
+
+
+class RequestContext:
+    """
+    Per-request state shared by the retrieval and memory APIs.
+
+    The query embedding is computed lazily on first access and then reused,
+    so a chat turn encodes its query exactly once.
+    """
+
+    def __init__(self, query: str, session_id: str = None, query_vector: List[float] = None):
+        self.query = query
+        self.session_id = session_id
+        self._query_vector = query_vector
+        self._lock = threading.Lock()
+
+    @property
+    def query_vector(self) -> List[float]:
+        """Embedding of the query, encoded on first use."""
+        if self._query_vector is None:
+            with self._lock:
+                if self._query_vector is None:
+                    self._query_vector = encode_query(self.query)
+        return self._query_vector
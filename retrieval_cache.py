@@ -0,0 +1,163 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1024"))  # 0 disables the cache
+RETRIEVAL_CACHE_TTL_S = float(os.getenv("RETRIEVAL_CACHE_TTL_S", "600"))
+RETRIEVAL_CACHE_DIR = os.getenv("RETRIEVAL_CACHE_DIR", "")  # set to share entries between processes
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def normalize_query(query_text: str) -> str:
+    """Case- and whitespace-insensitive form of a query."""
+    return " ".join(query_text.lower().split())
+
+
+def make_retrieval_key(collection_name: str, query_text: str, **params) -> str:
+    """Cache key of a search: collection, normalized query and every parameter that shapes the results."""
+    key = {"collection": collection_name, "query": normalize_query(query_text)}
+    for name, value in params.items():
+        if isinstance(value, float):
+            value = round(value, 6)
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted(value)
+        key[name] = value
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class RetrievalCache:
+    """
+    LRU cache of search results with a TTL, tagged with the collection version.
+
+    An entry is only served while its collection is still at the version it
+    was computed for, so results from before an ingest are never returned.
+    With cache_dir set, entries are also written to SQLite and shared with
+    other processes using the same directory.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES, ttl_s: float = RETRIEVAL_CACHE_TTL_S, cache_dir: str = RETRIEVAL_CACHE_DIR):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (version, expires_at, results), oldest first
+        self._db = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(cache_dir, "retrieval_cache.sqlite"), check_same_thread=False, timeout=30)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, version INTEGER NOT NULL, expires_at REAL NOT NULL, results TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    def _load(self, key: str):
+        """Entry from the shared disk cache, or None. Caller holds _lock."""
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT version, expires_at, results FROM entries WHERE key = ?", (key,)).fetchone()
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def get(self, key: str, version: int) -> List[Dict[str, Any]]:
+        """Cached results for key at the given collection version, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry_version, expires_at, results = entry
+            if entry_version != version or expires_at < time.time():
+                if entry_version != version:
+                    self.stale += 1
+                else:
+                    self.expired += 1
+                self.misses += 1
+                self._entries.pop(key, None)
+                return None
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            self.hits += 1
+            return copy.deepcopy(results)
+
+    def put(self, key: str, version: int, results: List[Dict[str, Any]]):
+        """Store results computed at the given collection version."""
+        entry = (version, time.time() + self.ttl_s, copy.deepcopy(results))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                    (key, version, entry[1], json.dumps(results))
+                )
+                self._db.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),))
+                self._db.commit()
+
+    def _evict(self):
+        """Drop least recently used entries beyond max_entries. Caller holds _lock."""
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters (misses include stale and expired entries) and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """The process-wide retrieval cache, or None when RETRIEVAL_CACHE_MAX_ENTRIES is 0."""
+    global _cache
+    if RETRIEVAL_CACHE_MAX_ENTRIES <= 0:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RetrievalCache()
+    return _cache
+
+
+def get_retrieval_cache_stats() -> Dict[str, Any]:
+    """Counters of the retrieval cache ({} when it is disabled)."""
+    cache = get_retrieval_cache()
+    return cache.stats() if cache is not None else {}
@@ -0,0 +1,120 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "8"))
+RETRIEVAL_TIMEOUT_S = float(os.getenv("RETRIEVAL_TIMEOUT_S", "5.0"))
+# Request timeout of the Qdrant clients used by retrieval legs, in whole seconds. A leg
+# cannot be cancelled once it runs, so this bounds how long a timed-out leg holds a worker.
+RETRIEVAL_CLIENT_TIMEOUT_S = int(os.getenv("RETRIEVAL_CLIENT_TIMEOUT_S", "5"))
+
+_executor = None
+_executor_lock = threading.Lock()
+_abandoned_legs = 0  # legs that missed their deadline and are still running
+_abandoned_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Worker pool shared by all requests of this process."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+    return _executor
+
+
+def _abandon(future):
+    """Count a timed-out leg until it finishes."""
+    global _abandoned_legs
+    with _abandoned_lock:
+        _abandoned_legs += 1
+
+    def finished(_):
+        global _abandoned_legs
+        with _abandoned_lock:
+            _abandoned_legs -= 1
+
+    future.add_done_callback(finished)
+
+
+def abandoned_legs() -> int:
+    """Number of timed-out legs still occupying retrieval workers."""
+    with _abandoned_lock:
+        return _abandoned_legs
+
+
+def _timed(leg: Callable[[], Any]) -> Tuple[Any, Exception, float]:
+    """Run a leg and return (result, exception, elapsed ms)."""
+    start = time.perf_counter()
+    try:
+        return leg(), None, (time.perf_counter() - start) * 1000
+    except Exception as e:
+        return None, e, (time.perf_counter() - start) * 1000
+
+
+def run_retrieval_legs(
+    legs: Dict[str, Callable[[], Any]],
+    timeouts: Dict[str, float] = None,
+    defaults: Dict[str, Any] = None,
+    default_timeout: float = RETRIEVAL_TIMEOUT_S
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Run independent retrieval legs concurrently, each with its own deadline.
+
+    A leg that raises or misses its deadline yields its default value (None
+    unless given) instead of failing or stalling the request. A running leg
+    cannot be cancelled: it keeps its worker until it returns, and its result
+    is discarded. Legs should therefore bound their own I/O (the Qdrant
+    clients used for retrieval time out after RETRIEVAL_CLIENT_TIMEOUT_S),
+    and a warning is logged while timed-out legs fill half the pool.
+
+    Args:
+        legs: {leg name: function without arguments}
+        timeouts: Per-leg timeouts in seconds, measured from the start of the fan-out
+        defaults: Per-leg values used when a leg fails or times out
+        default_timeout: Timeout for legs without an entry in timeouts
+
+    Returns:
+        ({leg name: result}, {leg name: {"status": "ok" | "timeout" | "error", "ms": ..., "error": ...}})
+    """
+    timeouts = timeouts or {}
+    defaults = defaults or {}
+    start = time.perf_counter()
+    abandoned = abandoned_legs()
+    if abandoned >= max(1, RETRIEVAL_WORKERS // 2):
+        logger.warning(
+            f"Timed-out retrieval legs still hold {abandoned} of {RETRIEVAL_WORKERS} workers; new legs may queue"
+        )
+    futures = {name: _get_executor().submit(_timed, leg) for name, leg in legs.items()}
+
+    results, timings = {}, {}
+    # Wait for the legs with the shortest deadline first
+    for name in sorted(futures, key=lambda name: timeouts.get(name, default_timeout)):
+        future = futures[name]
+        remaining = timeouts.get(name, default_timeout) - (time.perf_counter() - start)
+        try:
+            result, error, elapsed_ms = future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            if not future.cancel():
+                _abandon(future)
+            results[name] = defaults.get(name)
+            timings[name] = {"status": "timeout", "ms": round((time.perf_counter() - start) * 1000, 1)}
+            logger.warning(f"Retrieval leg '{name}' timed out after {timeouts.get(name, default_timeout)}s; continuing without it")
+            continue
+        if error is not None:
+            results[name] = defaults.get(name)
+            timings[name] = {"status": "error", "ms": round(elapsed_ms, 1), "error": str(error)}
+            logger.error(f"Retrieval leg '{name}' failed: {error}")
+        else:
+            results[name] = result
+            timings[name] = {"status": "ok", "ms": round(elapsed_ms, 1)}
+    return results, timings
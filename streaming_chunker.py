@@ -0,0 +1,255 @@
+import os
+import logging
+from collections import deque
+from itertools import tee
+from typing import Dict, Iterator, List, Tuple
+
+from langchain_core.documents import Document
+
+from document_loader import DEFAULT_CHUNK_STRATEGIES, SEGMENT_SEPARATORS, segment_text, base_segment_size_for
+from index_manifest import content_hash
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+STREAMABLE_EXTENSIONS = (".txt", ".md")
+STREAM_BLOCK_SIZE = 1024 * 1024  # characters per read
+STREAMING_THRESHOLD_MB = int(os.getenv("STREAMING_THRESHOLD_MB", "32"))
+
+
+def should_stream(file_path: str) -> bool:
+    """Whether a file is plain text and large enough to be chunked without loading it whole."""
+    return (
+        file_path.lower().endswith(STREAMABLE_EXTENSIONS)
+        and os.path.getsize(file_path) > STREAMING_THRESHOLD_MB * 1024 * 1024
+    )
+
+
+def iter_text_blocks(file_path: str, block_size: int = STREAM_BLOCK_SIZE) -> Iterator[str]:
+    """Read a text file in blocks of at most block_size characters."""
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def iter_segments(file_path: str, max_size: int, block_size: int = STREAM_BLOCK_SIZE) -> Iterator[Tuple[int, int, str]]:
+    """
+    Stream the base segmentation of a file as (start, end, text) with absolute offsets.
+
+    Text is buffered only up to the last paragraph (or line, sentence, word)
+    boundary of what has been read, and each buffered piece is segmented with
+    segment_text. Segments are contiguous across read boundaries.
+    """
+    pending = ""
+    offset = 0
+    blocks = iter_text_blocks(file_path, block_size)
+    while True:
+        block = next(blocks, None)
+        if block is not None:
+            pending += block
+            cut = 0
+            for separator in SEGMENT_SEPARATORS[:-1]:
+                position = pending.rfind(separator)
+                if position > 0:
+                    cut = position + len(separator)
+                    break
+            if not cut:
+                # No boundary at all: keep reading, but never buffer without limit
+                if len(pending) < 4 * block_size:
+                    continue
+                cut = len(pending)
+        else:
+            cut = len(pending)
+
+        piece = pending[:cut]
+        for start, end in segment_text(piece, max_size):
+            yield offset + start, offset + end, piece[start:end]
+        pending = pending[cut:]
+        offset += cut
+        if block is None:
+            return
+
+
+def _pack_stream(segments: Iterator[Tuple[int, int, str]], chunk_size: int, chunk_overlap: int) -> Iterator[Tuple[int, int, str]]:
+    """
+    Streaming pack_segments: group consecutive segments into chunks of at most
+    chunk_size characters that overlap by at most chunk_overlap characters.
+    Only the segments of the current chunk are held in memory.
+
+    Yields:
+        (start, end, text) of each chunk, stripped of surrounding whitespace
+    """
+    window = deque()
+    segments = iter(segments)
+    exhausted = False
+
+    def pull() -> bool:
+        nonlocal exhausted
+        if exhausted:
+            return False
+        segment = next(segments, None)
+        if segment is None:
+            exhausted = True
+            return False
+        window.append(segment)
+        return True
+
+    while window or pull():
+        last = 0
+        while (last + 1 < len(window) or pull()) and window[last + 1][1] - window[0][0] <= chunk_size:
+            last += 1
+
+        text = "".join(window[i][2] for i in range(last + 1))
+        stripped = text.strip()
+        if stripped:
+            start = window[0][0] + len(text) - len(text.lstrip())
+            yield start, start + len(stripped), stripped
+
+        if last == len(window) - 1 and not pull():
+            return
+        # Step back over trailing segments that fit in the overlap
+        next_first = last + 1
+        while next_first - 1 > 0 and window[last][1] - window[next_first - 1][0] <= chunk_overlap:
+            next_first -= 1
+        for _ in range(next_first):
+            window.popleft()
+
+
+def _link_parents_stream(
+    children: Iterator[Tuple[int, int, str]],
+    parents: Iterator[Tuple[int, int, str]],
+    parent_strategy: str
+) -> Iterator[Tuple[int, int, str, Dict]]:
+    """Streaming _link_parents: attach the most-overlapping parent chunk to each child."""
+    window = deque()  # (start, end, content_hash) of candidate parents
+    for start, end, text in children:
+        # Keep the last parent starting at or before the child plus the one after it
+        while len(window) < 2 or window[-1][0] <= start:
+            parent = next(parents, None)
+            if parent is None:
+                break
+            window.append((parent[0], parent[1], content_hash(parent[2])))
+        while len(window) >= 2 and window[1][0] <= start:
+            window.popleft()
+        best, best_overlap = None, -1
+        for candidate in window:
+            overlap = min(end, candidate[1]) - max(start, candidate[0])
+            if overlap > best_overlap:
+                best, best_overlap = candidate, overlap
+        parent_link = None
+        if best is not None:
+            parent_link = {"strategy": parent_strategy, "start_index": best[0], "content_hash": best[2]}
+        yield start, end, text, parent_link
+
+
+def _stream_strategy(
+    file_path: str,
+    level: Dict[str, int],
+    parent_level: Dict[str, int],
+    segment_size: int,
+    block_size: int
+) -> Iterator[Document]:
+    segments = iter_segments(file_path, segment_size, block_size)
+    if parent_level is None:
+        chunks = ((start, end, text, None) for start, end, text in _pack_stream(segments, level["chunk_size"], level["chunk_overlap"]))
+    else:
+        child_segments, parent_segments = tee(segments)
+        chunks = _link_parents_stream(
+            _pack_stream(child_segments, level["chunk_size"], level["chunk_overlap"]),
+            _pack_stream(parent_segments, parent_level["chunk_size"], parent_level["chunk_overlap"]),
+            parent_level["id"]
+        )
+    for start, end, text, parent_link in chunks:
+        metadata = {"source": file_path, "doc_index": 0, "start_index": start}
+        if parent_link:
+            metadata["parent"] = parent_link
+        yield Document(page_content=text, metadata=metadata)
+
+
+def _stream_rolling_window(file_path: str, window_size: int, step_size: int, block_size: int) -> Iterator[Document]:
+    buffer = ""
+    buffer_start = 0  # absolute offset of buffer[0]
+    next_start = 0
+    for block in iter_text_blocks(file_path, block_size):
+        buffer += block
+        while next_start + window_size <= buffer_start + len(buffer):
+            local = next_start - buffer_start
+            yield Document(
+                page_content=buffer[local:local + window_size],
+                metadata={
+                    "source": file_path,
+                    "doc_index": 0,
+                    "chunk_start": next_start,
+                    "chunk_end": next_start + window_size,
+                    "chunk_type": "rolling_window"
+                }
+            )
+            next_start += step_size
+        # Drop text no future window needs
+        drop = min(next_start - buffer_start, len(buffer))
+        buffer = buffer[drop:]
+        buffer_start += drop
+    if next_start == 0 and buffer_start == 0:
+        # Shorter than one window: the whole text is the only chunk
+        yield Document(
+            page_content=buffer,
+            metadata={"source": file_path, "doc_index": 0, "chunk_start": 0, "chunk_end": len(buffer), "chunk_type": "rolling_window"}
+        )
+
+
+def stream_chunk_views(
+    file_path: str,
+    chunk_strategies: List[Dict[str, int]] = None,
+    rolling_window: Dict[str, int] = None,
+    block_size: int = STREAM_BLOCK_SIZE
+) -> Dict[str, Iterator[Document]]:
+    """
+    Chunk a large text or markdown file without reading it into memory.
+
+    Returns the same views as build_chunk_views (offsets, parent links and
+    rolling window), but every strategy is a generator that streams the file
+    in blocks of block_size characters. Chunks overlap correctly across read
+    boundaries because packing runs over one continuous segment stream. Each
+    generator reads the file on its own when it is iterated, and
+    index_document_with_strategies records the points it has seen in its
+    SQLite manifest rather than in memory, so indexing the views keeps memory
+    bounded by the batch size instead of the file size.
+
+    Markdown is chunked as raw text (no markup is stripped), the same way
+    document_loader loads smaller markdown files.
+
+    Args:
+        file_path: Path to a .txt or .md file
+        chunk_strategies: List of dictionaries with id, chunk_size and chunk_overlap
+        rolling_window: Optional {"window_size": ..., "step_size": ...} for a rolling window view
+        block_size: Characters read per block
+
+    Returns:
+        Dictionary with strategy_id as key and a generator of Documents as value
+    """
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"File '{file_path}' not found. Please check the file path.")
+    chunk_strategies = chunk_strategies or DEFAULT_CHUNK_STRATEGIES
+    levels = sorted(chunk_strategies, key=lambda strategy: strategy["chunk_size"])
+    segment_size = base_segment_size_for(levels)
+    parents = {level["id"]: parent for level, parent in zip(levels, levels[1:] + [None])}
+
+    # Generators: a strategy opens the file only when it is iterated
+    views = {
+        strategy["id"]: _stream_strategy(file_path, strategy, parents[strategy["id"]], segment_size, block_size)
+        for strategy in chunk_strategies
+    }
+    if rolling_window:
+        views["rolling_window"] = _stream_rolling_window(
+            file_path,
+            rolling_window.get("window_size", 1000),
+            rolling_window.get("step_size", 200),
+            block_size
+        )
+    logger.info(f"Streaming chunk views for '{file_path}' ({os.path.getsize(file_path) / (1024 * 1024):.1f} MB)")
+    return views
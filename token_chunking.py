@@ -0,0 +1,158 @@
+import copy
+import logging
+import threading
+from typing import Dict, List, Tuple, Any
+
+from document_loader import ChunkRecord, CHUNK_MAX_TOKENS
+from embedding_provider import get_tokenizer, get_max_seq_length, EMBEDDING_BATCH_SIZE
+from index_manifest import content_hash
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+SPECIAL_TOKENS = 2  # [CLS] and [SEP] count against the model's max sequence length
+TOKEN_OVERLAP = 32  # tokens shared by consecutive pieces of a split chunk
+TOKENIZE_BATCH_SIZE = 256
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def model_token_limit() -> int:
+    """Content tokens the embedding model actually sees per input."""
+    return get_max_seq_length() - SPECIAL_TOKENS
+
+
+def resolve_max_tokens(max_tokens=None) -> int:
+    """
+    Turn a max_tokens setting into a token count, or None when token-aware
+    chunking is off. None falls back to CHUNK_MAX_TOKENS; "model" means the
+    embedding model's own limit; 0 or "" turns the mode off.
+    """
+    if max_tokens is None:
+        max_tokens = CHUNK_MAX_TOKENS
+    if max_tokens in ("", 0, "0"):
+        return None
+    if max_tokens == "model":
+        return model_token_limit()
+    return min(int(max_tokens), model_token_limit())
+
+
+def _private_tokenizer():
+    """
+    Copy of the model's tokenizer used only here. Caller holds _tokenizer_lock.
+
+    A fast tokenizer stores its truncation setting in the Rust backend, and
+    changing it while another thread encodes with it fails with "Already
+    borrowed". The model encodes with truncation, so asking its tokenizer for
+    untruncated offsets during concurrent ingestion or queries would break.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = copy.deepcopy(get_tokenizer())
+    return _tokenizer
+
+
+def token_offsets(texts: List[str]) -> List[List[Tuple[int, int]]]:
+    """Character offsets of every model token of each text (no special tokens, no truncation)."""
+    offsets = []
+    with _tokenizer_lock:
+        tokenizer = _private_tokenizer()
+        for i in range(0, len(texts), TOKENIZE_BATCH_SIZE):
+            encoded = tokenizer(
+                texts[i:i + TOKENIZE_BATCH_SIZE],
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                truncation=False,
+                verbose=False
+            )
+            offsets.extend(encoded["offset_mapping"])
+    return offsets
+
+
+def count_tokens(texts: List[str]) -> List[int]:
+    """Number of model tokens in each text."""
+    return [len(text_offsets) for text_offsets in token_offsets(texts)]
+
+
+def split_oversized_chunks(chunks: List[ChunkRecord], max_tokens: int, overlap_tokens: int = TOKEN_OVERLAP) -> List[ChunkRecord]:
+    """
+    Split every chunk longer than max_tokens model tokens into pieces that fit.
+
+    Pieces are cut at token boundaries and overlap by overlap_tokens. Each
+    piece keeps the chunk's parent link and records the logical chunk it came
+    from, so at query time all of its vectors resolve to one chunk. Chunks that
+    already fit are returned unchanged.
+    """
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    result = []
+    split = 0
+    for chunk, offsets in zip(chunks, token_offsets([chunk.page_content for chunk in chunks])):
+        if len(offsets) <= max_tokens:
+            result.append(chunk)
+            continue
+
+        logical_hash = chunk.content_hash or content_hash(chunk.page_content)
+        windows = []
+        for first in range(0, len(offsets), max_tokens - overlap_tokens):
+            last = min(first + max_tokens, len(offsets))
+            windows.append((chunk.start + offsets[first][0], chunk.start + offsets[last - 1][1]))
+            if last == len(offsets):
+                break
+        for segment, (start, end) in enumerate(windows):
+            result.append(ChunkRecord(
+                chunk.text, start, end, chunk.source_metadata, chunk.doc_index,
+                chunk_type=chunk.chunk_type,
+                parent=chunk.parent,
+                content_hash=content_hash(chunk.text[start:end]),
+                logical=(chunk.start, chunk.end, logical_hash, segment, len(windows))
+            ))
+        split += 1
+    if split:
+        logger.info(f"Split {split} of {len(chunks)} chunks into {len(result) - len(chunks) + split} pieces of <= {max_tokens} tokens")
+    return result
+
+
+def token_budget_report(views: Dict[str, List], max_tokens: int = None, batch_size: int = EMBEDDING_BATCH_SIZE) -> Dict[str, Dict[str, Any]]:
+    """
+    How many model tokens each strategy spends and loses to truncation.
+
+    For every strategy: chunks, chunks over the limit, total tokens, tokens
+    beyond the limit (truncated: tokenized but never seen by the model),
+    padding tokens the model processes when chunks are encoded in
+    length-sorted batches, and how many vectors token-aware splitting would
+    produce instead.
+
+    Args:
+        views: {strategy_id: chunks} as returned by build_chunk_views
+        max_tokens: Token limit (default: the embedding model's limit)
+        batch_size: Encode batch size used to estimate padding
+
+    Returns:
+        {strategy_id: report}
+    """
+    max_tokens = max_tokens or model_token_limit()
+    step = max_tokens - min(TOKEN_OVERLAP, max_tokens // 2)
+    report = {}
+    for strategy_id, chunks in views.items():
+        counts = count_tokens([chunk.page_content for chunk in chunks])
+        seen = sorted(min(count, max_tokens) for count in counts)
+        padding = 0
+        for i in range(0, len(seen), batch_size):
+            batch = seen[i:i + batch_size]
+            padding += batch[-1] * len(batch) - sum(batch)
+        total = sum(counts)
+        truncated = sum(max(0, count - max_tokens) for count in counts)
+        report[strategy_id] = {
+            "chunks": len(counts),
+            "chunks_over_limit": sum(1 for count in counts if count > max_tokens),
+            "tokens": total,
+            "truncated_tokens": truncated,
+            "truncated_pct": round(100.0 * truncated / total, 1) if total else 0.0,
+            "padding_tokens": padding,
+            "max_chunk_tokens": max(counts, default=0),
+            "vectors_if_split": sum(1 if count <= max_tokens else -(-(count - max_tokens) // step) + 1 for count in counts),
+        }
+    return report
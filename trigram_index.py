@@ -0,0 +1,230 @@
+import os
+import re
+import logging
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+TRIGRAM_INDEX_DIR = os.getenv("TRIGRAM_INDEX_DIR", "data/trigram_index")
+TRIGRAM_MAX_CANDIDATES = int(os.getenv("TRIGRAM_MAX_CANDIDATES", "200"))
+TRIGRAM_MIN_OVERLAP = float(os.getenv("TRIGRAM_MIN_OVERLAP", "0.3"))  # share of query trigrams a candidate must contain
+TRIGRAM_MAX_DF = 0.2  # trigrams in more than this share of chunks do not generate candidates
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+_indexes: Dict[str, "TrigramIndex"] = {}
+_indexes_lock = threading.Lock()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of the lower-cased words of a text, padded at word boundaries."""
+    grams = set()
+    for word in _WORD_PATTERN.findall(text.lower()):
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    Character-trigram inverted index over the chunk texts of one collection.
+
+    Posting lists live in memory; every point's trigram set is also stored in
+    SQLite (one file per collection), so the index is rebuilt from disk on
+    start-up and updated incrementally as chunks are written or deleted.
+    Several processes can share the file: every write bumps a generation
+    counter, and a process whose postings are behind it reloads them before
+    answering the next query.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Set[int]] = {}
+        self._point_ids: Dict[int, str] = {}
+        self._rows: Dict[str, int] = {}
+        self._generation = None
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS points (row INTEGER PRIMARY KEY, point_id TEXT UNIQUE NOT NULL, trigrams TEXT NOT NULL)"
+        )
+        self._db.commit()
+        with self._lock:
+            self._sync()
+        logger.info(f"Trigram index opened at '{path}' with {len(self._rows)} chunks and {len(self._postings)} trigrams")
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _disk_generation(self) -> int:
+        value = self._db.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+        return int(value[0]) if value else 0
+
+    def _sync(self):
+        """Reload the postings if another process wrote since they were loaded. Caller holds _lock."""
+        generation = self._disk_generation()
+        if generation == self._generation:
+            return
+        if self._generation is not None:
+            logger.info(f"Trigram index '{self.path}' changed on disk, reloading")
+        self._postings.clear()
+        self._point_ids.clear()
+        self._rows.clear()
+        for row, point_id, grams in self._db.execute("SELECT row, point_id, trigrams FROM points"):
+            self._insert(row, point_id, grams.split("\n"))
+        self._generation = generation
+
+    @contextmanager
+    def _write(self):
+        """
+        Write transaction that holds off writers in other processes and bumps
+        the generation on commit. Caller holds _lock. Yields whether the
+        postings in memory are current, i.e. whether they should be updated
+        along with the file.
+        """
+        self._db.execute("BEGIN IMMEDIATE")
+        in_sync = self._disk_generation() == self._generation
+        try:
+            yield in_sync
+            generation = self._disk_generation() + 1
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('generation', ?)", (str(generation),))
+            self._db.commit()
+        except BaseException:
+            self._db.rollback()
+            self._generation = None  # memory may be half-updated: reload on next use
+            raise
+        if in_sync:
+            self._generation = generation
+
+    @property
+    def complete(self) -> bool:
+        """Whether the index covers every chunk of the collection (built or rebuilt in full)."""
+        with self._lock:
+            value = self._db.execute("SELECT value FROM meta WHERE name = 'complete'").fetchone()
+        return value is not None and value[0] == "1"
+
+    def mark_complete(self):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('complete', '1')")
+            self._db.commit()
+
+    def reset(self):
+        """
+        Empty the index and mark it incomplete until mark_complete() is called,
+        i.e. once a rebuild has indexed every chunk (or at once for a new, empty
+        collection).
+        """
+        with self._lock:
+            with self._write():
+                self._postings.clear()
+                self._point_ids.clear()
+                self._rows.clear()
+                self._db.execute("DELETE FROM points")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('complete', '0')")
+            self._generation = self._disk_generation()  # memory is empty, like the file
+
+    def _insert(self, row: int, point_id: str, grams: Iterable[str]):
+        self._point_ids[row] = point_id
+        self._rows[point_id] = row
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(row)
+
+    def _discard(self, point_id: str, in_sync: bool):
+        """Drop a point from disk, and from memory if it is in sync. Caller holds _lock."""
+        # Look the point up on disk: another process may have written it
+        stored = self._db.execute("SELECT row, trigrams FROM points WHERE point_id = ?", (point_id,)).fetchone()
+        if stored is None:
+            return
+        self._db.execute("DELETE FROM points WHERE point_id = ?", (point_id,))
+        if not in_sync:
+            return
+        row, grams = stored
+        self._rows.pop(point_id, None)
+        self._point_ids.pop(row, None)
+        for gram in grams.split("\n"):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(row)
+                if not posting:
+                    del self._postings[gram]
+
+    def add(self, chunks: Iterable[Tuple[str, str]]):
+        """Index (point_id, text) pairs, replacing earlier entries of the same points."""
+        chunks = [(str(point_id), sorted(trigrams(text))) for point_id, text in chunks]
+        with self._lock, self._write() as in_sync:
+            for point_id, grams in chunks:
+                self._discard(point_id, in_sync)
+                cursor = self._db.execute(
+                    "INSERT OR REPLACE INTO points (point_id, trigrams) VALUES (?, ?)", (point_id, "\n".join(grams))
+                )
+                if in_sync:
+                    self._insert(cursor.lastrowid, point_id, grams)
+
+    def remove(self, point_ids: Iterable[str]):
+        """Drop deleted points."""
+        with self._lock, self._write() as in_sync:
+            for point_id in point_ids:
+                self._discard(str(point_id), in_sync)
+
+    def candidates(self, query_text: str, limit: int = TRIGRAM_MAX_CANDIDATES, min_overlap: float = TRIGRAM_MIN_OVERLAP) -> List[str]:
+        """
+        Point IDs of the chunks sharing the most trigrams with the query.
+
+        Candidates are generated from the query's selective trigrams only
+        (those in at most TRIGRAM_MAX_DF of the chunks, or the rarest few if
+        none is), so the work depends on posting-list sizes rather than the
+        corpus size. Candidates must contain at least min_overlap of the
+        query's trigrams.
+
+        Args:
+            query_text: Query text
+            limit: Maximum number of candidates
+            min_overlap: Minimum share of query trigrams (0-1)
+
+        Returns:
+            Point IDs, best overlap first
+        """
+        query_grams = trigrams(query_text)
+        if not query_grams:
+            return []
+        with self._lock:
+            self._sync()
+            postings = sorted(
+                (self._postings[gram] for gram in query_grams if gram in self._postings), key=len
+            )
+            if not postings:
+                return []
+            max_df = max(1, int(TRIGRAM_MAX_DF * len(self._rows)))
+            selective = [posting for posting in postings if len(posting) <= max_df] or postings[:3]
+            overlap = Counter()
+            for posting in selective:
+                overlap.update(posting)
+            # Count the remaining (common) trigrams for the candidates only
+            for posting in postings[len(selective):]:
+                for row in overlap:
+                    if row in posting:
+                        overlap[row] += 1
+            needed = min_overlap * len(query_grams)
+            ranked = [(count, row) for row, count in overlap.items() if count >= needed]
+            ranked.sort(reverse=True)
+            return [self._point_ids[row] for _, row in ranked[:limit]]
+
+
+def get_trigram_index(collection_name: str) -> TrigramIndex:
+    """The trigram index of a collection, loaded once per process."""
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        if index is None:
+            index = TrigramIndex(os.path.join(TRIGRAM_INDEX_DIR, f"{collection_name}.sqlite"))
+            _indexes[collection_name] = index
+        return index
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Dict, Any
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+UPLOAD_REGISTRY_FILE = os.getenv("UPLOAD_REGISTRY_FILE", "data/upload_registry.sqlite")
+LEGACY_REGISTRY_FILE = "data/upload_registry.json"  # former JSON registry, imported once if present
+
+_FIELDS = ("collection_name", "content_hash", "document_id", "file_path", "status", "chunks", "error", "updated_at")
+
+_db = None
+_db_lock = threading.Lock()
+
+
+def file_content_hash(data) -> str:
+    """Stable hash of an uploaded file's bytes."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def _import_legacy_registry(db: sqlite3.Connection):
+    """Copy entries of the former JSON registry, then rename it so that it is imported only once."""
+    if not os.path.exists(LEGACY_REGISTRY_FILE):
+        return
+    try:
+        with open(LEGACY_REGISTRY_FILE, "r") as f:
+            entries = json.load(f).values()
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable upload registry: {e}")
+        return
+    db.executemany(
+        f"INSERT OR IGNORE INTO uploads VALUES ({', '.join('?' * len(_FIELDS))})",
+        [tuple(entry.get(field) for field in _FIELDS) for entry in entries]
+    )
+    db.commit()
+    os.replace(LEGACY_REGISTRY_FILE, f"{LEGACY_REGISTRY_FILE}.imported")
+    logger.info(f"Imported {len(entries)} entries from '{LEGACY_REGISTRY_FILE}'")
+
+
+def _get_db() -> sqlite3.Connection:
+    """
+    Open the registry once per process. Caller holds _db_lock.
+
+    Every read and write goes to SQLite, so the Streamlit apps and other
+    processes sharing the file always see each other's entries.
+    """
+    global _db
+    if _db is None:
+        os.makedirs(os.path.dirname(UPLOAD_REGISTRY_FILE) or ".", exist_ok=True)
+        _db = sqlite3.connect(UPLOAD_REGISTRY_FILE, check_same_thread=False, timeout=30)
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            "collection_name TEXT NOT NULL, content_hash TEXT NOT NULL, document_id TEXT, file_path TEXT, "
+            "status TEXT NOT NULL, chunks INTEGER, error TEXT, updated_at REAL, "
+            "PRIMARY KEY (collection_name, content_hash))"
+        )
+        _import_legacy_registry(_db)
+        _db.commit()
+    return _db
+
+
+def lookup_upload(collection_name: str, content_hash: str) -> Dict[str, Any]:
+    """Return the registry entry for a file in a collection, or None if it was never submitted."""
+    with _db_lock:
+        row = _get_db().execute(
+            f"SELECT {', '.join(_FIELDS)} FROM uploads WHERE collection_name = ? AND content_hash = ?",
+            (collection_name, content_hash)
+        ).fetchone()
+    return dict(zip(_FIELDS, row)) if row else None
+
+
+def needs_ingestion(collection_name: str, content_hash: str) -> bool:
+    """
+    Whether a file still has to be ingested into the collection.
+
+    Files that are indexed, linked as a duplicate, queued or failed are
+    skipped (failures are retried with an explicit re-index); files whose job
+    was interrupted by a restart are ingested again.
+    """
+    entry = lookup_upload(collection_name, content_hash)
+    return entry is None or entry["status"] == "interrupted"
+
+
+def register_upload(collection_name: str, content_hash: str, document_id: str, file_path: str):
+    """Record that a file was submitted for indexing."""
+    with _db_lock:
+        db = _get_db()
+        db.execute(
+            "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, 'queued', NULL, NULL, ?)",
+            (collection_name, content_hash, document_id, file_path, time.time())
+        )
+        db.commit()
+
+
+def set_upload_status(collection_name: str, content_hash: str, status: str, chunks: int = None, error: str = None):
+    """
+    Update a registered file to "indexed", "duplicate" (skipped as a
+    near-duplicate of an indexed document, no points of its own), "failed"
+    or "interrupted".
+    """
+    with _db_lock:
+        db = _get_db()
+        db.execute(
+            "UPDATE uploads SET status = ?, chunks = ?, error = ?, updated_at = ? "
+            "WHERE collection_name = ? AND content_hash = ?",
+            (status, chunks, error, time.time(), collection_name, content_hash)
+        )
+        db.commit()
+
+
+def forget_upload(collection_name: str, content_hash: str):
+    """Drop a file from the registry so that it is ingested again (forced re-index)."""
+    with _db_lock:
+        db = _get_db()
+        db.execute("DELETE FROM uploads WHERE collection_name = ? AND content_hash = ?", (collection_name, content_hash))
+        db.commit()